@@ -1,13 +1,34 @@
-from flask import Flask, request, jsonify, send_from_directory
+# Started before the other imports so their cost shows up in /api/debug/startup
+from backend.startup_profile import startup_profile
+startup_profile.start()
+
+from flask import Flask, Response, g, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
+import re
 import json
 import logging
+import threading
+import time
 from dotenv import load_dotenv
 
 from backend.llm_providers import LLMProviderFactory
 from backend.rosa_expert import ROSAExpert
+from backend.conversation_store import create_conversation_store, DEFAULT_SESSION_ID
+from backend.context_window import ContextWindowManager
+from backend.doc_index import DocIndex
 from backend.cli_executor import CLIExecutor
+from backend.async_executor import EXECUTION_MODES
+from backend.version_inventory import VersionInventory
+from backend.job_manager import JobManager, JOB_ID_PATTERN
+from backend.intent_router import router as intent_router, extract_explicit_commands
+from backend.response_cache import ResponseCache
+from backend.state_mirror import StateMirror
+from backend.output_shaper import OutputShaper
+from backend.settings_service import SettingsService
+from backend import metrics
+
+startup_profile.mark('imports')
 
 # Load environment variables
 load_dotenv()
@@ -21,96 +42,213 @@ app = Flask(__name__, static_folder='../frontend')
 CORS(app)
 
 # Initialize components
-rosa_expert = ROSAExpert()
-cli_executor = CLIExecutor()
+rosa_expert = ROSAExpert(
+    store=create_conversation_store(),
+    context_manager=ContextWindowManager.from_env(),
+    doc_index=DocIndex.from_env(),
+    knowledge_top_k=int(os.getenv('DOCS_TOP_K', 3))
+)
+cli_executor = CLIExecutor.from_env()
+
+# CLI versions are probed in the background so health checks stay I/O free
+version_inventory = VersionInventory(
+    cli_executor,
+    ttl=int(os.getenv('CLI_VERSION_TTL', 300))
+)
+version_inventory.start()
+
+# Long-running commands run as background jobs instead of pinning request workers
+job_manager = JobManager.from_env(cli_executor)
+
+# Opt-in cache of answers to standalone questions (None when disabled)
+response_cache = ResponseCache.from_env()
+
+# Opt-in background mirror of cluster state that chat has asked about (None when disabled)
+state_mirror = StateMirror.from_env(cli_executor)
+if state_mirror:
+    cli_executor.mutation_listeners.append(state_mirror.invalidate)
+
+# Large command results are cut down for the LLM and chat responses; full output is kept on disk
+output_shaper = OutputShaper.from_env()
+
+startup_profile.mark('components')
 
 # Global LLM provider (will be configured via settings)
 current_provider = None
 
-# Settings file path
-# Settings file path
-SETTINGS_FILE = '/tmp/settings.json'
+# Config hash of the settings current_provider was built from
+current_provider_hash = None
+provider_lock = threading.Lock()
 
+# Settings are held in memory and reloaded when the settings file changes (e.g. saved by another worker)
+settings_service = SettingsService.from_env()
 
-def load_settings():
-    """Load LLM provider settings from file"""
-    try:
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading settings: {e}")
-    
-    # Check for Local LLM env var
-    local_llm_endpoint = os.getenv('LOCAL_LLM_ENDPOINT')
-    if local_llm_endpoint:
-        return {
-            'provider': 'local',
-            'config': {
-                'endpoint_url': local_llm_endpoint,
-                'model': os.getenv('LOCAL_LLM_MODEL', 'mistral-7b-awq')
-            }
-        }
+# Most commands one /api/execute request may run
+CLI_MAX_BATCH = int(os.getenv('CLI_MAX_BATCH', 20))
 
-    # Check for Groq env var
-    groq_api_key = os.getenv('GROQ_API_KEY')
-    if groq_api_key:
-        return {
-            'provider': 'groq',
-            'config': {
-                'api_key': groq_api_key,
-                'model': 'llama-3.1-8b-instant'
-            }
-        }
+# Provider warm-up before a worker serves traffic: 'off', 'connect' (open connections)
+# or 'prime' (also send a one-token request carrying the system prompt)
+PROVIDER_WARMUP = os.getenv('PROVIDER_WARMUP', 'connect').lower()
+warmup_state = {'mode': PROVIDER_WARMUP, 'status': 'pending', 'seconds': None, 'error': None}
+warmup_done = threading.Event()
+warmup_lock = threading.Lock()
 
-    # Default settings
-    return {
-        'provider': 'openai',
-        'config': {
-            'api_key': os.getenv('OPENAI_API_KEY', ''),
-            'model': 'gpt-4'
-        }
-    }
+
+def load_settings():
+    """Load LLM provider settings (from memory; the file is only re-read when it changes)"""
+    return settings_service.get()
 
 
 def save_settings(settings):
     """Save LLM provider settings to file"""
     try:
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=2)
+        settings_service.save(settings)
         return True
     except Exception as e:
         logger.error(f"Error saving settings: {e}")
         return False
 
 
+def provider_is_configured(settings):
+    """Whether settings name an API key or endpoint (or, for routers, a provider chain)"""
+    config = settings.get('config', {})
+    if settings.get('provider', '').lower() == 'router':
+        return bool(config.get('providers'))
+    return bool(config.get('api_key') or config.get('endpoint_url'))
+
+
+def mask_api_keys(config):
+    """Copy of a provider config with API keys masked (including router chains)"""
+    masked = dict(config)
+    api_key = masked.get('api_key')
+    if api_key:
+        masked['api_key'] = api_key[:8] + '...' + api_key[-4:] if len(api_key) > 12 else '***'
+    if isinstance(masked.get('providers'), list):
+        masked['providers'] = [
+            dict(entry, config=mask_api_keys(entry.get('config') or {})) for entry in masked['providers']
+        ]
+    return masked
+
+
 def initialize_provider():
-    """Initialize LLM provider from saved settings"""
-    global current_provider
-    settings = load_settings()
+    """
+    Initialize the LLM provider from the current settings.
     
-    # Don't initialize if no API key or endpoint configured
-    config = settings.get('config', {})
-    if not config.get('api_key') and not config.get('endpoint_url'):
-        logger.info("No API key or endpoint configured, skipping provider initialization")
-        current_provider = None
+    The provider is only rebuilt when the settings' config hash changed.
+    
+    Returns:
+        Tuple of (provider, error) where error is a (message, status_code) tuple
+    """
+    global current_provider, current_provider_hash
+    settings, config_hash = settings_service.get_with_hash()
+    if current_provider and config_hash == current_provider_hash:
+        return current_provider, None
+    
+    with provider_lock:
+        # Another thread may have rebuilt it while we waited
+        if current_provider and config_hash == current_provider_hash:
+            return current_provider, None
+        
+        # Don't initialize if no API key or endpoint configured
+        if not provider_is_configured(settings):
+            logger.info("No API key or endpoint configured, skipping provider initialization")
+            current_provider, current_provider_hash = None, None
+            return None, ('LLM provider not configured. Please configure in settings.', 400)
+        
+        try:
+            current_provider = LLMProviderFactory.create_provider(
+                settings['provider'],
+                settings['config']
+            )
+            current_provider_hash = config_hash
+            logger.info(f"Initialized {settings['provider']} provider successfully")
+            if response_cache:
+                # Answers from the previous settings must not be served; every worker does this on reload
+                response_cache.purge()
+            if warmup_done.is_set():
+                # Settings changed after boot: warm the new provider without holding up this request
+                threading.Thread(target=run_provider_warm_up, args=(current_provider,), daemon=True).start()
+            return current_provider, None
+        except Exception as e:
+            # Keep serving with the previous provider (if any); the next request retries the new settings
+            logger.error(f"Failed to initialize {settings['provider']} provider: {e}")
+            if current_provider:
+                logger.warning(f"Still using the previous {current_provider.__class__.__name__} "
+                               f"until the new settings work")
+                return current_provider, None
+            return None, (f'Failed to initialize LLM provider: {str(e)}', 500)
+
+
+def run_provider_warm_up(provider):
+    """Warm up a provider as configured by PROVIDER_WARMUP, recording the outcome in warmup_state"""
+    if PROVIDER_WARMUP == 'off' or provider is None:
+        warmup_state.update(status='skipped')
         return
     
+    warmup_state.update(status='warming', error=None)
+    started = time.perf_counter()
     try:
-        current_provider = LLMProviderFactory.create_provider(
-            settings['provider'],
-            settings['config']
-        )
-        logger.info(f"Initialized {settings['provider']} provider successfully")
+        messages = None
+        if PROVIDER_WARMUP == 'prime':
+            system_prompt = rosa_expert.get_system_prompt_for_provider(prompt_provider_name(provider))
+            messages = [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': 'Hello'}
+            ]
+        provider.warm_up(messages)
+        warmup_state.update(status='ready')
+        logger.info(f"Provider warm-up ({PROVIDER_WARMUP}) took {time.perf_counter() - started:.2f}s")
     except Exception as e:
-        logger.warning(f"Failed to initialize provider during startup: {e}")
-        logger.info("Provider will be created on-demand during first use")
-        # Don't set current_provider to None - leave it as is
-        # This allows the provider to be created fresh on each request
+        # A provider that is down must not keep the pod unready (settings would be unreachable)
+        logger.warning(f"Provider warm-up failed: {e}")
+        warmup_state.update(status='failed', error=str(e))
+    finally:
+        warmup_state['seconds'] = round(time.perf_counter() - started, 3)
+
+
+def warm_up_worker():
+    """
+    Warm up this worker's provider once, before it serves traffic.
+    
+    Called from the gunicorn post_worker_init hook (and at startup when run
+    without gunicorn); /api/health/ready reports not-ready until it is done.
+    """
+    with warmup_lock:
+        if warmup_done.is_set():
+            return
+        run_provider_warm_up(current_provider)
+        startup_profile.mark('warmup')
+        warmup_done.set()
 
 
 # Initialize provider on startup
-initialize_provider()
+try:
+    initialize_provider()
+    startup_profile.mark('provider')
+finally:
+    # Restore the original __import__ even if startup fails
+    startup_profile.stop_import_timing()
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.observe_request(request.endpoint or 'unmatched', request.method, response.status_code,
+                                time.perf_counter() - started)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics (all workers when PROMETHEUS_MULTIPROC_DIR is set)"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
 
 
 @app.route('/')
@@ -127,40 +265,325 @@ def serve_static(path):
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    cli_versions = cli_executor.get_cli_versions()
+    """Health check endpoint (reads cached CLI versions only)"""
+    inventory = version_inventory.snapshot()
     
     return jsonify({
         'status': 'healthy',
         'provider': current_provider.__class__.__name__ if current_provider else 'None',
-        'cli_tools': cli_versions
+        'cli_tools': inventory['versions'],
+        'cli_tools_age_seconds': inventory['age_seconds']
     })
 
 
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint - not ready until this worker's provider warm-up has run"""
+    ready = warmup_done.is_set()
+    return jsonify({
+        'status': 'ready' if ready else 'warming',
+        'warmup': dict(warmup_state)
+    }), 200 if ready else 503
+
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness endpoint - does no I/O at all"""
+    return jsonify({'status': 'alive'})
+
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def get_session_id(data=None):
+    """
+    Get the conversation session id from the request body or X-Session-ID header.
+    
+    Returns:
+        The session id, DEFAULT_SESSION_ID if none was sent, or None if malformed
+    """
+    session_id = (data or {}).get('session_id') or request.headers.get('X-Session-ID')
+    if not session_id:
+        return DEFAULT_SESSION_ID
+    if isinstance(session_id, str) and SESSION_ID_PATTERN.match(session_id):
+        return session_id
+    return None
+
+
+def resolve_provider():
+    """
+    Return the configured LLM provider, rebuilding it if the settings changed.
+    
+    Returns:
+        Tuple of (provider, error) where error is a (message, status_code) tuple
+    """
+    return initialize_provider()
+
+
+def prompt_provider_name(provider):
+    """
+    Provider name used to pick the system prompt and context budget.
+    
+    A router may serve a request from any of its providers, so prompts are
+    sized for the one with the smallest context window.
+    """
+    providers = getattr(provider, 'providers', None) or [provider]
+    windows = ContextWindowManager.PROVIDER_CONTEXT_WINDOWS
+    return min(
+        (p.__class__.__name__ for p in providers),
+        key=lambda name: windows.get(name.lower(), ContextWindowManager.DEFAULT_CONTEXT_WINDOW)
+    )
+
+
+def detect_command(user_message):
+    """
+    Detect an infrastructure state query or explicit CLI command in a message.
+    
+    Returns:
+        The command to execute, or None
+    """
+    # Intelligent infrastructure state query detection
+    # Map natural language questions to required verification commands
+    match = intent_router.best_command(user_message)
+    if match:
+        command = match['command']
+        logger.info(f"Detected infrastructure state query ({match['intent']}, "
+                    f"confidence {match['confidence']}), forcing command: {command}")
+        return command
+    
+    # Explicit commands in backticks/quotes
+    for candidate in extract_explicit_commands(user_message):
+        # Check if it's a valid CLI command
+        if cli_executor.validate_command(candidate):
+            logger.info(f"Detected command to execute: {candidate}")
+            return cli_executor.sandbox.canonical(candidate)
+    
+    return None
+
+
+def detect_and_execute_command(user_message):
+    """
+    Detect infrastructure state queries or explicit CLI commands in a message
+    and execute them.
+    
+    Returns:
+        Tuple of (executed_command, command_output), both None if nothing ran -
+        command_output is shaped (see OutputShaper.shape)
+    """
+    with metrics.stage('intent'):
+        command = detect_command(user_message)
+    if not command:
+        return None, None
+    with metrics.stage('cli'):
+        mirrored = state_mirror.lookup(command) if state_mirror else None
+        if mirrored:
+            logger.info(f"Answering from mirrored state (as of {mirrored['as_of']}): {command}")
+            return command, output_shaper.shape(command, mirrored)
+        result = cli_executor.execute(command)
+    if state_mirror:
+        # The mirror seeds its snapshot from the full output
+        state_mirror.track(command, result)
+    return command, output_shaper.shape(command, result)
+
+
+def start_chat_turn(provider, user_message, session_id, executed_command, command_output):
+    """
+    Record a user turn (and any command output) and build the provider messages.
+    
+    Returns:
+        Tuple of (messages, cache_key) - cache_key is None if the answer must not be cached
+    """
+    first_turn = not rosa_expert.get_conversation_history(session_id)
+    
+    # Add user message to conversation
+    rosa_expert.add_to_conversation('user', user_message, session_id)
+    
+    # If we executed a command, add the results to the conversation context
+    if command_output:
+        add_command_output_to_conversation(executed_command, command_output, session_id)
+    
+    # Get conversation messages with system prompt
+    # Use provider-specific prompt (simplified for local endpoints)
+    with metrics.stage('prompt'):
+        messages = rosa_expert.get_conversation_messages_for_provider(
+            prompt_provider_name(provider), session_id, query=user_message
+        )
+    
+    cache_key = cacheable_response_key(provider, messages, user_message, first_turn, command_output)
+    return messages, cache_key
+
+
+def add_command_output_to_conversation(executed_command, command_output, session_id):
+    """Add the results of an executed command to the conversation context"""
+    context_message = f"\n\n[SYSTEM - Command Executed: `{executed_command}`]\n"
+    if command_output.get('mirrored'):
+        context_message += (f"(State as of {command_output['as_of']}, "
+                            f"last changed {command_output['last_changed']})\n")
+    if command_output['success']:
+        # Structured commands get the condensed table instead of the raw JSON
+        output = command_output.get('summary') or command_output['output']
+        context_message += f"Output:\n```\n{output}\n```"
+    else:
+        context_message += f"Error:\n```\n{command_output['error']}\n```\nExit code: {command_output['exit_code']}"
+    if command_output.get('output_shaped'):
+        context_message += f"\n(Output shortened from {command_output['output_bytes']} bytes)"
+    
+    # Add to conversation for context
+    rosa_expert.add_to_conversation('system', context_message, session_id)
+
+
+def command_executed_payload(executed_command, command_output):
+    """Build the command_executed section of a chat response"""
+    return {
+        'command': executed_command,
+        'success': command_output['success'],
+        'output': command_output['output'],
+        'error': command_output['error'],
+        'cached': command_output.get('cached', False),
+        'summary': command_output.get('summary'),
+        'structured': command_output.get('structured'),
+        'as_of': command_output.get('as_of'),
+        'last_changed': command_output.get('last_changed'),
+        'output_shaped': command_output.get('output_shaped', False),
+        'output_id': command_output.get('output_id'),
+        'output_bytes': command_output.get('output_bytes')
+    }
+
+
+JSON_COMMAND_PATTERN = re.compile(r'\{\s*["\']cmd["\'\s]*:\s*\[')
+
+JSON_COMMAND_REPLACEMENT = """I apologize, but I encountered an issue with my response format. Let me try again.
+
+For ROSA CLI version, you can run:
+```bash
+rosa version
+```
+
+Please ask me again if you'd like me to check this for you."""
+
+
+def filter_json_command(response):
+    """Post-process response to detect and filter JSON command outputs"""
+    # Check if response looks like a JSON command structure
+    if JSON_COMMAND_PATTERN.search(response):
+        try:
+            # Try to parse as JSON to confirm
+            json.loads(response)
+            # If it's valid JSON with 'cmd' key, replace with error message
+            logger.warning("Detected and filtered JSON command output from LLM")
+            return JSON_COMMAND_REPLACEMENT
+        except Exception:
+            # Not valid JSON, keep original response
+            pass
+    return response
+
+
+class JSONCommandStreamFilter:
+    """
+    Incremental filter_json_command for a stream of text deltas.
+    
+    Only a response that is JSON as a whole can be filtered, so deltas are
+    passed straight through unless the response starts with '{', in which
+    case it is buffered until completion and filtered in one piece.
+    """
+    
+    def __init__(self):
+        self.buffered = []
+        self.passthrough = False
+    
+    def feed(self, delta):
+        """Return the text to emit for a delta (None while buffering)"""
+        if self.passthrough:
+            return delta
+        
+        self.buffered.append(delta)
+        head = ''.join(self.buffered).lstrip()
+        if head and not head.startswith('{'):
+            self.passthrough = True
+            text = ''.join(self.buffered)
+            self.buffered = []
+            return text
+        return None
+    
+    def finish(self):
+        """Return any remaining buffered text, filtered (None if nothing is left)"""
+        if self.buffered:
+            return filter_json_command(''.join(self.buffered))
+        return None
+
+
+def filter_json_command_stream(deltas):
+    """Apply filter_json_command to a stream of text deltas"""
+    stream_filter = JSONCommandStreamFilter()
+    for delta in deltas:
+        text = stream_filter.feed(delta)
+        if text:
+            yield text
+    
+    text = stream_filter.finish()
+    if text:
+        yield text
+
+
+def cacheable_response_key(provider, messages, user_message, first_turn, command_output):
+    """
+    Response cache key for a turn, or None if the turn must not be cached.
+    
+    Only first turns without command output are cached: their answer depends
+    on nothing but the question, provider, system prompt and documentation
+    snippets (all system messages are part of the key).
+    """
+    if not response_cache or not first_turn or command_output:
+        return None
+    return response_cache.key(
+        provider.__class__.__name__,
+        getattr(provider, 'model', None),
+        user_message,
+        '\0'.join(message['content'] for message in messages if message['role'] == 'system')
+    )
+
+
+def sse_event(event, data):
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Runtime metrics for the current worker (e.g. HTTP connection reuse)"""
+    return jsonify({
+        'pid': os.getpid(),
+        'provider': current_provider.__class__.__name__ if current_provider else 'None',
+        'provider_metrics': current_provider.get_metrics() if current_provider else {},
+        'cli_cache': cli_executor.cache.stats() if cli_executor.cache else None,
+        'response_cache': response_cache.stats() if response_cache else None,
+        'state_mirror': state_mirror.stats() if state_mirror else None,
+        'settings': settings_service.stats()
+    })
+
+
+@app.route('/api/admin/response-cache', methods=['GET', 'DELETE'])
+def admin_response_cache():
+    """
+    Response cache stats (GET) or purge (DELETE) for the current worker.
+    
+    The cache is per worker, so a purge only clears the worker that handled
+    the request; saving settings clears every worker's cache.
+    """
+    if not response_cache:
+        return jsonify({'error': 'Response cache is disabled (set RESPONSE_CACHE_ENABLED=true)'}), 404
+    
+    if request.method == 'DELETE':
+        return jsonify({'success': True, 'purged': response_cache.purge()})
+    return jsonify(response_cache.stats())
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chat messages with automatic command execution"""
-    global current_provider
-    
-    # If no provider initialized, try to create it on-demand from saved settings
-    if not current_provider:
-        settings = load_settings()
-        if settings.get('config', {}).get('api_key'):
-            try:
-                current_provider = LLMProviderFactory.create_provider(
-                    settings['provider'],
-                    settings['config']
-                )
-                logger.info(f"Created {settings['provider']} provider on-demand")
-            except Exception as e:
-                logger.error(f"Failed to create provider on-demand: {e}")
-                return jsonify({
-                    'error': f'Failed to initialize LLM provider: {str(e)}'
-                }), 500
-        else:
-            return jsonify({
-                'error': 'LLM provider not configured. Please configure in settings.'
-            }), 400
+    provider, error = resolve_provider()
+    if error:
+        return jsonify({'error': error[0]}), error[1]
     
     try:
         data = request.json
@@ -169,152 +592,40 @@ def chat():
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Intelligent infrastructure state query detection
-        # Map natural language questions to required verification commands
-        message_lower = user_message.lower()
-        
-        # Infrastructure state query patterns and their required commands
-        state_query_patterns = [
-            # Cluster count/list queries
-            ({'how many', 'cluster'}, 'rosa list clusters'),
-            ({'list', 'cluster'}, 'rosa list clusters'),
-            ({'what cluster', 'do i have'}, 'rosa list clusters'),
-            ({'show', 'cluster'}, 'rosa list clusters'),
-            ({'active cluster'}, 'rosa list clusters'),
-            
-            # Cluster status queries  
-            ({'cluster', 'ready'}, None),  # Requires cluster name, handle specially
-            ({'cluster', 'status'}, None),  # Requires cluster name, handle specially
-            ({'deployment', 'complete'}, None),  # Requires cluster name, handle specially
-            
-            # Node queries
-            ({'how many', 'node'}, 'oc get nodes'),
-            ({'what node'}, 'oc get nodes'),
-            ({'list', 'node'}, 'oc get nodes'),
-            ({'show', 'node'}, 'oc get nodes'),
-            
-            # Version queries
-            ({'what version'}, 'rosa list versions --output json'),
-            ({'openshift version'}, 'oc version'),
-            ({'rosa version'}, 'rosa version'),
-            
-            # Pod/workload queries
-            ({'what', 'running'}, 'oc get pods -A'),
-            ({'list', 'pod'}, 'oc get pods -A'),
-            ({'show', 'pod'}, 'oc get pods -A'),
-            
-            # Region queries
-            ({'what region'}, 'rosa list regions'),
-            ({'available region'}, 'rosa list regions'),
-        ]
-        
-        command_output = None
-        executed_command = None
-        
-        # Check for infrastructure state queries
-        for patterns, command in state_query_patterns:
-            if all(pattern in message_lower for pattern in patterns):
-                if command:
-                    logger.info(f"Detected infrastructure state query, forcing command: {command}")
-                    executed_command = command
-                    result = cli_executor.execute(command)
-                    command_output = result
-                    break
-        
-        # Original command detection logic (for explicit commands in backticks/quotes)
-        if not executed_command:
-            # Check if user is explicitly asking to run a command
-            command_keywords = ['run', 'execute', 'check', 'list', 'show', 'get', 'describe', 'verify']
-            cli_tools = ['rosa', 'oc', 'aws', 'ocm']
-            
-            wants_execution = any(keyword in message_lower for keyword in command_keywords)
-            mentions_cli = any(tool in message_lower for tool in cli_tools)
-            
-            # If it looks like a command request, try to detect and execute
-            if wants_execution and mentions_cli:
-                # Try to extract the actual command from the message
-                import re
-                # Look for quoted commands or code blocks
-                cmd_patterns = [
-                    r'`([^`]+)`',  # Backtick code
-                    r'"([^"]+)"',  # Double quotes  
-                    r'\'([^\']+)\'',  # Single quotes
-                ]
-                
-                for pattern in cmd_patterns:
-                    matches = re.findall(pattern, user_message)
-                    for match in matches:
-                        # Check if it's a valid CLI command
-                        if cli_executor.validate_command(match):
-                            logger.info(f"Detected command to execute: {match}")
-                            executed_command = match
-                            result = cli_executor.execute(match)
-                            command_output = result
-                            break
-                    if executed_command:
-                        break
-        
-        # Add user message to conversation
-        rosa_expert.add_to_conversation('user', user_message)
-        
-        # If we executed a command, add the results to the conversation context
-        if command_output:
-            context_message = f"\n\n[SYSTEM - Command Executed: `{executed_command}`]\n"
-            if command_output['success']:
-                context_message += f"Output:\n```\n{command_output['output']}\n```"
-            else:
-                context_message += f"Error:\n```\n{command_output['error']}\n```\nExit code: {command_output['exit_code']}"
-            
-            # Add to conversation for context
-            rosa_expert.add_to_conversation('system', context_message)
-        
-        # Get conversation messages with system prompt
-        # Use provider-specific prompt (simplified for local endpoints)
-        provider_class_name = current_provider.__class__.__name__
-        messages = rosa_expert.get_conversation_messages_for_provider(provider_class_name)
-        
-        # Generate response from LLM
-        response = current_provider.generate_response(messages)
+        session_id = get_session_id(data)
+        if not session_id:
+            return jsonify({'error': 'Invalid session id'}), 400
         
-        # Post-process response to detect and filter JSON command outputs
-        import re
-        import json as json_module
+        executed_command, command_output = detect_and_execute_command(user_message)
+        messages, cache_key = start_chat_turn(
+            provider, user_message, session_id, executed_command, command_output
+        )
         
-        # Check if response looks like a JSON command structure
-        if re.search(r'\{\s*["\']cmd["\'\s]*:\s*\[', response):
-            try:
-                # Try to parse as JSON to confirm
-                json_module.loads(response)
-                # If it's valid JSON with 'cmd' key, replace with error message
-                response = """I apologize, but I encountered an issue with my response format. Let me try again.
-
-For ROSA CLI version, you can run:
-```bash
-rosa version
-```
-
-Please ask me again if you'd like me to check this for you."""
-                logger.warning("Detected and filtered JSON command output from LLM")
-            except:
-                # Not valid JSON, keep original response
-                pass
+        # Generate response from LLM (or reuse the answer to an identical standalone question)
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached:
+            response = cached['response']
+        else:
+            with metrics.llm_request(provider, messages):
+                response = provider.generate_response(messages)
+            with metrics.stage('filter'):
+                response = filter_json_command(response)
+            if cache_key:
+                response_cache.put(cache_key, response)
         
         # Add assistant response to conversation
-        rosa_expert.add_to_conversation('assistant', response)
+        rosa_expert.add_to_conversation('assistant', response, session_id)
         
         # Prepare response with command execution info if applicable
         response_data = {
             'response': response,
-            'success': True
+            'success': True,
+            'cached': bool(cached),
+            'usage': None if cached else provider.get_last_usage()
         }
         
         if command_output:
-            response_data['command_executed'] = {
-                'command': executed_command,
-                'success': command_output['success'],
-                'output': command_output['output'],
-                'error': command_output['error']
-            }
+            response_data['command_executed'] = command_executed_payload(executed_command, command_output)
         
         return jsonify(response_data)
         
@@ -325,12 +636,108 @@ Please ask me again if you'd like me to check this for you."""
         }), 500
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Handle chat messages as a Server-Sent-Events stream.
+    
+    Events: 'command' (if a command was executed), then 'token' deltas,
+    then 'done' - or 'error' if generation fails.
+    """
+    provider, error = resolve_provider()
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+    
+    data = request.json or {}
+    user_message = data.get('message', '')
+    
+    if not user_message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    session_id = get_session_id(data)
+    if not session_id:
+        return jsonify({'error': 'Invalid session id'}), 400
+    
+    def generate():
+        try:
+            executed_command, command_output = detect_and_execute_command(user_message)
+            messages, cache_key = start_chat_turn(
+                provider, user_message, session_id, executed_command, command_output
+            )
+            
+            if command_output:
+                yield sse_event('command', command_executed_payload(executed_command, command_output))
+            
+            cached = response_cache.get(cache_key) if cache_key else None
+            if cached:
+                response = cached['response']
+                yield sse_event('token', {'delta': response})
+            else:
+                chunks = []
+                with metrics.llm_request(provider, messages, mode='stream') as timer:
+                    for delta in filter_json_command_stream(provider.generate_stream(messages)):
+                        timer.first_token()
+                        chunks.append(delta)
+                        yield sse_event('token', {'delta': delta})
+                response = ''.join(chunks)
+                if cache_key:
+                    response_cache.put(cache_key, response)
+            
+            rosa_expert.add_to_conversation('assistant', response, session_id)
+            
+            yield sse_event('done', {
+                'success': True,
+                'cached': bool(cached),
+                'usage': None if cached else provider.get_last_usage()
+            })
+            
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield sse_event('error', {'error': f'Error generating response: {str(e)}'})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def batch_error(commands, mode):
+    """
+    Validate a batch of commands for /api/execute.
+    
+    Returns:
+        None if the batch may run, otherwise the error message
+    """
+    if not isinstance(commands, list) or not commands \
+            or not all(isinstance(command, str) and command for command in commands):
+        return 'commands must be a non-empty list of command strings'
+    if len(commands) > CLI_MAX_BATCH:
+        return f'At most {CLI_MAX_BATCH} commands may be run in one request'
+    if mode not in EXECUTION_MODES:
+        return f"mode must be one of: {', '.join(EXECUTION_MODES)}"
+    return None
+
+
 @app.route('/api/execute', methods=['POST'])
 def execute_command():
-    """Execute a CLI command"""
+    """Execute a CLI command, or several via 'commands' and 'mode'"""
     try:
         data = request.json
         command = data.get('command', '')
+        commands = data.get('commands')
+        
+        # Several commands: fan out (or run sequentially, stopping on failure)
+        if commands is not None:
+            mode = data.get('mode', 'parallel')
+            error = batch_error(commands, mode)
+            if error:
+                return jsonify({'error': error}), 400
+            results = cli_executor.execute_many(commands, mode=mode)
+            return jsonify({
+                'success': all(result['success'] for result in results) and len(results) == len(commands),
+                'results': results
+            })
         
         if not command:
             return jsonify({'error': 'Command is required'}), 400
@@ -348,6 +755,105 @@ def execute_command():
         }), 500
 
 
+@app.route('/api/execute/<output_id>/output', methods=['GET'])
+def get_command_output(output_id):
+    """Full stdout (or ?stream=stderr) of a command whose result was shortened in a chat response"""
+    path = output_shaper.output_path(output_id, request.args.get('stream', 'stdout'))
+    if not path:
+        return jsonify({'error': 'Output not found'}), 404
+    return send_file(path, mimetype='text/plain')
+
+
+@app.route('/api/execute/stream', methods=['POST'])
+def execute_command_stream():
+    """
+    Execute a CLI command, streaming its output as Server-Sent Events.
+    
+    Events: 'line' ({stream, line}) as output is produced, then 'exit' with the
+    final result (output/error hold only the retained tail). Comment lines are
+    sent as heartbeats while the command is silent.
+    """
+    data = request.json or {}
+    command = data.get('command', '')
+    
+    if not command:
+        return jsonify({'error': 'Command is required'}), 400
+    
+    try:
+        timeout = int(data['timeout']) if data.get('timeout') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'timeout must be an integer number of seconds'}), 400
+    
+    def generate():
+        for event in cli_executor.execute_stream(command, timeout=timeout):
+            event_type = event.pop('type')
+            if event_type == 'heartbeat':
+                yield ': keep-alive\n\n'
+            else:
+                yield sse_event(event_type, event)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List recent background jobs"""
+    return jsonify({'jobs': job_manager.list()})
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Run a CLI command as a background job"""
+    data = request.json or {}
+    command = data.get('command', '')
+    
+    if not command:
+        return jsonify({'error': 'Command is required'}), 400
+    
+    rejection = cli_executor.check_command(command)
+    if rejection:
+        return jsonify({'error': rejection}), 400
+    
+    try:
+        timeout = int(data['timeout']) if data.get('timeout') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'timeout must be an integer number of seconds'}), 400
+    
+    return jsonify(job_manager.submit(command, timeout=timeout)), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a background job's status"""
+    job = job_manager.get(job_id) if JOB_ID_PATTERN.match(job_id) else None
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running background job"""
+    job = job_manager.cancel(job_id) if JOB_ID_PATTERN.match(job_id) else None
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/log', methods=['GET'])
+def get_job_log(job_id):
+    """Read a background job's log from a byte offset (?offset=)"""
+    offset = request.args.get('offset', 0, type=int)
+    log = job_manager.read_log(job_id, offset=offset) if JOB_ID_PATTERN.match(job_id) else None
+    if not log:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(log)
+
+
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
     """Get current LLM provider settings"""
@@ -355,11 +861,7 @@ def get_settings():
     
     # Mask API keys in response
     if 'config' in settings:
-        # Mask api_key if present (for any provider)
-        if 'api_key' in settings['config']:
-            api_key = settings['config']['api_key']
-            if api_key:
-                settings['config']['api_key'] = api_key[:8] + '...' + api_key[-4:] if len(api_key) > 12 else '***'
+        settings['config'] = mask_api_keys(settings['config'])
     
     return jsonify(settings)
 
@@ -420,13 +922,25 @@ def update_settings():
         }), 500
 
 
+@app.route('/api/debug/startup', methods=['GET'])
+def debug_startup():
+    """Startup timing of this worker: phases and the slowest imports"""
+    limit = request.args.get('limit', 25, type=int)
+    return jsonify(startup_profile.report(limit=limit))
+
+
 @app.route('/api/conversation/clear', methods=['POST'])
 def clear_conversation():
-    """Clear conversation history"""
-    rosa_expert.clear_conversation()
+    """Clear a session's conversation history"""
+    session_id = get_session_id(request.get_json(silent=True))
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Invalid session id'}), 400
+    
+    rosa_expert.clear_conversation(session_id)
     return jsonify({'success': True})
 
 
 if __name__ == '__main__':
+    warm_up_worker()
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=os.getenv('DEBUG', 'False').lower() == 'true')
@@ -0,0 +1,264 @@
+"""
+ASGI Entry Point
+
+Async serving mode (SERVER_MODE=asgi). Chat, command execution and health
+endpoints run as native async routes: LLM calls and CLI subprocesses are
+awaited, so one worker multiplexes many in-flight conversations instead of
+holding a thread per request. Every other route is served by the Flask app,
+mounted as WSGI.
+
+Run with: gunicorn --config backend/gunicorn.conf.py (SERVER_MODE=asgi),
+or uvicorn backend.asgi:app
+"""
+
+import contextlib
+import functools
+import logging
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import backend.app as wsgi
+from backend import metrics
+from backend.async_executor import AsyncCLIExecutor
+
+logger = logging.getLogger(__name__)
+
+async_executor = AsyncCLIExecutor(wsgi.cli_executor)
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+async def read_json(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def timed(endpoint):
+    """Record request latency for a native route (Flask routes record their own)"""
+    @functools.wraps(endpoint)
+    async def wrapper(request: Request):
+        started = time.perf_counter()
+        response = await endpoint(request)
+        metrics.observe_request(endpoint.__name__, request.method, response.status_code,
+                                time.perf_counter() - started)
+        return response
+    return wrapper
+
+
+async def detect_and_execute_command(user_message):
+    """Async counterpart of app.detect_and_execute_command"""
+    with metrics.stage('intent'):
+        command = wsgi.detect_command(user_message)
+    if not command:
+        return None, None
+    mirror = wsgi.state_mirror
+    with metrics.stage('cli'):
+        mirrored = mirror.lookup(command) if mirror else None
+        if mirrored:
+            return command, await run_in_threadpool(wsgi.output_shaper.shape, command, mirrored)
+        result = await async_executor.execute(command)
+    if mirror:
+        mirror.track(command, result)
+    # Shaping may write the full output to disk
+    return command, await run_in_threadpool(wsgi.output_shaper.shape, command, result)
+
+
+async def health_check(request: Request):
+    """Health check endpoint (reads cached CLI versions only)"""
+    inventory = wsgi.version_inventory.snapshot()
+    provider = wsgi.current_provider
+    return JSONResponse({
+        'status': 'healthy',
+        'provider': provider.__class__.__name__ if provider else 'None',
+        'cli_tools': inventory['versions'],
+        'cli_tools_age_seconds': inventory['age_seconds']
+    })
+
+
+async def readiness_check(request: Request):
+    """Readiness endpoint - not ready until this worker's provider warm-up has run"""
+    ready = wsgi.warmup_done.is_set()
+    return JSONResponse({
+        'status': 'ready' if ready else 'warming',
+        'warmup': dict(wsgi.warmup_state)
+    }, status_code=200 if ready else 503)
+
+
+async def liveness_check(request: Request):
+    """Liveness endpoint - does no I/O at all"""
+    return JSONResponse({'status': 'alive'})
+
+
+async def chat(request: Request):
+    """Handle chat messages with automatic command execution"""
+    provider, error = wsgi.resolve_provider()
+    if error:
+        return JSONResponse({'error': error[0]}, status_code=error[1])
+
+    data = await read_json(request)
+    user_message = data.get('message', '')
+    if not user_message:
+        return JSONResponse({'error': 'Message is required'}, status_code=400)
+
+    session_id = wsgi.get_session_id(data)
+    if not session_id:
+        return JSONResponse({'error': 'Invalid session id'}, status_code=400)
+
+    try:
+        executed_command, command_output = await detect_and_execute_command(user_message)
+        # Conversation store and context assembly are blocking; keep them off the event loop
+        messages, cache_key = await run_in_threadpool(
+            wsgi.start_chat_turn, provider, user_message, session_id, executed_command, command_output
+        )
+
+        cache = wsgi.response_cache
+        cached = cache.get(cache_key) if cache_key else None
+        usage = None
+        if cached:
+            response = cached['response']
+        else:
+            with metrics.llm_request(provider, messages):
+                response = await provider.agenerate_response(messages)
+                usage = provider.get_last_usage()
+            with metrics.stage('filter'):
+                response = wsgi.filter_json_command(response)
+            if cache_key:
+                cache.put(cache_key, response)
+
+        await run_in_threadpool(wsgi.rosa_expert.add_to_conversation, 'assistant', response, session_id)
+
+        response_data = {
+            'response': response,
+            'success': True,
+            'cached': bool(cached),
+            'usage': usage
+        }
+        if command_output:
+            response_data['command_executed'] = wsgi.command_executed_payload(executed_command, command_output)
+        return JSONResponse(response_data)
+
+    except Exception as e:
+        logger.error(f"Chat error: {e}")
+        return JSONResponse({'error': f'Error generating response: {str(e)}'}, status_code=500)
+
+
+async def chat_stream(request: Request):
+    """
+    Handle chat messages as a Server-Sent-Events stream.
+
+    Events: 'command' (if a command was executed), then 'token' deltas,
+    then 'done' - or 'error' if generation fails.
+    """
+    provider, error = wsgi.resolve_provider()
+    if error:
+        return JSONResponse({'error': error[0]}, status_code=error[1])
+
+    data = await read_json(request)
+    user_message = data.get('message', '')
+    if not user_message:
+        return JSONResponse({'error': 'Message is required'}, status_code=400)
+
+    session_id = wsgi.get_session_id(data)
+    if not session_id:
+        return JSONResponse({'error': 'Invalid session id'}, status_code=400)
+
+    async def generate():
+        try:
+            executed_command, command_output = await detect_and_execute_command(user_message)
+            messages, cache_key = await run_in_threadpool(
+                wsgi.start_chat_turn, provider, user_message, session_id, executed_command, command_output
+            )
+
+            if command_output:
+                yield wsgi.sse_event('command', wsgi.command_executed_payload(executed_command, command_output))
+
+            cache = wsgi.response_cache
+            cached = cache.get(cache_key) if cache_key else None
+            usage = None
+            if cached:
+                response = cached['response']
+                yield wsgi.sse_event('token', {'delta': response})
+            else:
+                chunks = []
+                stream_filter = wsgi.JSONCommandStreamFilter()
+                with metrics.llm_request(provider, messages, mode='stream') as timer:
+                    async for delta in provider.agenerate_stream(messages):
+                        text = stream_filter.feed(delta)
+                        if text:
+                            timer.first_token()
+                            chunks.append(text)
+                            yield wsgi.sse_event('token', {'delta': text})
+                    usage = provider.get_last_usage()
+                text = stream_filter.finish()
+                if text:
+                    chunks.append(text)
+                    yield wsgi.sse_event('token', {'delta': text})
+                response = ''.join(chunks)
+                if cache_key:
+                    cache.put(cache_key, response)
+
+            await run_in_threadpool(wsgi.rosa_expert.add_to_conversation, 'assistant', response, session_id)
+
+            yield wsgi.sse_event('done', {'success': True, 'cached': bool(cached), 'usage': usage})
+
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield wsgi.sse_event('error', {'error': f'Error generating response: {str(e)}'})
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+async def execute_command(request: Request):
+    """Execute a CLI command, or several via 'commands' and 'mode'"""
+    try:
+        data = await read_json(request)
+        command = data.get('command', '')
+        commands = data.get('commands')
+
+        if commands is not None:
+            mode = data.get('mode', 'parallel')
+            error = wsgi.batch_error(commands, mode)
+            if error:
+                return JSONResponse({'error': error}, status_code=400)
+            results = await async_executor.execute_many(commands, mode=mode)
+            return JSONResponse({
+                'success': all(result['success'] for result in results) and len(results) == len(commands),
+                'results': results
+            })
+
+        if not command:
+            return JSONResponse({'error': 'Command is required'}, status_code=400)
+
+        return JSONResponse(await async_executor.execute(command))
+
+    except Exception as e:
+        logger.error(f"Command execution error: {e}")
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Under gunicorn the post_worker_init hook has already warmed up (this is then a no-op)
+    await run_in_threadpool(wsgi.warm_up_worker)
+    yield
+
+
+app = Starlette(lifespan=lifespan, routes=[
+    Route('/api/health', timed(health_check), methods=['GET']),
+    Route('/api/health/ready', timed(readiness_check), methods=['GET']),
+    Route('/api/health/live', timed(liveness_check), methods=['GET']),
+    Route('/api/chat', timed(chat), methods=['POST']),
+    Route('/api/chat/stream', timed(chat_stream), methods=['POST']),
+    Route('/api/execute', timed(execute_command), methods=['POST']),
+    # Everything else (settings, jobs, streaming execution, static files) stays on Flask
+    Mount('/', app=WSGIMiddleware(wsgi.app)),
+])
@@ -0,0 +1,164 @@
+"""
+Async CLI Execution Engine
+
+asyncio-based execution of whitelisted CLI commands with bounded
+concurrency, per-command timeouts and cancellation. Shares validation and
+the result cache with the wrapped CLIExecutor.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from backend.cli_executor import CLIExecutor
+from backend.command_sandbox import CommandSandbox
+
+logger = logging.getLogger(__name__)
+
+# A command, or a (command, timeout_seconds) pair
+CommandSpec = Union[str, Tuple[str, int]]
+
+EXECUTION_MODES = ('parallel', 'sequential-stop-on-failure')
+
+
+class AsyncCLIExecutor:
+    """Run CLI commands as asyncio subprocesses"""
+
+    def __init__(self, cli_executor: CLIExecutor, max_concurrency: Optional[int] = None):
+        self.cli_executor = cli_executor
+        self.max_concurrency = max_concurrency or int(os.getenv('CLI_MAX_CONCURRENCY', 4))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the event loop they are first used on
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def execute(self, command: str, timeout: Optional[int] = None, use_cache: bool = True) -> Dict[str, any]:
+        """
+        Execute a whitelisted command without blocking the event loop.
+
+        Returns the same dict shape as CLIExecutor.execute. Cancelling the
+        awaiting task kills the subprocess.
+        """
+        executor = self.cli_executor
+        rejection = executor.check_command(command)
+        if rejection:
+            return executor.command_error(rejection)
+        command = executor.sandbox.canonical(command)
+
+        cached = executor.cached_result(command) if use_cache else None
+        if cached:
+            logger.info(f"Serving cached result for: {command}")
+            return cached
+
+        timeout = timeout or executor.timeout
+        run_command, structured = executor.prepare_command(command)
+        async with self._get_semaphore():
+            executor.invalidate_if_mutating(command)
+            started = time.monotonic()
+            try:
+                result = await self._run(run_command, timeout)
+                if structured and result.get('truncated') and run_command != command:
+                    logger.warning(f"Structured output exceeded the output cap, rerunning as plain text: {command}")
+                    result = await self._run(command, timeout)
+                    structured = False
+            except asyncio.CancelledError:
+                # The killed command may still have changed state
+                executor.invalidate_if_mutating(command)
+                raise
+        if structured:
+            result = executor.add_structured_output(command, result)
+
+        executor.record_result(command, result, time.monotonic() - started)
+        return dict(result, cached=False)
+
+    async def _run(self, command: str, timeout: int) -> Dict[str, any]:
+        logger.info(f"Executing command (async): {command}")
+        sandbox = self.cli_executor.sandbox
+        try:
+            argv, options = sandbox.process_options(sandbox.parse(command))
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                **options
+            )
+        except Exception as e:
+            logger.error(f"Command execution error: {e}")
+            return self.cli_executor.command_error(str(e))
+        sandbox.limit(process.pid)
+
+        try:
+            (stdout, stdout_truncated), (stderr, stderr_truncated) = await asyncio.wait_for(asyncio.gather(
+                self._read_capped(process, process.stdout, sandbox.max_output_bytes),
+                self._read_capped(process, process.stderr, sandbox.max_output_bytes)
+            ), timeout=timeout)
+            await process.wait()
+        except asyncio.TimeoutError:
+            logger.error(f"Command timeout: {command}")
+            await self._kill(process)
+            return self.cli_executor.command_error(f'Command timed out after {timeout} seconds')
+        except asyncio.CancelledError:
+            logger.info(f"Command cancelled: {command}")
+            await self._kill(process)
+            raise
+
+        return self.cli_executor.process_result(process.returncode, stdout, stderr,
+                                                stdout_truncated or stderr_truncated)
+
+    @staticmethod
+    async def _read_capped(process: asyncio.subprocess.Process, stream: asyncio.StreamReader,
+                           max_bytes: int) -> Tuple[bytes, bool]:
+        """Read a stream to EOF keeping at most max_bytes; the process is killed beyond that"""
+        data = bytearray()
+        while True:
+            chunk = await stream.read(64 * 1024)
+            if not chunk:
+                return bytes(data), False
+            room = max_bytes - len(data)
+            data += chunk[:room]
+            if len(chunk) > room:
+                CommandSandbox.kill(process.pid)
+                return bytes(data), True
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process):
+        if process.returncode is None:
+            CommandSandbox.kill(process.pid)
+            await process.wait()
+
+    async def execute_many(self, commands: List[CommandSpec], mode: str = 'parallel',
+                           use_cache: bool = True) -> List[Dict[str, any]]:
+        """
+        Execute several commands.
+
+        Modes:
+            parallel: run all commands concurrently (bounded by max_concurrency);
+                results are returned in input order
+            sequential-stop-on-failure: run in order, stopping after the first
+                failed command (so fewer results than commands may be returned)
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {mode}")
+
+        specs = [(spec, None) if isinstance(spec, str) else tuple(spec) for spec in commands]
+
+        if mode == 'parallel':
+            return list(await asyncio.gather(
+                *(self.execute(command, timeout, use_cache) for command, timeout in specs)
+            ))
+
+        results = []
+        for command, timeout in specs:
+            result = await self.execute(command, timeout, use_cache)
+            results.append(result)
+            if not result['success']:
+                break
+        return results
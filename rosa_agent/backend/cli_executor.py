@@ -1,75 +1,355 @@
+import asyncio
 import subprocess
 import shlex
-from typing import Dict, List, Tuple
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import logging
 
+from backend import metrics
+from backend.command_sandbox import ALLOWED_SUBCOMMANDS, CommandRejected, CommandSandbox
+from backend.output_parsers import parse_output, render_summary, structured_command
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class CommandResultCache:
+    """
+    TTL + LRU cache for results of read-only CLI commands.
+    
+    Entries expire per command class and the cache is bounded by the total
+    size of cached output in bytes.
+    """
+    
+    # TTL in seconds per command class
+    DEFAULT_TTLS = {
+        'version': 3600,
+        'regions': 3600,
+        'list': 30,
+        'describe': 30,
+        'get': 15
+    }
+    
+    READ_ONLY_VERBS = {'list', 'get', 'describe', 'version', '--version'}
+    
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttls: Optional[Dict[str, int]] = None):
+        self.max_bytes = max_bytes
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def normalize(parts: List[str]) -> str:
+        return ' '.join(parts)
+    
+    @classmethod
+    def is_read_only(cls, parts: List[str]) -> bool:
+        return any(verb in cls.READ_ONLY_VERBS for verb in parts[1:3])
+    
+    @classmethod
+    def is_mutating(cls, parts: List[str]) -> bool:
+        """
+        Whether a command may change state. Anything not known to be read-only
+        counts (rosa hibernate, oc new-project, oc rollout, ...), so cached and
+        mirrored results are never served past a change.
+        """
+        return len(parts) > 1 and not cls.is_read_only(parts)
+    
+    def classify(self, parts: List[str]) -> Optional[str]:
+        """Return the command class of a read-only command, or None if not cacheable"""
+        verbs = parts[1:3]
+        if not self.is_read_only(parts):
+            return None
+        if 'regions' in parts:
+            return 'regions'
+        if 'version' in verbs or '--version' in verbs:
+            return 'version'
+        for verb in verbs:
+            if verb in self.ttls:
+                return verb
+        return None
+    
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires_at'] < time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry['result'], cached=True, cache_age=round(time.time() - entry['stored_at'], 1))
+    
+    def put(self, key: str, command_class: str, result: Dict):
+        size = sum(len(result.get(key) or '') for key in ('output', 'error', 'summary'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                'result': result,
+                'size': size,
+                'stored_at': now,
+                'expires_at': now + self.ttls[command_class]
+            }
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+    
+    def invalidate(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class OutputTail:
+    """Ring buffer keeping the last max_bytes of a stream's lines"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.lines = deque()
+        self.bytes = 0
+        self.total_bytes = 0
+        self.truncated = False
+    
+    def append(self, line: str):
+        size = len(line)
+        self.lines.append(line)
+        self.bytes += size
+        self.total_bytes += size
+        while self.bytes > self.max_bytes and len(self.lines) > 1:
+            self.bytes -= len(self.lines.popleft())
+            self.truncated = True
+    
+    def text(self) -> str:
+        return ''.join(self.lines)
+
+
 class CLIExecutor:
     """Safe execution of whitelisted CLI commands"""
     
-    # Whitelisted command prefixes
-    ALLOWED_COMMANDS = [
-        'rosa',
-        'oc',
-        'aws',
-        'ocm'
-    ]
+    # Whitelisted tools (each with its allowed subcommands, see command_sandbox)
+    ALLOWED_COMMANDS = list(ALLOWED_SUBCOMMANDS)
+    
+    # Emit a heartbeat when a streamed command is silent this long (keeps proxies from closing the stream)
+    STREAM_HEARTBEAT_INTERVAL = 15
     
-    def __init__(self, timeout: int = 60):
+    # Longest line read from a streamed command in one piece
+    STREAM_MAX_LINE_BYTES = 64 * 1024
+    
+    # Command that prints each tool's version
+    VERSION_COMMANDS = {
+        'rosa': 'rosa version',
+        'oc': 'oc version --client',
+        'aws': 'aws --version',
+        'ocm': 'ocm version'
+    }
+    
+    def __init__(self, timeout: int = 60, cache: Optional[CommandResultCache] = None,
+                 stream_timeout: int = 3600, stream_retained_bytes: int = 64 * 1024,
+                 structured_output: bool = True, structured_max_rows: int = 50,
+                 sandbox: Optional[CommandSandbox] = None):
         self.timeout = timeout
+        self.cache = cache
+        self.stream_timeout = stream_timeout
+        self.stream_retained_bytes = stream_retained_bytes
+        self.structured_output = structured_output
+        self.structured_max_rows = structured_max_rows
+        self.sandbox = sandbox or CommandSandbox()
+        # Called when a mutating command starts and after it ran (e.g. to invalidate mirrored state)
+        self.mutation_listeners: List[Callable[[], None]] = []
+    
+    @classmethod
+    def from_env(cls) -> 'CLIExecutor':
+        """Create an executor configured from CLI_* environment variables"""
+        cache = None
+        if os.getenv('CLI_CACHE_ENABLED', 'true').lower() == 'true':
+            cache = CommandResultCache(max_bytes=int(os.getenv('CLI_CACHE_MAX_BYTES', 8 * 1024 * 1024)))
+        return cls(
+            timeout=int(os.getenv('CLI_TIMEOUT', 60)),
+            cache=cache,
+            stream_timeout=int(os.getenv('CLI_STREAM_TIMEOUT', 3600)),
+            stream_retained_bytes=int(os.getenv('CLI_STREAM_RETAINED_BYTES', 64 * 1024)),
+            structured_output=os.getenv('CLI_STRUCTURED_OUTPUT', 'true').lower() == 'true',
+            structured_max_rows=int(os.getenv('CLI_STRUCTURED_MAX_ROWS', 50)),
+            sandbox=CommandSandbox.from_env()
+        )
     
     def validate_command(self, command: str) -> bool:
         """Validate that command is in whitelist"""
+        return self.check_command(command) is None
+    
+    def check_command(self, command: str) -> Optional[str]:
+        """
+        Check a command against the tool and subcommand allowlist.
+        
+        Returns:
+            None if the command may run, otherwise the error message
+        """
         try:
-            parts = shlex.split(command)
-            if not parts:
-                return False
-            
-            # Check if first part (command) is in whitelist
-            base_command = parts[0]
-            return any(base_command.startswith(allowed) for allowed in self.ALLOWED_COMMANDS)
-        except Exception as e:
-            logger.error(f"Command validation error: {e}")
-            return False
+            self.sandbox.parse(command)
+        except CommandRejected as e:
+            return f'Command not allowed. {e}'
+        return None
     
-    def execute(self, command: str) -> Dict[str, any]:
+    def execute(self, command: str, use_cache: bool = True) -> Dict[str, any]:
         """
         Execute a whitelisted command safely
         
+        Read-only commands are served from the result cache when possible;
+        mutating commands invalidate it. Supported read commands are run with
+        JSON (or compact columns) output (see prepare_command); if that output
+        exceeds the sandbox's cap, the command is rerun as plain text.
+        
         Returns:
-            Dict with keys: success (bool), output (str), error (str), exit_code (int)
+            Dict with keys: success (bool), output (str), error (str), exit_code (int),
+            cached (bool), and for structured commands: structured (kind, columns,
+            records) and summary (condensed table)
         """
         # Validate command
-        if not self.validate_command(command):
-            return {
-                'success': False,
-                'output': '',
-                'error': f'Command not allowed. Only {", ".join(self.ALLOWED_COMMANDS)} commands are permitted.',
-                'exit_code': -1
-            }
+        rejection = self.check_command(command)
+        if rejection:
+            return self.command_error(rejection)
+        command = self.sandbox.canonical(command)
+        
+        cached = self.cached_result(command) if use_cache else None
+        if cached:
+            logger.info(f"Serving cached result for: {command}")
+            return cached
+        
+        run_command, structured = self.prepare_command(command)
+        self.invalidate_if_mutating(command)
+        started = time.monotonic()
+        result = self._run(run_command)
+        if structured and result.get('truncated') and run_command != command:
+            logger.warning(f"Structured output exceeded the output cap, rerunning as plain text: {command}")
+            result = self._run(command)
+        elif structured:
+            result = self.add_structured_output(command, result)
+        self.record_result(command, result, time.monotonic() - started)
+        return dict(result, cached=False)
+    
+    def prepare_command(self, command: str) -> Tuple[str, bool]:
+        """
+        The command line to run for a requested command.
         
+        Returns:
+            Tuple of (command to run, structured) - structured commands are
+            switched to JSON (or compact columns) output and parsed by
+            add_structured_output()
+        """
+        if not self.structured_output:
+            return command, False
+        parts = shlex.split(command)
+        structured_parts = structured_command(parts)
+        if structured_parts is None:
+            return command, False
+        return shlex.join(structured_parts), True
+    
+    def add_structured_output(self, command: str, result: Dict[str, any]) -> Dict[str, any]:
+        """Parse a structured command's output into records and a condensed table"""
+        if not result['success']:
+            return result
+        structured = parse_output(shlex.split(command), result['output'])
+        if not structured:
+            return result
+        return dict(result, structured=structured, summary=render_summary(structured, self.structured_max_rows))
+    
+    def cached_result(self, command: str) -> Optional[Dict[str, any]]:
+        """Return a cached result for a read-only command, if one is fresh"""
+        if not self.cache:
+            return None
+        parts = shlex.split(command)
+        if not self.cache.classify(parts):
+            return None
+        cached = self.cache.get(self.cache.normalize(parts))
+        if cached:
+            metrics.observe_command(parts, cached)
+        return cached
+    
+    def record_result(self, command: str, result: Dict[str, any], duration: Optional[float] = None):
+        """
+        Record a command's metrics, then cache a read-only command's result or
+        invalidate the cache after a mutating one
+        """
+        parts = shlex.split(command)
+        metrics.observe_command(parts, result, duration)
+        if CommandResultCache.is_mutating(parts):
+            logger.info(f"Mutating command executed, invalidating cached state: {command}")
+            self.notify_mutation()
+            return
+        if not self.cache:
+            return
+        command_class = self.cache.classify(parts)
+        if command_class and result['success'] and not result.get('truncated'):
+            self.cache.put(self.cache.normalize(parts), command_class, result)
+    
+    def invalidate_if_mutating(self, command: str):
+        """
+        Invalidate cached state for a mutating command. Called when it starts,
+        so nothing cached before it is served while it runs, and again when it
+        finishes (via record_result) or is stopped early.
+        """
+        if CommandResultCache.is_mutating(shlex.split(command)):
+            self.notify_mutation()
+    
+    def notify_mutation(self):
+        """Drop cached results and tell mutation listeners (e.g. the state mirror) that state changed"""
+        if self.cache:
+            self.cache.invalidate()
+        for listener in self.mutation_listeners:
+            listener()
+    
+    def command_error(self, error: str) -> Dict[str, any]:
+        """Result dict for a command that could not be run"""
+        return {
+            'success': False,
+            'output': '',
+            'error': error,
+            'exit_code': -1,
+            'cached': False
+        }
+    
+    def _run(self, command: str) -> Dict[str, any]:
+        """Run a validated command in a sandboxed subprocess (no shell)"""
         try:
             logger.info(f"Executing command: {command}")
             
             # Execute command
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
+            process = self.sandbox.popen(
+                self.sandbox.parse(command),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
             )
+            stdout, stderr, truncated = self.sandbox.communicate(process, self.timeout)
             
-            return {
-                'success': result.returncode == 0,
-                'output': result.stdout,
-                'error': result.stderr,
-                'exit_code': result.returncode
-            }
+            return self.process_result(process.returncode, stdout, stderr, truncated)
             
         except subprocess.TimeoutExpired:
             logger.error(f"Command timeout: {command}")
@@ -88,29 +368,150 @@ class CLIExecutor:
                 'exit_code': -1
             }
     
+    def process_result(self, exit_code: int, stdout: bytes, stderr: bytes, truncated: bool) -> Dict[str, any]:
+        """Result dict for a finished process; a process stopped at the output cap is a failure"""
+        result = {
+            'success': exit_code == 0 and not truncated,
+            'output': stdout.decode(errors='replace'),
+            'error': stderr.decode(errors='replace'),
+            'exit_code': exit_code
+        }
+        if truncated:
+            message = f'Output exceeded {self.sandbox.max_output_bytes} bytes; command was stopped'
+            result['error'] = f"{result['error']}\n{message}" if result['error'] else message
+            result['truncated'] = True
+        return result
+    
+    def execute_stream(self, command: str, timeout: Optional[int] = None) -> Iterator[Dict[str, any]]:
+        """
+        Execute a whitelisted command, yielding its output line by line as it is produced.
+        
+        Yields dicts with a 'type' key:
+            line: {'stream': 'stdout'|'stderr', 'line': str}
+            heartbeat: nothing was printed for STREAM_HEARTBEAT_INTERVAL seconds
+            exit: final result in the same shape as execute(), where output and
+                error hold only the retained tail (see stream_retained_bytes),
+                plus 'truncated' and 'total_bytes'
+        
+        Closing the generator early kills the process.
+        """
+        rejection = self.check_command(command)
+        if rejection:
+            yield dict(self.command_error(rejection), type='exit', truncated=False, total_bytes=0)
+            return
+        command = self.sandbox.canonical(command)
+        
+        timeout = timeout or self.stream_timeout
+        logger.info(f"Executing command (streaming): {command}")
+        self.invalidate_if_mutating(command)
+        started = time.monotonic()
+        recorded = False
+        
+        try:
+            process = self.sandbox.popen(
+                self.sandbox.parse(command),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+        except Exception as e:
+            logger.error(f"Command execution error: {e}")
+            yield dict(self.command_error(str(e)), type='exit', truncated=False, total_bytes=0)
+            return
+        
+        lines = queue.Queue()
+        
+        def pump(pipe, stream_name):
+            # Read incrementally; bounded readline keeps huge lines from being buffered whole
+            with pipe:
+                for raw in iter(lambda: pipe.readline(self.STREAM_MAX_LINE_BYTES), b''):
+                    lines.put((stream_name, raw.decode(errors='replace')))
+            lines.put((stream_name, None))
+        
+        readers = [
+            threading.Thread(target=pump, args=(process.stdout, 'stdout'), daemon=True),
+            threading.Thread(target=pump, args=(process.stderr, 'stderr'), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+        
+        tails = {
+            'stdout': OutputTail(self.stream_retained_bytes),
+            'stderr': OutputTail(self.stream_retained_bytes)
+        }
+        deadline = time.monotonic() + timeout
+        open_streams = 2
+        timed_out = False
+        
+        try:
+            while open_streams:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                try:
+                    stream_name, line = lines.get(timeout=min(remaining, self.STREAM_HEARTBEAT_INTERVAL))
+                except queue.Empty:
+                    yield {'type': 'heartbeat'}
+                    continue
+                
+                if line is None:
+                    open_streams -= 1
+                    continue
+                
+                tails[stream_name].append(line)
+                yield {'type': 'line', 'stream': stream_name, 'line': line}
+            
+            if timed_out:
+                logger.error(f"Command timeout: {command}")
+                self.sandbox.kill(process.pid)
+            exit_code = process.wait()
+            
+            result = {
+                'success': exit_code == 0 and not timed_out,
+                'output': tails['stdout'].text(),
+                'error': tails['stderr'].text(),
+                'exit_code': -1 if timed_out else exit_code,
+                'cached': False,
+                'truncated': tails['stdout'].truncated or tails['stderr'].truncated,
+                'total_bytes': tails['stdout'].total_bytes + tails['stderr'].total_bytes
+            }
+            if timed_out:
+                timeout_message = f'Command timed out after {timeout} seconds'
+                result['error'] = f"{result['error']}\n{timeout_message}" if result['error'] else timeout_message
+            
+            self.record_result(command, result, time.monotonic() - started)
+            recorded = True
+            yield dict(result, type='exit')
+        finally:
+            if process.poll() is None:
+                logger.info(f"Stream closed, killing command: {command}")
+                self.sandbox.kill(process.pid)
+                process.wait()
+            if not recorded:
+                # Cancelled or closed early: the command may still have changed state
+                self.invalidate_if_mutating(command)
+    
+    def execute_many(self, commands: List, mode: str = 'parallel', use_cache: bool = True) -> List[Dict[str, any]]:
+        """
+        Execute several commands via the asyncio engine (see AsyncCLIExecutor.execute_many).
+        
+        Must not be called from a running event loop; async callers should use
+        AsyncCLIExecutor directly.
+        """
+        from backend.async_executor import AsyncCLIExecutor
+        
+        return asyncio.run(AsyncCLIExecutor(self).execute_many(commands, mode=mode, use_cache=use_cache))
+    
     def execute_multiple(self, commands: List[str]) -> List[Dict[str, any]]:
-        """Execute multiple commands sequentially"""
-        results = []
-        for cmd in commands:
-            result = self.execute(cmd)
-            results.append(result)
-            # Stop on first failure
-            if not result['success']:
-                break
-        return results
+        """Execute multiple commands sequentially, stopping on the first failure"""
+        return self.execute_many(commands, mode='sequential-stop-on-failure')
     
     def get_cli_versions(self) -> Dict[str, str]:
-        """Get versions of installed CLI tools"""
-        version_commands = {
-            'rosa': 'rosa version',
-            'oc': 'oc version --client',
-            'aws': 'aws --version',
-            'ocm': 'ocm version'
-        }
+        """Get versions of installed CLI tools (probed concurrently, never cached)"""
+        results = self.execute_many(list(self.VERSION_COMMANDS.values()), mode='parallel', use_cache=False)
         
         versions = {}
-        for tool, cmd in version_commands.items():
-            result = self.execute(cmd)
+        for tool, result in zip(self.VERSION_COMMANDS, results):
             if result['success']:
                 versions[tool] = result['output'].strip()
             else:
@@ -0,0 +1,280 @@
+"""
+Command Sandbox
+
+Validation and process setup for CLI commands. Commands are tokenized once
+and executed directly (no /bin/sh), so characters such as ;, | or ` are
+passed to the tool as literal arguments (e.g. an aws --query expression)
+and never chain commands. Only allowlisted tools and subcommands run, with a
+minimal environment (no LLM API keys), no inherited file descriptors or
+stdin, a CPU-time limit, and a cap on captured output. The environment,
+allowlist and limits are built once per executor.
+"""
+
+import logging
+import os
+import re
+import selectors
+import shlex
+import shutil
+import signal
+import subprocess
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# First argument allowed per tool. Interactive or shell-like subcommands
+# (oc exec/rsh/debug/port-forward, aws ssm, ...) are deliberately left out.
+ALLOWED_SUBCOMMANDS: Dict[str, Set[str]] = {
+    'rosa': {
+        'attach', 'create', 'delete', 'describe', 'detach', 'edit', 'grant', 'hibernate', 'init', 'install',
+        'link', 'list', 'login', 'logs', 'register', 'resume', 'revoke', 'uninstall', 'unlink', 'upgrade',
+        'verify', 'version', 'whoami'
+    },
+    'oc': {
+        'adm', 'annotate', 'api-resources', 'api-versions', 'apply', 'auth', 'create', 'delete', 'describe',
+        'edit', 'explain', 'expose', 'get', 'label', 'login', 'logs', 'new-app', 'new-project', 'patch',
+        'project', 'projects', 'rollout', 'scale', 'set', 'status', 'top', 'version', 'wait', 'whoami'
+    },
+    'aws': {
+        'account', 'cloudformation', 'ec2', 'ecr', 'efs', 'elb', 'elbv2', 'iam', 'kms', 'organizations',
+        'resourcegroupstaggingapi', 'route53', 's3', 's3api', 'service-quotas', 'servicequotas', 'sts', 'support'
+    },
+    'ocm': {
+        'account', 'cluster', 'create', 'delete', 'describe', 'edit', 'get', 'hibernate', 'list', 'login',
+        'patch', 'resume', 'version', 'whoami'
+    },
+}
+
+# Accepted as the first argument of any allowed tool
+ALWAYS_ALLOWED = {'version', '--version', 'help', '--help', '-h'}
+
+# Global options accepted before the subcommand, taking a value (as '--flag value' or '--flag=value')...
+GLOBAL_VALUE_FLAGS: Dict[str, Set[str]] = {
+    'rosa': {'--profile', '--region'},
+    'oc': {
+        '-n', '--namespace', '--context', '--cluster', '--user', '--kubeconfig', '--server', '-s', '--token',
+        '--as', '--as-group', '--request-timeout', '--loglevel', '-v', '--v'
+    },
+    'aws': {
+        '--region', '--profile', '--output', '--query', '--endpoint-url', '--ca-bundle', '--color',
+        '--cli-read-timeout', '--cli-connect-timeout', '--cli-binary-format'
+    },
+    'ocm': set(),
+}
+
+# ...or without one
+GLOBAL_BOOL_FLAGS: Dict[str, Set[str]] = {
+    'rosa': {'--debug'},
+    'oc': {'--insecure-skip-tls-verify'},
+    'aws': {'--debug', '--no-verify-ssl', '--no-paginate', '--no-sign-request', '--no-cli-pager'},
+    'ocm': {'--debug'},
+}
+
+# Nothing runs through a shell, so only characters that cannot be passed as arguments are rejected
+CONTROL_CHARACTERS = re.compile(r'[\x00\r\n]')
+
+# Environment passed to commands: these variables plus any with the prefixes below
+ENV_PASSTHROUGH = (
+    'PATH', 'HOME', 'USER', 'LANG', 'LC_ALL', 'TZ', 'TMPDIR', 'XDG_CONFIG_HOME', 'KUBECONFIG',
+    'SSL_CERT_FILE', 'SSL_CERT_DIR', 'REQUESTS_CA_BUNDLE',
+    'HTTP_PROXY', 'HTTPS_PROXY', 'NO_PROXY', 'http_proxy', 'https_proxy', 'no_proxy'
+)
+ENV_PREFIXES = ('AWS_', 'ROSA_', 'OCM_')
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class CommandRejected(ValueError):
+    """A command that is not allowed to run"""
+
+
+class CommandSandbox:
+    """Validates commands and starts them as sandboxed processes"""
+
+    def __init__(self, allowed_subcommands: Optional[Dict[str, Set[str]]] = None, max_cpu_seconds: int = 600,
+                 max_output_bytes: int = 16 * 1024 * 1024, env_passthrough: Iterable[str] = ()):
+        self.allowed_subcommands = allowed_subcommands or ALLOWED_SUBCOMMANDS
+        self.max_cpu_seconds = max_cpu_seconds
+        self.max_output_bytes = max_output_bytes
+        self.env = self.build_env(env_passthrough)
+        self._executables: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls) -> 'CommandSandbox':
+        """Create a sandbox from CLI_MAX_CPU_SECONDS, CLI_MAX_OUTPUT_BYTES and CLI_ENV_PASSTHROUGH"""
+        return cls(
+            max_cpu_seconds=int(os.getenv('CLI_MAX_CPU_SECONDS', 600)),
+            max_output_bytes=int(os.getenv('CLI_MAX_OUTPUT_BYTES', 16 * 1024 * 1024)),
+            env_passthrough=[name.strip() for name in os.getenv('CLI_ENV_PASSTHROUGH', '').split(',')
+                             if name.strip()]
+        )
+
+    @staticmethod
+    def build_env(extra: Iterable[str] = ()) -> Dict[str, str]:
+        """Minimal environment for commands: CLI configuration and credentials, nothing else"""
+        names = set(ENV_PASSTHROUGH) | set(extra)
+        return {
+            name: value for name, value in os.environ.items()
+            if name in names or name.startswith(ENV_PREFIXES)
+        }
+
+    @property
+    def tools(self) -> List[str]:
+        return list(self.allowed_subcommands)
+
+    def parse(self, command: str) -> List[str]:
+        """
+        Tokenize and validate a command.
+
+        Global options given before the subcommand (`oc -n ns get pods`) are
+        moved after it (`oc get pods -n ns`); the CLIs accept them anywhere,
+        and the rest of the executor expects the subcommand at argv[1].
+
+        Returns:
+            The argv to execute
+
+        Raises:
+            CommandRejected: with the reason the command may not run
+        """
+        try:
+            argv = shlex.split(command)
+        except ValueError as e:
+            raise CommandRejected(f'Could not parse command: {e}')
+        if not argv:
+            raise CommandRejected('Command is empty')
+
+        tool = argv[0]
+        if tool not in self.allowed_subcommands:
+            raise CommandRejected(f'Only {", ".join(self.allowed_subcommands)} commands are permitted.')
+        if any(CONTROL_CHARACTERS.search(arg) for arg in argv):
+            raise CommandRejected('Arguments may not contain NUL or newline characters.')
+
+        index = self._subcommand_index(argv)
+        if index < len(argv):
+            subcommand = argv[index]
+            if subcommand not in self.allowed_subcommands[tool] and subcommand not in ALWAYS_ALLOWED:
+                raise CommandRejected(f"'{tool} {subcommand}' is not a permitted subcommand.")
+        if index == 1:
+            return argv
+
+        global_flags, rest = argv[1:index], argv[index:]
+        if '--' in rest:
+            separator = rest.index('--')
+            return [tool] + rest[:separator] + global_flags + rest[separator:]
+        return [tool] + rest + global_flags
+
+    @staticmethod
+    def _subcommand_index(argv: List[str]) -> int:
+        """Position of the subcommand, after any global options"""
+        tool = argv[0]
+        index = 1
+        while index < len(argv) and argv[index].startswith('-') and argv[index] not in ALWAYS_ALLOWED:
+            name = argv[index].split('=', 1)[0]
+            if name in GLOBAL_BOOL_FLAGS.get(tool, ()):
+                index += 1
+            elif name in GLOBAL_VALUE_FLAGS.get(tool, ()):
+                index += 1 if '=' in argv[index] else 2
+            else:
+                raise CommandRejected(f"Unknown option '{argv[index]}' before the '{tool}' subcommand.")
+        return index
+
+    def canonical(self, command: str) -> str:
+        """A validated command with global options moved after the subcommand (unchanged if there were none)"""
+        argv = self.parse(command)
+        return command if argv == shlex.split(command) else shlex.join(argv)
+
+    def resolve(self, tool: str) -> str:
+        """Absolute path of a tool on the sandbox PATH (cached once found)"""
+        path = self._executables.get(tool)
+        if path is None:
+            path = shutil.which(tool, path=self.env.get('PATH', os.defpath))
+            if path is None:
+                raise FileNotFoundError(f'{tool}: command not found')
+            self._executables[tool] = path
+        return path
+
+    def process_options(self, argv: List[str]) -> Tuple[List[str], Dict]:
+        """Resolved argv and the Popen options shared by the sync and async runners"""
+        return [self.resolve(argv[0])] + argv[1:], {
+            'stdin': subprocess.DEVNULL,
+            'env': self.env,
+            'close_fds': True,
+            # Own process group, so kill() also stops any children the tool started
+            'start_new_session': True
+        }
+
+    def limit(self, pid: int):
+        """Apply the CPU-time limit to a started process (SIGXCPU at the limit, SIGKILL shortly after)"""
+        if not self.max_cpu_seconds or resource is None or not hasattr(resource, 'prlimit'):
+            return
+        try:
+            resource.prlimit(pid, resource.RLIMIT_CPU, (self.max_cpu_seconds, self.max_cpu_seconds + 5))
+        except (ProcessLookupError, PermissionError, OSError) as e:
+            logger.debug(f"Could not set CPU limit on {pid}: {e}")
+
+    @staticmethod
+    def kill(pid: int):
+        """Kill a started command and its process group"""
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def popen(self, argv: List[str], **kwargs) -> subprocess.Popen:
+        """Start a validated command (argv from parse())"""
+        resolved, options = self.process_options(argv)
+        process = subprocess.Popen(resolved, **dict(options, **kwargs))
+        self.limit(process.pid)
+        return process
+
+    def communicate(self, process: subprocess.Popen, timeout: float) -> Tuple[bytes, bytes, bool]:
+        """
+        Read a process's stdout and stderr until it exits, keeping at most
+        max_output_bytes of each; a process that exceeds the cap or the
+        timeout is killed.
+
+        Returns:
+            Tuple of (stdout, stderr, truncated)
+
+        Raises:
+            subprocess.TimeoutExpired: if the process is still running after timeout seconds
+        """
+        buffers = {process.stdout: bytearray(), process.stderr: bytearray()}
+        deadline = time.monotonic() + timeout
+        truncated = False
+        with selectors.DefaultSelector() as selector:
+            for pipe in buffers:
+                selector.register(pipe, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.kill(process.pid)
+                    for pipe in buffers:
+                        pipe.close()
+                    process.wait()
+                    raise subprocess.TimeoutExpired(process.args, timeout)
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fd, READ_CHUNK_BYTES)
+                    buffer = buffers[key.fileobj]
+                    room = self.max_output_bytes - len(buffer)
+                    buffer += chunk[:room]
+                    if len(chunk) > room:
+                        truncated = True
+                        self.kill(process.pid)
+                    if not chunk or len(chunk) > room:
+                        # Stop at EOF or at the cap (without draining what is left)
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+        try:
+            process.wait(timeout=max(deadline - time.monotonic(), 1))
+        except subprocess.TimeoutExpired:
+            self.kill(process.pid)
+            process.wait()
+            raise
+        return bytes(buffers[process.stdout]), bytes(buffers[process.stderr]), truncated
@@ -0,0 +1,207 @@
+"""
+Context Window Manager
+
+Keeps the messages sent to the LLM within a per-provider token budget.
+The latest user turn is always kept (truncated if it alone overflows),
+old command outputs are compacted first, recent turns are kept verbatim,
+and the oldest turns are dropped once the budget is exhausted.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+COMMAND_OUTPUT_MARKER = '[SYSTEM - Command Executed:'
+
+# Rough BPE approximation: words and individual punctuation marks
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+# Per-message overhead for role and formatting tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Smallest share of the latest user turn kept when even the system prompt overflows the budget
+MIN_USER_TOKENS = 200
+
+
+class ContextWindowManager:
+    """Token-budgeted selection of conversation history"""
+
+    # Total context window per provider (prompt + completion)
+    PROVIDER_CONTEXT_WINDOWS = {
+        'openaiprovider': 8192,
+        'groqprovider': 8192,
+        'anthropicprovider': 100000,
+        'localprovider': 4096,
+    }
+    DEFAULT_CONTEXT_WINDOW = 8192
+
+    def __init__(self, completion_reserve: int = 2000, keep_recent: int = 6,
+                 compacted_output_tokens: int = 200, cache_size: int = 4096,
+                 budget_override: Optional[int] = None, trim_step: int = 1):
+        self.completion_reserve = completion_reserve
+        self.keep_recent = keep_recent
+        self.compacted_output_tokens = compacted_output_tokens
+        self.cache_size = cache_size
+        self.budget_override = budget_override
+        self.trim_step = max(1, trim_step)
+        self._token_cache: 'OrderedDict[int, int]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ContextWindowManager':
+        """Create a manager configured from CONTEXT_* environment variables"""
+        budget = os.getenv('CONTEXT_TOKEN_BUDGET')
+        return cls(
+            completion_reserve=int(os.getenv('CONTEXT_COMPLETION_RESERVE', 2000)),
+            keep_recent=int(os.getenv('CONTEXT_KEEP_RECENT', 6)),
+            budget_override=int(budget) if budget else None,
+            trim_step=int(os.getenv('CONTEXT_TRIM_STEP', 4))
+        )
+
+    def budget_for(self, provider_name: Optional[str]) -> int:
+        """Prompt token budget for a provider (context window minus completion reserve)"""
+        if self.budget_override:
+            return self.budget_override
+        window = self.PROVIDER_CONTEXT_WINDOWS.get((provider_name or '').lower(), self.DEFAULT_CONTEXT_WINDOW)
+        return window - self.completion_reserve
+
+    def count_tokens(self, text: str) -> int:
+        """Estimate the number of tokens in a piece of text (cached)"""
+        key = hash(text)
+        with self._lock:
+            cached = self._token_cache.get(key)
+            if cached is not None:
+                self._token_cache.move_to_end(key)
+                return cached
+
+        tokens = len(TOKEN_PATTERN.findall(text))
+
+        with self._lock:
+            self._token_cache[key] = tokens
+            if len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        return tokens
+
+    def message_tokens(self, message: Dict[str, str]) -> int:
+        return self.count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+    @staticmethod
+    def is_command_output(message: Dict[str, str]) -> bool:
+        return COMMAND_OUTPUT_MARKER in message['content']
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Truncate text to roughly max_tokens, keeping its head and tail"""
+        tokens = self.count_tokens(text)
+        if tokens <= max_tokens:
+            return text
+
+        # Scale by this text's own characters-per-token ratio, shrinking
+        # further if the head/tail happen to be denser than average
+        keep_chars = len(text) * max_tokens / tokens
+        for _ in range(4):
+            half = max(1, math.floor(keep_chars) // 2)
+            head = text[:half]
+            tail = text[-half:]
+            omitted_lines = text.count('\n') - head.count('\n') - tail.count('\n')
+            truncated = f"{head}\n... [{max(omitted_lines, 0)} lines omitted to fit context window] ...\n{tail}"
+            truncated_tokens = self.count_tokens(truncated)
+            if truncated_tokens <= max_tokens:
+                break
+            keep_chars *= 0.9 * max_tokens / truncated_tokens
+        return truncated
+
+    def compact(self, message: Dict[str, str], max_tokens: int) -> Dict[str, str]:
+        """Shrink a command output message to at most max_tokens"""
+        return {
+            "role": message['role'],
+            "content": self.truncate(message['content'], max_tokens)
+        }
+
+    def available_tokens(self, system_prompt: str, history: List[Dict[str, str]],
+                         provider_name: Optional[str] = None) -> int:
+        """
+        Tokens left for extra context (e.g. retrieved documentation) once the
+        system prompt, the latest user turn and the recent turns are in.
+        """
+        recent = self.fit(system_prompt, history[-self.keep_recent:] if self.keep_recent else [], provider_name)
+        used = self.count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        used += sum(self.message_tokens(message) for message in recent)
+        return max(self.budget_for(provider_name) - used, 0)
+
+    def fit(self, system_prompt: str, history: List[Dict[str, str]],
+            provider_name: Optional[str] = None, reserved_tokens: int = 0) -> List[Dict[str, str]]:
+        """
+        Select history messages that fit the provider's budget alongside the system prompt.
+
+        The latest user turn is always kept, truncated if it alone would
+        overflow the budget. The rest is walked from the newest message
+        backwards, so only the kept messages are counted. Recent turns are
+        kept verbatim (command outputs are truncated only if they alone would
+        overflow the budget); older command outputs are compacted; everything
+        older than the first message that does not fit is dropped.
+        reserved_tokens are held back for extra context (e.g. retrieved
+        documentation) added after the history - size it with
+        available_tokens() so it never displaces the recent turns.
+        """
+        remaining = (self.budget_for(provider_name) - self.count_tokens(system_prompt)
+                     - MESSAGE_OVERHEAD_TOKENS - reserved_tokens)
+
+        latest_user = next((index for index in range(len(history) - 1, -1, -1)
+                            if history[index]['role'] == 'user'), None)
+        if latest_user is not None:
+            pinned = history[latest_user]
+            if self.message_tokens(pinned) > remaining:
+                pinned = self.compact(pinned, max(remaining - MESSAGE_OVERHEAD_TOKENS, MIN_USER_TOKENS))
+            remaining -= self.message_tokens(pinned)
+
+        selected = []
+        pinned_position = None
+
+        for age, message in enumerate(reversed(history)):
+            index = len(history) - 1 - age
+            if index == latest_user:
+                pinned_position = len(selected)
+                selected.append(pinned)
+                continue
+
+            recent = age < self.keep_recent
+            tokens = self.message_tokens(message)
+
+            if self.is_command_output(message):
+                limit = max(remaining - MESSAGE_OVERHEAD_TOKENS, 0) if recent else self.compacted_output_tokens
+                if tokens > limit + MESSAGE_OVERHEAD_TOKENS:
+                    message = self.compact(message, limit)
+                    tokens = self.message_tokens(message)
+
+            if tokens > remaining:
+                if latest_user is not None and index > latest_user:
+                    # Newer than the latest user turn (e.g. its command output): skip it, keep looking
+                    continue
+                break
+
+            selected.append(message)
+            remaining -= tokens
+
+        selected.reverse()
+        if pinned_position is not None:
+            pinned_position = len(selected) - 1 - pinned_position
+
+        # Drop old turns in blocks of trim_step rather than one per turn, so the
+        # prompt prefix stays identical across several turns and provider-side
+        # prefix caches (Anthropic prompt caching, vLLM prefix caching) keep
+        # hitting - never at the expense of the recent turns
+        dropped = len(history) - len(selected)
+        if dropped:
+            extra = min((-dropped) % self.trim_step, max(len(selected) - self.keep_recent, 0))
+            if pinned_position is not None:
+                extra = min(extra, pinned_position)
+            selected = selected[extra:]
+
+        # Providers expect the conversation to open with a user turn
+        while selected and selected[0]['role'] == 'assistant':
+            selected.pop(0)
+
+        return selected
@@ -0,0 +1,200 @@
+"""
+Conversation Store
+
+Session-keyed storage for conversation history. The in-memory backend is
+per-process; the SQLite backend shares state between gunicorn workers (and
+replicas mounting the same volume).
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ID = 'default'
+
+
+class ConversationStore(ABC):
+    """Abstract base class for session-keyed conversation storage"""
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the conversation history for a session (oldest first)"""
+        pass
+
+    @abstractmethod
+    def append(self, session_id: str, role: str, content: str):
+        """Append a message to a session's conversation"""
+        pass
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        """Delete a session's conversation"""
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Per-process LRU store with idle-session eviction"""
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: int = 3600):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        now = time.time()
+        # Least recently used sessions are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - session['last_active'] > self.idle_ttl:
+                del self._sessions[session_id]
+            else:
+                break
+
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id)
+            if not session:
+                return []
+            session['last_active'] = time.time()
+            self._sessions.move_to_end(session_id)
+            return list(session['messages'])
+
+    def append(self, session_id: str, role: str, content: str):
+        with self._lock:
+            session = self._sessions.setdefault(session_id, {'messages': [], 'last_active': 0})
+            session['messages'].append({
+                "role": role,
+                "content": content
+            })
+            session['last_active'] = time.time()
+            self._sessions.move_to_end(session_id)
+            self._evict()
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """SQLite-backed store shared by every worker that opens the same file"""
+
+    EVICTION_INTERVAL = 60
+
+    def __init__(self, path: str, idle_ttl: int = 3600):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._last_eviction = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_active REAL NOT NULL
+                )
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn: sqlite3.Connection, session_id: str):
+        conn.execute(
+            "INSERT INTO sessions (session_id, last_active) VALUES (?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET last_active = excluded.last_active",
+            (session_id, time.time())
+        )
+
+    def _evict(self, conn: sqlite3.Connection):
+        now = time.time()
+        if now - self._last_eviction < self.EVICTION_INTERVAL:
+            return
+        self._last_eviction = now
+
+        cutoff = now - self.idle_ttl
+        conn.execute(
+            "DELETE FROM messages WHERE session_id IN "
+            "(SELECT session_id FROM sessions WHERE last_active < ?)",
+            (cutoff,)
+        )
+        conn.execute("DELETE FROM sessions WHERE last_active < ?", (cutoff,))
+
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        conn = self._connection()
+        with conn:
+            rows = conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id",
+                (session_id,)
+            ).fetchall()
+            if rows:
+                self._touch(conn, session_id)
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, session_id: str, role: str, content: str):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                (session_id, role, content)
+            )
+            self._touch(conn, session_id)
+            self._evict(conn)
+
+    def clear(self, session_id: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+def create_conversation_store() -> ConversationStore:
+    """Create the conversation store selected by the CONVERSATION_STORE env var"""
+    backend = os.getenv('CONVERSATION_STORE', 'memory').lower()
+    idle_ttl = int(os.getenv('CONVERSATION_IDLE_TTL', 3600))
+
+    if backend == 'sqlite':
+        path = os.getenv('CONVERSATION_DB_PATH', '/app/storage/conversations.db')
+        try:
+            store = SQLiteConversationStore(path, idle_ttl=idle_ttl)
+            logger.info(f"Using SQLite conversation store at {path}")
+            return store
+        except Exception as e:
+            logger.error(f"Failed to open SQLite conversation store at {path}: {e}")
+            logger.warning("Falling back to in-memory conversation store")
+
+    elif backend != 'memory':
+        logger.warning(f"Unknown conversation store '{backend}', using in-memory store")
+
+    return InMemoryConversationStore(
+        max_sessions=int(os.getenv('CONVERSATION_MAX_SESSIONS', 1000)),
+        idle_ttl=idle_ttl
+    )
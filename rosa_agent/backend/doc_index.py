@@ -0,0 +1,210 @@
+"""
+Documentation Retrieval Index
+
+Chunks the Markdown documentation shipped with the agent by heading and
+builds an in-memory inverted index with BM25 scoring, so only the chunks
+relevant to a question are added to the LLM context. The index is
+serialized to disk and rebuilt only when the source files change.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+TERM_PATTERN = re.compile(r'[a-z0-9][a-z0-9\-_.]*[a-z0-9]|[a-z0-9]')
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how',
+    'i', 'if', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'should', 'that', 'the', 'this',
+    'to', 'we', 'what', 'when', 'which', 'with', 'you', 'your'
+}
+
+INDEX_FORMAT_VERSION = 1
+
+DEFAULT_DOC_FILES = [
+    'ROSA Cluster creation agent instructions.md',
+    'OpenShift AI setup.md'
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case terms with stopwords removed"""
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def chunk_markdown(text: str, source: str, max_chars: int = 4000) -> List[Dict[str, str]]:
+    """
+    Split a Markdown document into chunks at headings (ignoring '#' lines inside
+    code fences). Oversized sections are split further at blank lines.
+    """
+    chunks = []
+    headings: List[str] = []
+    lines: List[str] = []
+    in_fence = False
+
+    def flush():
+        body = '\n'.join(lines).strip()
+        if body:
+            for part in _split_oversized(body, max_chars):
+                chunks.append({
+                    'source': source,
+                    'heading': ' > '.join(headings) or source,
+                    'text': part
+                })
+
+    for line in text.splitlines():
+        if line.lstrip().startswith('```'):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            lines = []
+            level = len(match.group(1))
+            headings = headings[:level - 1] + [match.group(2)]
+        else:
+            lines.append(line)
+    flush()
+    return chunks
+
+
+def _split_oversized(body: str, max_chars: int) -> List[str]:
+    if len(body) <= max_chars:
+        return [body]
+    parts = []
+    current = ''
+    for paragraph in body.split('\n\n'):
+        if current and len(current) + len(paragraph) > max_chars:
+            parts.append(current.strip())
+            current = ''
+        current += paragraph + '\n\n'
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class DocIndex:
+    """BM25 index over Markdown documentation chunks"""
+
+    def __init__(self, paths: List[str], cache_path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.paths = paths
+        self.cache_path = cache_path
+        self.k1 = k1
+        self.b = b
+        self.chunks: List[Dict[str, str]] = []
+        self.postings: Dict[str, List[List[int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_length = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'DocIndex':
+        """Create and load an index configured from DOCS_* environment variables"""
+        docs_dir = os.getenv('DOCS_DIR', '/app')
+        files = os.getenv('DOCS_FILES')
+        names = [name.strip() for name in files.split(',')] if files else DEFAULT_DOC_FILES
+        index = cls(
+            [os.path.join(docs_dir, name) for name in names],
+            cache_path=os.getenv('DOCS_INDEX_PATH', '/app/storage/doc_index.json')
+        )
+        index.load()
+        return index
+
+    def _manifest(self) -> Dict[str, List[int]]:
+        manifest = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                manifest[path] = [stat.st_mtime_ns, stat.st_size]
+            except FileNotFoundError:
+                continue
+        return manifest
+
+    def load(self):
+        """Load the serialized index if it matches the source files, otherwise rebuild it"""
+        manifest = self._manifest()
+        if not manifest:
+            logger.warning(f"No documentation found to index (looked for {', '.join(self.paths)})")
+            return
+
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path) as f:
+                    cached = json.load(f)
+                if cached.get('version') == INDEX_FORMAT_VERSION and cached.get('manifest') == manifest:
+                    self._set(cached['chunks'], cached['postings'], cached['doc_lengths'])
+                    logger.info(f"Loaded documentation index ({len(self.chunks)} chunks) from {self.cache_path}")
+                    return
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable documentation index {self.cache_path}: {e}")
+
+        self.build()
+        if self.cache_path:
+            self._save(manifest)
+
+    def build(self):
+        """Chunk the documents and build the inverted index"""
+        chunks = []
+        for path in self.paths:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    chunks.extend(chunk_markdown(f.read(), os.path.basename(path)))
+            except FileNotFoundError:
+                continue
+
+        postings = defaultdict(list)
+        doc_lengths = []
+        for chunk_id, chunk in enumerate(chunks):
+            terms = tokenize(f"{chunk['heading']}\n{chunk['text']}")
+            doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings[term].append([chunk_id, frequency])
+
+        self._set(chunks, dict(postings), doc_lengths)
+        logger.info(f"Built documentation index: {len(chunks)} chunks, {len(postings)} terms")
+
+    def _set(self, chunks, postings, doc_lengths):
+        self.chunks = chunks
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+
+    def _save(self, manifest):
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'version': INDEX_FORMAT_VERSION,
+                    'manifest': manifest,
+                    'chunks': self.chunks,
+                    'postings': self.postings,
+                    'doc_lengths': self.doc_lengths
+                }, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save documentation index to {self.cache_path}: {e}")
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict]:
+        """Return the top_k chunks for a query, scored with BM25"""
+        if not self.chunks:
+            return []
+
+        total = len(self.chunks)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [dict(self.chunks[chunk_id], score=round(score, 3)) for chunk_id, score in ranked]
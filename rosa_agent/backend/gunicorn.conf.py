@@ -0,0 +1,51 @@
+"""
+Gunicorn configuration
+
+SERVER_MODE=wsgi (default): threaded workers (gthread) keep heartbeating
+while request threads are busy, so long-lived streaming responses (SSE chat,
+/api/execute/stream) are not killed by the worker timeout, and one worker
+can serve several requests.
+
+SERVER_MODE=asgi: uvicorn workers serving backend.asgi:app, where chat and
+command execution are awaited on an event loop, so a single worker can
+multiplex dozens of in-flight conversations.
+"""
+
+import os
+
+server_mode = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+if server_mode == 'asgi':
+    wsgi_app = 'backend.asgi:app'
+    workers = int(os.getenv('GUNICORN_WORKERS', 1))
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.app:app'
+    workers = int(os.getenv('GUNICORN_WORKERS', 2))
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+
+def on_starting(server):
+    # Start each run with an empty multiprocess metrics directory
+    metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def post_worker_init(worker):
+    # Warm the LLM provider before this worker accepts connections, so
+    # readiness probes are only answered by warmed workers
+    from backend.app import warm_up_worker
+    warm_up_worker()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,162 @@
+"""
+Intent Router
+
+Maps chat messages to the CLI commands that answer infrastructure state
+questions. The phrase index and regexes are built once at import; routing
+looks up each message token in the index, so its cost grows with message
+length rather than with the number of intents.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Quoted commands or code blocks in a message
+COMMAND_PATTERNS = [
+    re.compile(r'`([^`]+)`'),  # Backtick code
+    re.compile(r'"([^"]+)"'),  # Double quotes
+    re.compile(r"'([^']+)'"),  # Single quotes
+]
+
+EXECUTION_KEYWORDS = {'run', 'execute', 'check', 'list', 'show', 'get', 'describe', 'verify'}
+CLI_TOOLS = {'rosa', 'oc', 'aws', 'ocm'}
+
+# (intent name, required phrases, command). Every phrase must appear in the
+# message; None commands mark questions that need a cluster name first.
+STATE_QUERY_INTENTS = [
+    # Cluster count/list queries
+    ('count_clusters', ('how many', 'cluster'), 'rosa list clusters'),
+    ('list_clusters', ('list', 'cluster'), 'rosa list clusters'),
+    ('which_clusters', ('what cluster', 'do i have'), 'rosa list clusters'),
+    ('show_clusters', ('show', 'cluster'), 'rosa list clusters'),
+    ('active_clusters', ('active cluster',), 'rosa list clusters'),
+
+    # Cluster status queries (require a cluster name)
+    ('cluster_ready', ('cluster', 'ready'), None),
+    ('cluster_status', ('cluster', 'status'), None),
+    ('deployment_complete', ('deployment', 'complete'), None),
+
+    # Node queries
+    ('count_nodes', ('how many', 'node'), 'oc get nodes'),
+    ('which_nodes', ('what node',), 'oc get nodes'),
+    ('list_nodes', ('list', 'node'), 'oc get nodes'),
+    ('show_nodes', ('show', 'node'), 'oc get nodes'),
+
+    # Version queries
+    ('openshift_versions', ('what version',), 'rosa list versions --output json'),
+    ('openshift_version', ('openshift version',), 'oc version'),
+    ('rosa_version', ('rosa version',), 'rosa version'),
+
+    # Pod/workload queries
+    ('running_workloads', ('what', 'running'), 'oc get pods -A'),
+    ('list_pods', ('list', 'pod'), 'oc get pods -A'),
+    ('show_pods', ('show', 'pod'), 'oc get pods -A'),
+
+    # Region queries
+    ('which_regions', ('what region',), 'rosa list regions'),
+    ('available_regions', ('available region',), 'rosa list regions'),
+]
+
+
+def normalize_token(token: str) -> str:
+    """Reduce simple plurals so 'clusters' matches 'cluster' (but not 'clusterrolebinding')"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize_token(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+class IntentRouter:
+    """Phrase-indexed router from messages to ranked candidate commands"""
+
+    def __init__(self, intents: List[Tuple[str, Tuple[str, ...], Optional[str]]]):
+        self.intents = []
+        # first token -> [(phrase tokens, phrase id)]
+        self._phrases_by_first_token: Dict[str, List[Tuple[Tuple[str, ...], int]]] = defaultdict(list)
+        # phrase id -> indices of intents requiring it
+        self._intents_by_phrase: Dict[int, List[int]] = defaultdict(list)
+        phrase_ids: Dict[Tuple[str, ...], int] = {}
+
+        for index, (name, phrases, command) in enumerate(intents):
+            required = []
+            for phrase in phrases:
+                tokens = tuple(tokenize(phrase))
+                if tokens not in phrase_ids:
+                    phrase_ids[tokens] = len(phrase_ids)
+                    self._phrases_by_first_token[tokens[0]].append((tokens, phrase_ids[tokens]))
+                self._intents_by_phrase[phrase_ids[tokens]].append(index)
+                required.append(tokens)
+
+            self.intents.append({
+                'intent': name,
+                'command': command,
+                'required': len(required),
+                # More (and longer) required phrases make a match more specific
+                'specificity': sum(len(tokens) for tokens in required)
+            })
+
+        self._max_specificity = max((intent['specificity'] for intent in self.intents), default=1)
+
+    def route(self, message: str) -> List[Dict]:
+        """
+        Return the intents matched by a message, best first.
+
+        Each match is a dict with keys: intent, command, confidence (0-1).
+        """
+        tokens = tokenize(message)
+
+        matched_phrases = set()
+        for position, token in enumerate(tokens):
+            for phrase, phrase_id in self._phrases_by_first_token.get(token, ()):
+                if tuple(tokens[position:position + len(phrase)]) == phrase:
+                    matched_phrases.add(phrase_id)
+
+        hits = defaultdict(int)
+        for phrase_id in matched_phrases:
+            for index in self._intents_by_phrase[phrase_id]:
+                hits[index] += 1
+
+        matches = []
+        for index, count in hits.items():
+            intent = self.intents[index]
+            if count == intent['required']:
+                matches.append((index, {
+                    'intent': intent['intent'],
+                    'command': intent['command'],
+                    'confidence': round(0.5 + 0.5 * intent['specificity'] / self._max_specificity, 2)
+                }))
+
+        # Highest confidence first; ties keep declaration order
+        matches.sort(key=lambda item: (-item[1]['confidence'], item[0]))
+        return [match for _, match in matches]
+
+    def best_command(self, message: str) -> Optional[Dict]:
+        """Return the highest-ranked match that maps to a command, if any"""
+        for match in self.route(message):
+            if match['command']:
+                return match
+        return None
+
+
+def extract_explicit_commands(message: str) -> List[str]:
+    """
+    Return quoted or backticked text from a message that explicitly asks to
+    run a CLI command (candidates still need validating).
+    """
+    tokens = set(TOKEN_PATTERN.findall(message.lower()))
+    if not (tokens & EXECUTION_KEYWORDS and tokens & CLI_TOOLS):
+        return []
+
+    candidates = []
+    for pattern in COMMAND_PATTERNS:
+        candidates.extend(pattern.findall(message))
+    return candidates
+
+
+# Built once at import
+router = IntentRouter(STATE_QUERY_INTENTS)
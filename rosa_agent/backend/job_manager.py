@@ -0,0 +1,332 @@
+"""
+Background Job Manager
+
+Runs long CLI operations (cluster creation, account-role setup, operator
+installs) as background jobs on a bounded worker pool. Job status and logs
+are persisted under a shared directory, so any gunicorn worker can report
+on a job regardless of which one is running it. A log keeps at most the
+first JOB_MAX_LOG_BYTES of output; the end of the output is appended when
+the job finishes.
+"""
+
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r'^[a-f0-9]{12}$')
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def utf8_boundary(data: bytes) -> int:
+    """Length of data without a UTF-8 character cut off at its end"""
+    for back in range(1, min(len(data), 4) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            # Continuation byte: keep looking for the start of the character
+            continue
+        if byte >= 0xF0:
+            size = 4
+        elif byte >= 0xE0:
+            size = 3
+        elif byte >= 0xC0:
+            size = 2
+        else:
+            size = 1
+        return len(data) - back if size > back else len(data)
+    return len(data)
+
+
+class CappedLog:
+    """
+    Job log file of at most about max_bytes: the head of the output is
+    written as it arrives, and once it fills the cap less tail_bytes only
+    the last tail_bytes are kept, appended by finish() - so the file stays
+    append-only for readers following it by offset.
+    """
+
+    def __init__(self, f, max_bytes: int, tail_bytes: int = 64 * 1024):
+        self.f = f
+        self.max_bytes = max_bytes
+        self.tail_bytes = min(tail_bytes, max_bytes // 4)
+        self.head_bytes = max_bytes - self.tail_bytes
+        self.size = 0
+        self.omitted = 0
+        self._tail = deque()
+        self._tail_size = 0
+
+    def write(self, data: bytes):
+        if not self._tail and self.size + len(data) <= self.head_bytes:
+            self._append(data)
+            return
+        if not self._tail:
+            self._append(f"[... log limit of {self.max_bytes} bytes reached; "
+                         f"the end of the output is added when the job finishes ...]\n".encode())
+        self._tail.append(data)
+        self._tail_size += len(data)
+        while self._tail_size > self.tail_bytes and len(self._tail) > 1:
+            dropped = self._tail.popleft()
+            self._tail_size -= len(dropped)
+            self.omitted += len(dropped)
+
+    def finish(self):
+        """Append the kept end of the output (if the log went over the cap)"""
+        if self.omitted:
+            self._append(f"[... {self.omitted} bytes omitted ...]\n".encode())
+        while self._tail:
+            self._append(self._tail.popleft())
+        self._tail_size = 0
+
+    def _append(self, data: bytes):
+        self.f.write(data)
+        self.f.flush()
+        self.size += len(data)
+
+
+class JobManager:
+    """Background execution of CLI commands with persisted status and logs"""
+
+    # How often a running job checks for a cancel request from another worker
+    CANCEL_POLL_INTERVAL = 1.0
+
+    def __init__(self, cli_executor, storage_dir: str = '/app/storage/jobs', max_workers: int = 2,
+                 default_timeout: int = 7200, retention: int = 7 * 24 * 3600,
+                 max_log_bytes: int = 16 * 1024 * 1024):
+        self.cli_executor = cli_executor
+        self.storage_dir = storage_dir
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.retention = retention
+        self.max_log_bytes = max_log_bytes
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+
+        try:
+            os.makedirs(storage_dir, exist_ok=True)
+        except OSError as e:
+            self.storage_dir = os.path.join(tempfile.gettempdir(), 'rosa-agent-jobs')
+            logger.warning(f"Cannot use job storage {storage_dir} ({e}), using {self.storage_dir}")
+            os.makedirs(self.storage_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, cli_executor) -> 'JobManager':
+        """Create a job manager configured from JOB_* environment variables"""
+        return cls(
+            cli_executor,
+            storage_dir=os.getenv('JOB_STORAGE_DIR', '/app/storage/jobs'),
+            max_workers=int(os.getenv('JOB_MAX_CONCURRENT', 2)),
+            default_timeout=int(os.getenv('JOB_TIMEOUT', 7200)),
+            max_log_bytes=int(os.getenv('JOB_MAX_LOG_BYTES', 16 * 1024 * 1024))
+        )
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.storage_dir, f"{job_id}{suffix}")
+
+    def _save(self, job: Dict):
+        # Write atomically so readers in other workers never see a partial file
+        path = self._path(job['id'], '.json')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(job_id, '.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _update(self, job_id: str, **fields) -> Optional[Dict]:
+        """Update a job's fields, returning the job (None if it was deleted, e.g. pruned by another worker)"""
+        with self._lock:
+            job = self._load(job_id)
+            if job is None:
+                logger.warning(f"Job {job_id} no longer exists, not updating it")
+                return None
+            job.update(fields)
+            self._save(job)
+            return job
+
+    def _owner_alive(self, job: Dict) -> bool:
+        host, _, pid = job.get('owner', '').rpartition(':')
+        if host != socket.gethostname():
+            # Owned by another pod; we cannot check it
+            return True
+        try:
+            os.kill(int(pid), 0)
+            return True
+        except (ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            return True
+
+    def _refresh_status(self, job: Dict) -> Optional[Dict]:
+        """Mark jobs whose owning worker has died as interrupted (None if the job was deleted meanwhile)"""
+        if job['status'] in ACTIVE_STATUSES and not self._owner_alive(job):
+            job = self._update(job['id'], status='interrupted', finished_at=time.time())
+        return job
+
+    def submit(self, command: str, timeout: Optional[int] = None) -> Dict:
+        """Queue a command to run in the background and return the new job"""
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'command': command,
+            'status': 'queued',
+            'owner': self.owner,
+            'timeout': timeout or self.default_timeout,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'exit_code': None,
+            'error': None,
+            'log_bytes': 0,
+            'log_omitted_bytes': 0
+        }
+        with self._lock:
+            self._save(job)
+        open(self._path(job['id'], '.log'), 'w').close()
+
+        self._pool.submit(self._run, job['id'])
+        logger.info(f"Queued job {job['id']}: {command}")
+        return job
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        return os.path.exists(self._path(job_id, '.cancel'))
+
+    def _run(self, job_id: str):
+        job = self._load(job_id)
+        if job is None:
+            return
+        if self._cancel_requested(job_id):
+            self._update(job_id, status='cancelled', finished_at=time.time())
+            return
+
+        self._update(job_id, status='running', started_at=time.time())
+        next_cancel_check = 0.0
+        stream = self.cli_executor.execute_stream(job['command'], timeout=job['timeout'])
+
+        with open(self._path(job_id, '.log'), 'ab') as f:
+            log = CappedLog(f, self.max_log_bytes)
+            try:
+                for event in stream:
+                    if event['type'] == 'line':
+                        log.write(event['line'].encode())
+                    elif event['type'] == 'exit':
+                        log.finish()
+                        self._update(
+                            job_id,
+                            status='succeeded' if event['success'] else 'failed',
+                            exit_code=event['exit_code'],
+                            error=None if event['success'] else event['error'][-2000:],
+                            finished_at=time.time(),
+                            log_bytes=log.size,
+                            log_omitted_bytes=log.omitted
+                        )
+                        return
+
+                    now = time.monotonic()
+                    if now >= next_cancel_check:
+                        next_cancel_check = now + self.CANCEL_POLL_INTERVAL
+                        if self._cancel_requested(job_id):
+                            logger.info(f"Cancelling job {job_id}")
+                            stream.close()
+                            log.finish()
+                            self._update(job_id, status='cancelled', finished_at=time.time(),
+                                         log_bytes=log.size, log_omitted_bytes=log.omitted)
+                            return
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                stream.close()
+                log.finish()
+                self._update(job_id, status='failed', error=str(e), finished_at=time.time(),
+                             log_bytes=log.size, log_omitted_bytes=log.omitted)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a job's current status, or None if it does not exist"""
+        job = self._load(job_id)
+        return self._refresh_status(job) if job else None
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        """Return the most recent jobs (newest first), pruning expired finished jobs"""
+        jobs = []
+        cutoff = time.time() - self.retention
+        for name in os.listdir(self.storage_dir):
+            if not name.endswith('.json'):
+                continue
+            job = self._load(name[:-len('.json')])
+            if not job:
+                continue
+            if job['status'] not in ACTIVE_STATUSES and (job['finished_at'] or job['created_at']) < cutoff:
+                self._delete(job['id'])
+                continue
+            job = self._refresh_status(job)
+            if job:
+                jobs.append(job)
+
+        jobs.sort(key=lambda job: job['created_at'], reverse=True)
+        return jobs[:limit]
+
+    def _delete(self, job_id: str):
+        for suffix in ('.json', '.log', '.cancel'):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Request cancellation of a job (honoured by whichever worker runs it)"""
+        job = self.get(job_id)
+        if job and job['status'] in ACTIVE_STATUSES:
+            open(self._path(job_id, '.cancel'), 'w').close()
+        return job
+
+    def read_log(self, job_id: str, offset: int = 0, limit: int = 64 * 1024) -> Optional[Dict]:
+        """
+        Read a job's log from a byte offset. A read never ends inside a
+        UTF-8 character: next_offset is the start of the first character not
+        returned, so following reads decode cleanly.
+
+        Returns:
+            Dict with keys: data (str), offset (int), next_offset (int),
+            complete (bool - the job has finished and all output has been read),
+            or None if the job does not exist
+        """
+        job = self.get(job_id)
+        if not job:
+            return None
+
+        offset = max(offset, 0)
+        try:
+            with open(self._path(job_id, '.log'), 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(limit)
+                at_end = not f.read(1)
+        except FileNotFoundError:
+            # Pruned by another worker since get()
+            return None
+        # A cut-off character is returned by the next read (unless nothing else would fit)
+        complete_length = utf8_boundary(chunk) or len(chunk)
+        at_end = at_end and complete_length == len(chunk)
+        chunk = chunk[:complete_length]
+        next_offset = offset + len(chunk)
+
+        return {
+            'data': chunk.decode(errors='replace'),
+            'offset': offset,
+            'next_offset': next_offset,
+            'status': job['status'],
+            'complete': at_end and job['status'] not in ACTIVE_STATUSES
+        }
@@ -1,9 +1,81 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Dict, Iterator, Optional, Tuple
+import asyncio
 import os
-import openai
-import anthropic
-import requests
+import json
+import logging
+import random
+import threading
+import time
+
+from backend.rate_limiter import shared_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+_async_io_pool: Optional[ThreadPoolExecutor] = None
+_async_io_pool_lock = threading.Lock()
+
+
+def async_io_pool() -> ThreadPoolExecutor:
+    """
+    Thread pool that runs blocking provider calls for the async API.
+    
+    Sized by LLM_ASYNC_THREADS rather than the default executor's CPU-based
+    limit, since the threads only wait on network I/O.
+    """
+    global _async_io_pool
+    with _async_io_pool_lock:
+        if _async_io_pool is None:
+            _async_io_pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv('LLM_ASYNC_THREADS', 64)),
+                thread_name_prefix='llm-io'
+            )
+        return _async_io_pool
+
+
+def openai_usage(usage: Optional[Dict]) -> Optional[Dict[str, int]]:
+    """
+    Normalize OpenAI-compatible token usage (OpenAI, Groq, vLLM).
+    
+    cache_read_tokens come from prompt_tokens_details.cached_tokens (OpenAI
+    prompt caching, vLLM automatic prefix caching); these APIs do not bill
+    cache writes separately.
+    """
+    if not usage:
+        return None
+    details = usage.get('prompt_tokens_details') or {}
+    return {
+        'input_tokens': usage.get('prompt_tokens', 0),
+        'output_tokens': usage.get('completion_tokens', 0),
+        'cache_read_tokens': details.get('cached_tokens') or 0,
+        'cache_write_tokens': 0
+    }
+
+
+def iter_openai_sse(response, on_usage: Optional[Callable[[Dict], None]] = None) -> Iterator[str]:
+    """
+    Yield content deltas from an OpenAI-compatible SSE chat completion stream.
+    
+    If the stream reports token usage (stream_options.include_usage, or Groq's
+    x_groq.usage), it is passed to on_usage.
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            break
+        chunk = json.loads(data)
+        usage = chunk.get('usage') or (chunk.get('x_groq') or {}).get('usage')
+        if usage and on_usage:
+            on_usage(openai_usage(usage))
+        choices = chunk.get('choices') or []
+        if choices:
+            content = (choices[0].get('delta') or {}).get('content')
+            if content:
+                yield content
 
 
 class LLMProvider(ABC):
@@ -14,36 +86,216 @@ class LLMProvider(ABC):
         """Generate a response from the LLM"""
         pass
     
+    def generate_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        """
+        Generate a response from the LLM as an iterator of text deltas.
+        
+        Providers without native streaming fall back to yielding the whole
+        completion as a single delta.
+        """
+        yield self.generate_response(messages, **kwargs)
+    
+    async def agenerate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Async generate_response for ASGI mode.
+        
+        The default runs the blocking call on async_io_pool() so the event
+        loop stays free; get_last_usage() reports its usage when read right
+        after the await.
+        """
+        def call():
+            response = self.generate_response(messages, **kwargs)
+            return response, self.get_last_usage()
+        
+        response, usage = await asyncio.get_running_loop().run_in_executor(async_io_pool(), call)
+        self._record_usage(usage)
+        return response
+    
+    async def agenerate_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """
+        Async generate_stream for ASGI mode.
+        
+        The default drains the blocking stream on async_io_pool() and hands
+        deltas to the event loop through a queue. Closing the iterator early
+        stops the underlying stream.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed
+                stopped.set()
+        
+        def pump():
+            stream = self.generate_stream(messages, **kwargs)
+            try:
+                for delta in stream:
+                    if stopped.is_set():
+                        return
+                    put(('delta', delta))
+                put(('done', self.get_last_usage()))
+            except Exception as e:
+                put(('error', e))
+            finally:
+                stream.close()
+        
+        loop.run_in_executor(async_io_pool(), pump)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == 'delta':
+                    yield value
+                elif kind == 'done':
+                    self._record_usage(value)
+                    return
+                else:
+                    raise value
+        finally:
+            stopped.set()
+    
     @abstractmethod
     def validate_config(self) -> bool:
         """Validate provider configuration"""
         pass
+    
+    def connect(self):
+        """Open connections to the provider ahead of the first request (no-op by default)"""
+        pass
+    
+    def warm_up(self, messages: Optional[List[Dict[str, str]]] = None):
+        """
+        Prepare the provider to serve traffic: open connections and, if messages
+        are given, send a one-token priming request so server-side prompt and
+        prefix caches already hold the system prompt.
+        """
+        self.connect()
+        if messages:
+            self.generate_response(messages, max_tokens=1, temperature=0)
+    
+    def get_metrics(self) -> Dict:
+        """Provider-specific runtime metrics (exposed via /api/metrics)"""
+        return {}
+    
+    def _usage_state(self) -> threading.local:
+        # Usage is tracked per thread so concurrent requests don't see each other's
+        state = self.__dict__.get('_usage_local')
+        if state is None:
+            state = self.__dict__.setdefault('_usage_local', threading.local())
+        return state
+    
+    def _record_usage(self, usage: Optional[Dict[str, int]]):
+        self._usage_state().usage = usage
+    
+    def get_last_usage(self) -> Optional[Dict[str, int]]:
+        """
+        Token usage of the last completed generate_response/generate_stream call
+        made from the current thread: input_tokens, output_tokens,
+        cache_read_tokens, cache_write_tokens (None if not reported).
+        """
+        return getattr(self._usage_state(), 'usage', None)
+
+
+class PooledHTTPProvider(LLMProvider):
+    """
+    Base class for providers that talk to an HTTP endpoint directly.
+    
+    Each instance owns a pooled requests.Session, so keep-alive connections
+    (and their TCP/TLS handshakes) are reused across chat turns.
+    """
+    
+    def __init__(self, pool_size: int = None, connect_timeout: float = None, read_timeout: float = None):
+        # Imported on first use so importing the app doesn't pay for HTTP client libraries it may not need
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        self.pool_size = int(pool_size or os.getenv('LLM_HTTP_POOL_SIZE', 10))
+        self.connect_timeout = float(connect_timeout or os.getenv('LLM_HTTP_CONNECT_TIMEOUT', 5))
+        self.read_timeout = float(read_timeout or os.getenv('LLM_HTTP_READ_TIMEOUT', 60))
+        self.timeout = (self.connect_timeout, self.read_timeout)
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._adapter = adapter
+    
+    def connection_stats(self) -> Dict[str, int]:
+        """Connections opened vs. requests sent over this provider's pool"""
+        pools = self._adapter.poolmanager.pools
+        opened = 0
+        requests_sent = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+        return {
+            'pool_size': self.pool_size,
+            'connections_opened': opened,
+            'requests': requests_sent,
+            'connections_reused': max(requests_sent - opened, 0)
+        }
+    
+    def get_metrics(self) -> Dict:
+        return {'http_pool': self.connection_stats()}
 
 
 class OpenAIProvider(LLMProvider):
     """OpenAI GPT provider (using legacy v0.28 API)"""
     
     def __init__(self, api_key: str, model: str = "gpt-4"):
+        # The SDK takes a large share of app startup, so it is only imported when this provider is used
+        import openai
+        
         self.api_key = api_key
         self.model = model
+        self.openai = openai
         openai.api_key = api_key
     
     def generate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        self._record_usage(None)
         try:
-            response = openai.ChatCompletion.create(
+            response = self.openai.ChatCompletion.create(
                 model=self.model,
                 messages=messages,
                 temperature=kwargs.get('temperature', 0.7),
                 max_tokens=kwargs.get('max_tokens', 2000)
             )
+            self._record_usage(openai_usage(response.get('usage')))
             return response.choices[0].message['content']
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
     
+    def generate_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        self._record_usage(None)
+        try:
+            response = self.openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                temperature=kwargs.get('temperature', 0.7),
+                max_tokens=kwargs.get('max_tokens', 2000),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in response:
+                if chunk.get('usage'):
+                    self._record_usage(openai_usage(chunk['usage']))
+                if not chunk.get('choices'):
+                    continue
+                content = chunk['choices'][0]['delta'].get('content')
+                if content:
+                    yield content
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
     def validate_config(self) -> bool:
         try:
             # Test with a simple completion
-            openai.ChatCompletion.create(
+            self.openai.ChatCompletion.create(
                 model=self.model,
                 messages=[{"role": "user", "content": "test"}],
                 max_tokens=5
@@ -54,51 +306,125 @@ class OpenAIProvider(LLMProvider):
 
 
 
-class GroqProvider(LLMProvider):
+class GroqProvider(PooledHTTPProvider):
     """Groq fast inference provider (using OpenAI v0.28 compatible API)"""
     
-    def __init__(self, api_key: str, model: str = "llama-3.1-8b-instant"):
+    def __init__(self, api_key: str, model: str = "llama-3.1-8b-instant", max_retries: int = 3,
+                 max_wait: Optional[float] = None, requests_per_minute: Optional[int] = None,
+                 **pool_options):
+        super().__init__(**pool_options)
         self.api_key = api_key
         self.model = model
+        self.max_retries = max_retries
+        # Longest a request may wait for rate-limit capacity before failing
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv('GROQ_RATE_LIMIT_MAX_WAIT', 10))
+        if requests_per_minute is None:
+            requests_per_minute = int(os.getenv('GROQ_REQUESTS_PER_MINUTE', 30))
+        self.rate_limiter = shared_rate_limiter(api_key or '', model, requests_per_minute)
         # Groq endpoint for v0.28 style API
         self.base_url = "https://api.groq.com/openai/v1"
     
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """
+        Rough prompt size (~4 characters per token) for the token bucket;
+        the bucket is re-synced from the response headers afterwards
+        """
+        return len(json.dumps(messages)) // 4
+    
+    def _post_completion(self, payload: Dict, stream: bool = False, admitted: bool = False):
+        """
+        POST a chat completion, retrying on rate limits.
+        
+        admitted means the caller already took rate-limit capacity for the
+        first attempt (see agenerate_response).
+        """
+        # Use requests library since the old openai library doesn't support custom endpoints well
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        estimated_tokens = self._estimate_tokens(payload['messages'])
+        deadline = time.monotonic() + self.max_wait
+        base_delay = 2
+        
+        for attempt in range(self.max_retries + 1):
+            # Waits for capacity (including any Retry-After) or raises once
+            # the deadline would be exceeded
+            if attempt or not admitted:
+                self.rate_limiter.acquire(estimated_tokens, deadline)
+            response = self.session.post(
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                headers=headers,
+                timeout=self.timeout,
+                stream=stream
+            )
+            self.rate_limiter.update_from_headers(response.headers)
+            
+            if response.status_code == 429:
+                retry_after = self.rate_limiter.retry_after(response.headers)
+                if retry_after is None:
+                    retry_after = base_delay * (2 ** attempt)
+                # Hold back every request sharing this key, not just this one
+                self.rate_limiter.block(retry_after)
+                if attempt < self.max_retries:
+                    logger.warning(f"Groq rate limit hit, retrying in {retry_after:.1f}s")
+                    response.close()
+                    continue
+            
+            if not response.ok:
+                # Close before raising so a streamed error response does not hold a pooled connection
+                with response:
+                    response.raise_for_status()
+            return response
+    
     def generate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
         try:
-            # Use requests library since the old openai library doesn't support custom endpoints well
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
             payload = {
                 "model": self.model,
                 "messages": messages,
                 "temperature": kwargs.get('temperature', 0.7),
                 "max_tokens": kwargs.get('max_tokens', 2000)
             }
-            # Retry logic for rate limits
-            max_retries = 3
-            base_delay = 2
-            
-            for attempt in range(max_retries + 1):
-                try:
-                    response = requests.post(
-                        f"{self.base_url}/chat/completions",
-                        json=payload,
-                        headers=headers,
-                        timeout=60
-                    )
-                    response.raise_for_status()
-                    return response.json()['choices'][0]['message']['content']
-                except requests.exceptions.HTTPError as e:
-                    if e.response.status_code == 429:
-                        if attempt < max_retries:
-                            import time
-                            sleep_time = base_delay * (2 ** attempt)
-                            print(f"Groq rate limit hit, retrying in {sleep_time}s...")
-                            time.sleep(sleep_time)
-                            continue
-                    raise e
+            self._record_usage(None)
+            response = self._post_completion(payload, admitted=kwargs.get('rate_limit_admitted', False))
+            body = response.json()
+            self._record_usage(openai_usage(body.get('usage')))
+            return body['choices'][0]['message']['content']
+        except Exception as e:
+            raise Exception(f"Groq API error: {str(e)}")
+    
+    def generate_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        try:
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": kwargs.get('temperature', 0.7),
+                "max_tokens": kwargs.get('max_tokens', 2000),
+                "stream": True,
+                "stream_options": {"include_usage": True}
+            }
+            self._record_usage(None)
+            response = self._post_completion(payload, stream=True,
+                                             admitted=kwargs.get('rate_limit_admitted', False))
+            with response:
+                yield from iter_openai_sse(response, on_usage=self._record_usage)
+        except Exception as e:
+            raise Exception(f"Groq API error: {str(e)}")
+    
+    async def agenerate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        # Wait for rate-limit capacity on the event loop rather than in a pool thread
+        await self._aadmit(messages)
+        return await super().agenerate_response(messages, rate_limit_admitted=True, **kwargs)
+    
+    async def agenerate_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        await self._aadmit(messages)
+        async for delta in super().agenerate_stream(messages, rate_limit_admitted=True, **kwargs):
+            yield delta
+    
+    async def _aadmit(self, messages: List[Dict[str, str]]):
+        try:
+            await self.rate_limiter.aacquire(self._estimate_tokens(messages), time.monotonic() + self.max_wait)
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
     
@@ -113,48 +439,134 @@ class GroqProvider(LLMProvider):
                 "messages": [{"role": "user", "content": "test"}],
                 "max_tokens": 5
             }
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
                 json=payload,
                 headers=headers,
-                timeout=10
+                timeout=(self.connect_timeout, 10)
             )
+            self.rate_limiter.update_from_headers(response.headers)
             return response.status_code == 200
         except Exception:
             return False
+    
+    def connect(self):
+        # Listing models opens a pooled keep-alive connection without using chat rate limits
+        self.session.get(f"{self.base_url}/models", headers={"Authorization": f"Bearer {self.api_key}"},
+                         timeout=(self.connect_timeout, 10)).close()
+    
+    def get_metrics(self) -> Dict:
+        return dict(super().get_metrics(), rate_limit=self.rate_limiter.state())
 
 
 class AnthropicProvider(LLMProvider):
     """Anthropic Claude provider"""
     
-    def __init__(self, api_key: str, model: str = "claude-3-sonnet-20240229"):
+    PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
+    CACHE_CONTROL = {"type": "ephemeral"}
+    
+    def __init__(self, api_key: str, model: str = "claude-3-sonnet-20240229",
+                 prompt_caching: Optional[bool] = None):
         self.api_key = api_key
         self.model = model
+        if prompt_caching is None:
+            prompt_caching = os.getenv('ANTHROPIC_PROMPT_CACHING', 'true').lower() == 'true'
+        self.prompt_caching = prompt_caching
+        # Imported lazily, like the OpenAI SDK
+        import anthropic
+        
         self.client = anthropic.Anthropic(api_key=api_key)
     
+    @staticmethod
+    def _split_system(messages: List[Dict[str, str]]):
+        """
+        Extract the leading system message as the system prompt.
+        
+        Later system messages (command output, retrieved documentation) are
+        passed as user content, and consecutive same-role turns are merged,
+        since the Messages API only accepts user/assistant turns.
+        """
+        system_message = ""
+        user_messages = []
+        
+        for index, msg in enumerate(messages):
+            if msg["role"] == "system" and index == 0:
+                system_message = msg["content"]
+                continue
+            role = "user" if msg["role"] == "system" else msg["role"]
+            if user_messages and user_messages[-1]["role"] == role:
+                user_messages[-1] = {"role": role, "content": user_messages[-1]["content"] + "\n\n" + msg["content"]}
+            else:
+                user_messages.append({"role": role, "content": msg["content"]})
+        return system_message, user_messages
+    
+    def _request_params(self, messages: List[Dict[str, str]], **kwargs) -> Dict:
+        """
+        Build messages.create parameters.
+        
+        With prompt caching enabled, cache breakpoints are placed on the system
+        prompt and on the turn before the newest user message, so the system
+        prompt and the conversation so far are read from cache on the next
+        turn and only the new question is processed from scratch.
+        """
+        system_message, user_messages = self._split_system(messages)
+        params = {
+            'model': self.model,
+            'max_tokens': kwargs.get('max_tokens', 2000),
+            'system': system_message,
+            'messages': user_messages,
+            'temperature': kwargs.get('temperature', 0.7)
+        }
+        if not self.prompt_caching:
+            return params
+        
+        if system_message:
+            params['system'] = [{"type": "text", "text": system_message, "cache_control": self.CACHE_CONTROL}]
+        if len(user_messages) > 1:
+            prefix_end = dict(user_messages[-2])
+            prefix_end['content'] = [{"type": "text", "text": prefix_end['content'],
+                                      "cache_control": self.CACHE_CONTROL}]
+            params['messages'] = user_messages[:-2] + [prefix_end, user_messages[-1]]
+        params['extra_headers'] = {"anthropic-beta": self.PROMPT_CACHING_BETA}
+        return params
+    
+    @staticmethod
+    def _usage(usage) -> Dict[str, int]:
+        return {
+            'input_tokens': getattr(usage, 'input_tokens', 0) or 0,
+            'output_tokens': getattr(usage, 'output_tokens', 0) or 0,
+            'cache_read_tokens': getattr(usage, 'cache_read_input_tokens', 0) or 0,
+            'cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        }
+    
     def generate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        self._record_usage(None)
         try:
-            # Extract system message if present
-            system_message = ""
-            user_messages = []
-            
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_message = msg["content"]
-                else:
-                    user_messages.append(msg)
-            
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=kwargs.get('max_tokens', 2000),
-                system=system_message,
-                messages=user_messages,
-                temperature=kwargs.get('temperature', 0.7)
-            )
+            response = self.client.messages.create(**self._request_params(messages, **kwargs))
+            if getattr(response, 'usage', None):
+                self._record_usage(self._usage(response.usage))
             return response.content[0].text
         except Exception as e:
             raise Exception(f"Anthropic API error: {str(e)}")
     
+    def generate_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        self._record_usage(None)
+        try:
+            stream = self.client.messages.create(stream=True, **self._request_params(messages, **kwargs))
+            usage = None
+            for event in stream:
+                if event.type == 'content_block_delta' and getattr(event.delta, 'text', None):
+                    yield event.delta.text
+                elif event.type == 'message_start' and getattr(event.message, 'usage', None):
+                    # Input and cache token counts arrive up front...
+                    usage = self._usage(event.message.usage)
+                    self._record_usage(usage)
+                elif event.type == 'message_delta' and usage and getattr(event, 'usage', None):
+                    # ...output tokens with the final delta
+                    usage['output_tokens'] = getattr(event.usage, 'output_tokens', 0) or 0
+        except Exception as e:
+            raise Exception(f"Anthropic API error: {str(e)}")
+    
     def validate_config(self) -> bool:
         try:
             # Test with a simple completion
@@ -168,22 +580,24 @@ class AnthropicProvider(LLMProvider):
             return False
 
 
-class LocalProvider(LLMProvider):
+class LocalProvider(PooledHTTPProvider):
     """Local LLM provider (Ollama, vLLM, etc.)"""
     
-    def __init__(self, endpoint_url: str, api_key: str = None, model: str = "llama2"):
+    def __init__(self, endpoint_url: str, api_key: str = None, model: str = "llama2", **pool_options):
+        super().__init__(**pool_options)
         self.endpoint_url = endpoint_url
         self.api_key = api_key
         self.model = model
     
     def generate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        self._record_usage(None)
         try:
             headers = {"Content-Type": "application/json"}
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
             # OpenAI-compatible API format
-            response = requests.post(
+            response = self.session.post(
                 f"{self.endpoint_url}/v1/chat/completions",
                 headers=headers,
                 json={
@@ -192,10 +606,40 @@ class LocalProvider(LLMProvider):
                     "temperature": kwargs.get('temperature', 0.7),
                     "max_tokens": kwargs.get('max_tokens', 2000)
                 },
-                timeout=60
+                timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+            body = response.json()
+            self._record_usage(openai_usage(body.get('usage')))
+            return body['choices'][0]['message']['content']
+        except Exception as e:
+            raise Exception(f"Local LLM API error: {str(e)}")
+    
+    def generate_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        self._record_usage(None)
+        try:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+
+            response = self.session.post(
+                f"{self.endpoint_url}/v1/chat/completions",
+                headers=headers,
+                json={
+                    "model": self.model,
+                    "messages": messages,
+                    "temperature": kwargs.get('temperature', 0.7),
+                    "max_tokens": kwargs.get('max_tokens', 2000),
+                    "stream": True,
+                    "stream_options": {"include_usage": True}
+                },
+                timeout=self.timeout,
+                stream=True
+            )
+            with response:
+                # Inside the with block so an error response is closed and its connection returned to the pool
+                response.raise_for_status()
+                yield from iter_openai_sse(response, on_usage=self._record_usage)
         except Exception as e:
             raise Exception(f"Local LLM API error: {str(e)}")
     
@@ -206,18 +650,244 @@ class LocalProvider(LLMProvider):
                 headers["Authorization"] = f"Bearer {self.api_key}"
             
             # Test endpoint availability
-            response = requests.get(f"{self.endpoint_url}/v1/models", headers=headers, timeout=5)
+            response = self.session.get(f"{self.endpoint_url}/v1/models", headers=headers,
+                                        timeout=(self.connect_timeout, 5))
             return response.status_code == 200
         except Exception:
             return False
+    
+    def connect(self):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self.session.get(f"{self.endpoint_url}/v1/models", headers=headers,
+                         timeout=(self.connect_timeout, 10)).close()
+
+
+class ProviderStats:
+    """Rolling latency/error window and circuit breaker for one routed provider"""
+    
+    def __init__(self, window: int = 50, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def available(self) -> bool:
+        """Closed circuits, and open ones whose cooldown has elapsed (half-open trial)"""
+        with self._lock:
+            return self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown
+    
+    def record_success(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            # A failed half-open trial re-opens the circuit for another cooldown
+            if self.consecutive_failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+    
+    def snapshot(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self._lock:
+            if self.opened_at is None:
+                state = 'closed'
+            elif time.monotonic() - self.opened_at >= self.cooldown:
+                state = 'half-open'
+            else:
+                state = 'open'
+            return {
+                'state': state,
+                'p50_seconds': round(p50, 3) if p50 is not None else None,
+                'p95_seconds': round(p95, 3) if p95 is not None else None,
+                'error_rate': round(self.outcomes.count(False) / len(self.outcomes), 3) if self.outcomes else 0.0,
+                'requests': len(self.outcomes),
+                'consecutive_failures': self.consecutive_failures
+            }
+
+
+class RoutingProvider(LLMProvider):
+    """
+    Fail-over router across several configured providers.
+    
+    Strategies:
+        ordered: try providers in configuration order
+        weighted: pick the first provider at random by weight, fall back to the rest
+        latency: prefer the provider with the lowest rolling p95 latency
+    
+    Providers whose circuit is open (failure_threshold consecutive failures)
+    are skipped until their cooldown has elapsed. A failed request is retried
+    on the next provider within the same call; streams fail over only until
+    their first token has been sent.
+    """
+    
+    STRATEGIES = ('ordered', 'weighted', 'latency')
+    
+    def __init__(self, routes: List[Tuple[str, LLMProvider, float]], strategy: str = 'ordered',
+                 failure_threshold: int = 3, cooldown: float = 30.0, window: int = 50):
+        if not routes:
+            raise ValueError("Router requires at least one provider")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        self.strategy = strategy
+        self.routes = [
+            {'name': name, 'provider': provider, 'weight': weight,
+             'stats': ProviderStats(window, failure_threshold, cooldown)}
+            for name, provider, weight in routes
+        ]
+        self.providers = [route['provider'] for route in self.routes]
+        self.model = '+'.join(route['name'] for route in self.routes)
+    
+    def _candidates(self) -> List[Dict]:
+        """Routes in the order they should be tried for one request"""
+        routes = self.routes
+        if self.strategy == 'weighted':
+            # Weighted random order (Efraimidis-Spirakis sampling)
+            routes = sorted(routes, key=lambda route: random.random() ** (1.0 / max(route['weight'], 1e-6)),
+                            reverse=True)
+        elif self.strategy == 'latency':
+            # Providers without samples go first so every route gets measured
+            routes = sorted(routes, key=lambda route: route['stats'].percentile(0.95) or 0.0)
+        
+        available = [route for route in routes if route['stats'].available()]
+        # With every circuit open, trying them all beats failing outright
+        return available or routes
+    
+    def _failed(self, route: Dict, error: Exception):
+        route['stats'].record_failure()
+        logger.warning(f"Provider {route['name']} failed, failing over: {error}")
+    
+    def generate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        self._record_usage(None)
+        errors = []
+        for route in self._candidates():
+            started = time.monotonic()
+            try:
+                response = route['provider'].generate_response(messages, **kwargs)
+            except Exception as e:
+                self._failed(route, e)
+                errors.append(f"{route['name']}: {e}")
+                continue
+            route['stats'].record_success(time.monotonic() - started)
+            self._record_usage(route['provider'].get_last_usage())
+            return response
+        raise Exception(f"All providers failed ({'; '.join(errors)})")
+    
+    def generate_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        self._record_usage(None)
+        errors = []
+        for route in self._candidates():
+            started = time.monotonic()
+            streamed = False
+            try:
+                for delta in route['provider'].generate_stream(messages, **kwargs):
+                    streamed = True
+                    yield delta
+            except Exception as e:
+                self._failed(route, e)
+                if streamed:
+                    # Tokens already reached the client; the response cannot be restarted
+                    raise
+                errors.append(f"{route['name']}: {e}")
+                continue
+            route['stats'].record_success(time.monotonic() - started)
+            self._record_usage(route['provider'].get_last_usage())
+            return
+        raise Exception(f"All providers failed ({'; '.join(errors)})")
+    
+    def validate_config(self) -> bool:
+        return any(route['provider'].validate_config() for route in self.routes)
+    
+    def warm_up(self, messages: Optional[List[Dict[str, str]]] = None):
+        """Warm up every route; the router is usable as long as one of them warmed up"""
+        errors = []
+        for route in self.routes:
+            try:
+                route['provider'].warm_up(messages)
+            except Exception as e:
+                logger.warning(f"Warm-up of provider {route['name']} failed: {e}")
+                errors.append(f"{route['name']}: {e}")
+        if len(errors) == len(self.routes):
+            raise Exception(f"All providers failed to warm up ({'; '.join(errors)})")
+    
+    def get_metrics(self) -> Dict:
+        return {
+            'strategy': self.strategy,
+            'routes': [
+                dict(route['stats'].snapshot(),
+                     name=route['name'],
+                     provider=route['provider'].__class__.__name__,
+                     weight=route['weight'],
+                     metrics=route['provider'].get_metrics())
+                for route in self.routes
+            ]
+        }
 
 
 class LLMProviderFactory:
     """Factory for creating LLM providers"""
     
+    @staticmethod
+    def _pool_options(config: Dict) -> Dict:
+        """HTTP pool options for PooledHTTPProvider subclasses"""
+        return {
+            'pool_size': config.get('pool_size'),
+            'connect_timeout': config.get('connect_timeout'),
+            'read_timeout': config.get('read_timeout')
+        }
+    
+    @staticmethod
+    def _create_router(config: Dict) -> 'RoutingProvider':
+        """
+        Build a RoutingProvider from config of the form:
+        
+            {"strategy": "ordered", "providers": [
+                {"provider": "local", "config": {...}, "weight": 1},
+                {"provider": "groq", "config": {...}}]}
+        """
+        routes = []
+        for index, entry in enumerate(config.get('providers') or []):
+            provider_type = entry.get('provider', '')
+            if provider_type.lower() == 'router':
+                raise ValueError("Routers cannot be nested")
+            provider_config = dict(entry.get('config') or {})
+            if provider_type.lower() == 'groq':
+                # Fail over instead of sleeping through rate-limit retries
+                provider_config.setdefault('max_retries', 0)
+            routes.append((
+                entry.get('name') or f"{provider_type}-{index}",
+                LLMProviderFactory.create_provider(provider_type, provider_config),
+                float(entry.get('weight', 1))
+            ))
+        return RoutingProvider(
+            routes,
+            strategy=config.get('strategy', 'ordered'),
+            failure_threshold=int(config.get('failure_threshold', 3)),
+            cooldown=float(config.get('cooldown', 30))
+        )
+    
     @staticmethod
     def create_provider(provider_type: str, config: Dict) -> LLMProvider:
-        """Create an LLM provider based on type and configuration"""
+        """
+        Create an LLM provider based on type and configuration.
+        
+        The returned instance owns its connection pool and is meant to be
+        reused across requests.
+        """
         
         if provider_type.lower() == "openai":
             return OpenAIProvider(
@@ -228,21 +898,30 @@ class LLMProviderFactory:
         elif provider_type.lower() == "groq":
             return GroqProvider(
                 api_key=config.get('api_key'),
-                model=config.get('model', 'llama-3.1-8b-instant')
+                model=config.get('model', 'llama-3.1-8b-instant'),
+                max_retries=int(config.get('max_retries', 3)),
+                max_wait=config.get('rate_limit_max_wait'),
+                requests_per_minute=config.get('requests_per_minute'),
+                **LLMProviderFactory._pool_options(config)
             )
         
         elif provider_type.lower() == "anthropic":
             return AnthropicProvider(
                 api_key=config.get('api_key'),
-                model=config.get('model', 'claude-3-sonnet-20240229')
+                model=config.get('model', 'claude-3-sonnet-20240229'),
+                prompt_caching=config.get('prompt_caching')
             )
         
         elif provider_type.lower() == "local":
             return LocalProvider(
                 endpoint_url=config.get('endpoint_url'),
                 api_key=config.get('api_key'),
-                model=config.get('model', 'llama2')
+                model=config.get('model', 'llama2'),
+                **LLMProviderFactory._pool_options(config)
             )
         
+        elif provider_type.lower() == "router":
+            return LLMProviderFactory._create_router(config)
+        
         else:
             raise ValueError(f"Unknown provider type: {provider_type}")
@@ -0,0 +1,179 @@
+"""
+Prometheus Metrics
+
+Latency histograms for each stage of a chat turn (intent matching, CLI
+execution, prompt assembly, LLM call, response filtering), LLM latency,
+token and prompt-size metrics per provider and model, CLI command latency
+per command, and HTTP request latency per endpoint.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn with several workers),
+samples are written there and /metrics aggregates all workers.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+from backend.command_sandbox import ALLOWED_SUBCOMMANDS, ALWAYS_ALLOWED
+from backend.output_parsers import OUTPUT_SPECS, RESOURCE_ALIASES
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+PROMPT_BYTES_BUCKETS = (1024, 4096, 16384, 32768, 65536, 131072, 262144, 524288)
+
+STAGE_SECONDS = Histogram(
+    'rosa_agent_stage_seconds', 'Time spent in each stage of a chat turn',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+LLM_REQUEST_SECONDS = Histogram(
+    'rosa_agent_llm_request_seconds', 'LLM request duration (complete response)',
+    ['provider', 'model', 'mode'], buckets=LATENCY_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    'rosa_agent_llm_first_token_seconds', 'Time to the first streamed token',
+    ['provider', 'model'], buckets=LATENCY_BUCKETS
+)
+LLM_ERRORS = Counter(
+    'rosa_agent_llm_errors_total', 'Failed LLM requests',
+    ['provider', 'model']
+)
+LLM_TOKENS = Counter(
+    'rosa_agent_llm_tokens_total', 'Tokens reported by the LLM provider',
+    ['provider', 'model', 'type']
+)
+PROMPT_BYTES = Histogram(
+    'rosa_agent_prompt_bytes', 'Size of the messages sent to the LLM',
+    ['provider', 'model'], buckets=PROMPT_BYTES_BUCKETS
+)
+CLI_COMMAND_SECONDS = Histogram(
+    'rosa_agent_cli_command_seconds', 'CLI command duration (excluding cache hits)',
+    ['command'], buckets=LATENCY_BUCKETS
+)
+CLI_COMMANDS = Counter(
+    'rosa_agent_cli_commands_total', 'CLI commands by outcome (success, failure, cached)',
+    ['command', 'outcome']
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'rosa_agent_http_request_seconds', 'HTTP request duration (until the response starts)',
+    ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+
+USAGE_TOKEN_TYPES = ('input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens')
+
+
+# Verbs whose next word is a resource type (e.g. 'rosa list clusters', 'oc get pods')
+RESOURCE_VERBS = {'list', 'get', 'describe', 'create', 'delete', 'edit', 'upgrade'}
+
+# Resource types reported by name in command labels; any other is reported as 'other'
+KNOWN_RESOURCES = set(RESOURCE_ALIASES.values()) | {resource for _, _, resource in OUTPUT_SPECS}
+
+
+def command_label(parts: List[str]) -> str:
+    """
+    Low-cardinality label for a command: the tool and verb, plus the resource
+    type for resource verbs. Flags and object names are left out, and a tool,
+    verb or resource type outside the known sets (sandbox allowlist,
+    KNOWN_RESOURCES) is reported as 'other'.
+    """
+    words = []
+    for index, part in enumerate(parts[:3]):
+        if part.startswith('-') or (index == 2 and parts[1] not in RESOURCE_VERBS):
+            break
+        if index == 0:
+            known = part in ALLOWED_SUBCOMMANDS
+        elif index == 1:
+            known = part in ALLOWED_SUBCOMMANDS.get(parts[0], ()) or part in ALWAYS_ALLOWED
+        else:
+            part = RESOURCE_ALIASES.get(part, part)
+            known = part in KNOWN_RESOURCES
+        if not known:
+            words.append('other')
+            break
+        words.append(part)
+    return ' '.join(words) or 'unknown'
+
+
+def provider_labels(provider) -> Dict[str, str]:
+    return {
+        'provider': provider.__class__.__name__,
+        'model': str(getattr(provider, 'model', None) or 'unknown')
+    }
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of a chat turn"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=name).observe(time.perf_counter() - started)
+
+
+class LLMRequestTimer:
+    """Per-request LLM timing handle yielded by llm_request()"""
+
+    def __init__(self, provider):
+        self.labels = provider_labels(provider)
+        self.started = time.perf_counter()
+        self.first_token_seen = False
+
+    def first_token(self):
+        if not self.first_token_seen:
+            self.first_token_seen = True
+            LLM_FIRST_TOKEN_SECONDS.labels(**self.labels).observe(time.perf_counter() - self.started)
+
+
+@contextmanager
+def llm_request(provider, messages: List[Dict[str, str]], mode: str = 'response'):
+    """
+    Time an LLM call, recording prompt size, errors, and (on success) the
+    token usage the provider reports via get_last_usage().
+    """
+    timer = LLMRequestTimer(provider)
+    PROMPT_BYTES.labels(**timer.labels).observe(
+        sum(len(message['content'].encode()) for message in messages)
+    )
+    try:
+        yield timer
+    except Exception:
+        LLM_ERRORS.labels(**timer.labels).inc()
+        raise
+    else:
+        usage = provider.get_last_usage() or {}
+        for token_type in USAGE_TOKEN_TYPES:
+            if usage.get(token_type):
+                LLM_TOKENS.labels(type=token_type, **timer.labels).inc(usage[token_type])
+    finally:
+        seconds = time.perf_counter() - timer.started
+        STAGE_SECONDS.labels(stage='llm').observe(seconds)
+        LLM_REQUEST_SECONDS.labels(mode=mode, **timer.labels).observe(seconds)
+
+
+def observe_command(parts: List[str], result: Dict, seconds: Optional[float] = None):
+    """Record a CLI command result (seconds is None for cache hits)"""
+    label = command_label(parts)
+    if result.get('cached'):
+        outcome = 'cached'
+    else:
+        outcome = 'success' if result.get('success') else 'failure'
+    CLI_COMMANDS.labels(command=label, outcome=outcome).inc()
+    if seconds is not None:
+        CLI_COMMAND_SECONDS.labels(command=label).observe(seconds)
+
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float):
+    HTTP_REQUEST_SECONDS.labels(endpoint=endpoint, method=method, status=str(status)).observe(seconds)
+
+
+def render() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, aggregated across workers in multiprocess mode"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,391 @@
+"""
+Structured CLI Output
+
+Supported read commands (rosa list/describe, oc get) are run with JSON
+output and parsed into compact records holding only the fields the agent
+reasons about - name, state, version, region, node counts and so on. The
+records are rendered as a condensed table for the LLM, so it no longer has
+to parse column-aligned CLI text; the full JSON stays in the command output
+for the UI. Resources that can number in the thousands (pods) request just
+those fields as custom columns instead, since their full JSON is 20-50x
+the size of the table output.
+"""
+
+import json
+import logging
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Resource name aliases accepted by the CLIs
+RESOURCE_ALIASES = {
+    'cluster': 'clusters',
+    'machinepool': 'machinepools',
+    'mp': 'machinepools',
+    'version': 'versions',
+    'region': 'regions',
+    'node': 'nodes',
+    'no': 'nodes',
+    'pod': 'pods',
+    'po': 'pods',
+    'namespace': 'namespaces',
+    'ns': 'namespaces',
+    'project': 'projects',
+}
+
+OUTPUT_FLAGS = ('-o', '--output')
+
+# Flags that make a command stream or change its output shape
+UNSUPPORTED_FLAGS = {'-w', '--watch', '--watch-only', '--show-labels', '--template'}
+
+
+def _get(obj, *path, default=None):
+    """Nested dict lookup that tolerates missing keys"""
+    for key in path:
+        if not isinstance(obj, dict):
+            return default
+        obj = obj.get(key)
+    return default if obj is None else obj
+
+
+def _items(data) -> List[Dict]:
+    """Records of a JSON response: a list, a Kubernetes List, or a single object"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return data['items'] if isinstance(data.get('items'), list) else [data]
+    return []
+
+
+def _cluster_record(cluster: Dict) -> Dict:
+    autoscale = _get(cluster, 'nodes', 'autoscale_compute')
+    compute = (f"{autoscale.get('min_replicas')}-{autoscale.get('max_replicas')}"
+               if isinstance(autoscale, dict) else _get(cluster, 'nodes', 'compute'))
+    return {
+        'name': cluster.get('name'),
+        'id': cluster.get('id'),
+        'state': cluster.get('state') or _get(cluster, 'status', 'state'),
+        'version': _get(cluster, 'version', 'raw_id') or cluster.get('openshift_version'),
+        'region': _get(cluster, 'region', 'id'),
+        'topology': 'hcp' if _get(cluster, 'hypershift', 'enabled') else 'classic',
+        'multi_az': bool(cluster.get('multi_az')),
+        'compute_nodes': compute,
+        'instance_type': _get(cluster, 'nodes', 'compute_machine_type', 'id'),
+    }
+
+
+def _cluster_detail_record(cluster: Dict) -> Dict:
+    return dict(
+        _cluster_record(cluster),
+        api_url=_get(cluster, 'api', 'url'),
+        console_url=_get(cluster, 'console', 'url'),
+        created=cluster.get('creation_timestamp'),
+    )
+
+
+def _machinepool_record(pool: Dict) -> Dict:
+    # Classic machine pools and hosted control plane node pools use slightly different fields
+    autoscaling = pool.get('autoscaling') or {}
+    if autoscaling:
+        replicas = (f"{autoscaling.get('min_replicas', autoscaling.get('min_replica'))}-"
+                    f"{autoscaling.get('max_replicas', autoscaling.get('max_replica'))}")
+    else:
+        replicas = pool.get('replicas')
+    zones = pool.get('availability_zones') or ([pool['availability_zone']] if pool.get('availability_zone') else [])
+    return {
+        'id': pool.get('id'),
+        'instance_type': pool.get('instance_type') or _get(pool, 'aws_node_pool', 'instance_type'),
+        'replicas': replicas,
+        'autoscaling': bool(autoscaling),
+        'current_replicas': _get(pool, 'status', 'current_replicas'),
+        'zones': ','.join(zones),
+    }
+
+
+def _version_record(version: Dict) -> Dict:
+    return {
+        'version': version.get('raw_id') or version.get('id'),
+        'channel_group': version.get('channel_group'),
+        'default': bool(version.get('default')),
+        'hcp': bool(version.get('hosted_control_plane_enabled')),
+        'end_of_life': version.get('end_of_life_timestamp'),
+    }
+
+
+def _region_record(region: Dict) -> Dict:
+    return {
+        'id': region.get('id'),
+        'name': region.get('display_name'),
+        'multi_az': bool(region.get('supports_multi_az')),
+        'hcp': bool(region.get('supports_hypershift')),
+    }
+
+
+def _node_record(node: Dict) -> Dict:
+    labels = _get(node, 'metadata', 'labels', default={})
+    ready = next((condition.get('status') == 'True' for condition in _get(node, 'status', 'conditions', default=[])
+                  if condition.get('type') == 'Ready'), False)
+    roles = sorted(label.split('/', 1)[1] for label in labels
+                   if label.startswith('node-role.kubernetes.io/') and label.split('/', 1)[1])
+    return {
+        'name': _get(node, 'metadata', 'name'),
+        'ready': ready,
+        'roles': ','.join(roles),
+        'version': _get(node, 'status', 'nodeInfo', 'kubeletVersion'),
+        'instance_type': labels.get('node.kubernetes.io/instance-type'),
+        'zone': labels.get('topology.kubernetes.io/zone'),
+    }
+
+
+def _pod_status(phase: Optional[str], waiting: List[str], init_waiting: List[str]) -> Optional[str]:
+    """Pod status as `oc get pods` shows it: why a container is waiting (CrashLoopBackOff, ...), else the phase"""
+    if init_waiting:
+        return f"Init:{init_waiting[0]}"
+    if waiting:
+        return waiting[0]
+    return phase
+
+
+def _waiting_reasons(containers: List[Dict]) -> List[str]:
+    return [reason for reason in (_get(container, 'state', 'waiting', 'reason') for container in containers) if reason]
+
+
+def _pod_record(pod: Dict) -> Dict:
+    containers = _get(pod, 'status', 'containerStatuses', default=[])
+    init_containers = _get(pod, 'status', 'initContainerStatuses', default=[])
+    phase = _get(pod, 'status', 'phase')
+    return {
+        'namespace': _get(pod, 'metadata', 'namespace'),
+        'name': _get(pod, 'metadata', 'name'),
+        'status': _pod_status(phase, _waiting_reasons(containers), _waiting_reasons(init_containers)),
+        'phase': phase,
+        'ready': f"{sum(1 for container in containers if container.get('ready'))}/{len(containers)}",
+        'restarts': sum(container.get('restartCount', 0) for container in containers),
+        'node': _get(pod, 'spec', 'nodeName'),
+    }
+
+
+def _pod_row_record(row: List[str]) -> Dict:
+    """Pod record from a POD_COLUMNS row (array fields are comma-separated, missing ones '<none>')"""
+    namespace, name, phase, ready, restarts, node, waiting, init_waiting = (
+        None if cell == '<none>' else cell for cell in row
+    )
+    ready_flags = ready.split(',') if ready else []
+    return {
+        'namespace': namespace,
+        'name': name,
+        'status': _pod_status(phase, waiting.split(',') if waiting else [],
+                              init_waiting.split(',') if init_waiting else []),
+        'phase': phase,
+        'ready': f"{ready_flags.count('true')}/{len(ready_flags)}",
+        'restarts': sum(int(count) for count in restarts.split(',') if count.isdigit()) if restarts else 0,
+        'node': node,
+    }
+
+
+def _namespace_record(namespace: Dict) -> Dict:
+    return {
+        'name': _get(namespace, 'metadata', 'name'),
+        'status': _get(namespace, 'status', 'phase'),
+    }
+
+
+class OutputSpec:
+    """
+    How to request, parse and summarize JSON output for one command.
+
+    A spec may also name a compact format (compact_flag) whose rows
+    compact_record turns into the same records; it is requested instead of
+    JSON unless JSON is needed (e.g. by the state mirror's watches).
+    """
+
+    def __init__(self, kind: str, json_flag: List[str], record: Callable[[Dict], Dict],
+                 compact_flag: Optional[List[str]] = None,
+                 compact_record: Optional[Callable[[List[str]], Dict]] = None):
+        self.kind = kind
+        self.json_flag = json_flag
+        self.record = record
+        self.compact_flag = compact_flag
+        self.compact_record = compact_record
+
+    def parse(self, output: str) -> Optional[Dict]:
+        """
+        Parse a command's JSON (or compact) output.
+
+        Returns:
+            Dict with keys: kind, columns, records - or None if the output is not
+            in the expected format
+        """
+        if self.compact_record and not output.lstrip().startswith(('{', '[')):
+            return self._parse_compact(output)
+        try:
+            records = [self.record(item) for item in _items(json.loads(output)) if isinstance(item, dict)]
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Could not parse {self.kind} JSON output: {e}")
+            return None
+        columns = list(records[0]) if records else list(self.record({}))
+        return {'kind': self.kind, 'columns': columns, 'records': records}
+
+    def _parse_compact(self, output: str) -> Optional[Dict]:
+        """Parse custom-columns output: a header line, then one whitespace-separated row per item"""
+        lines = output.splitlines()
+        width = len(lines[0].split()) if lines else 0
+        try:
+            records = [self.compact_record(line.split()) for line in lines[1:] if len(line.split()) == width]
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Could not parse {self.kind} output: {e}")
+            return None
+        columns = list(records[0]) if records else list(self.record({}))
+        return {'kind': self.kind, 'columns': columns, 'records': records}
+
+
+ROSA_JSON = ['--output', 'json']
+OC_JSON = ['-o', 'json']
+
+# Only the fields _pod_record uses; values never contain whitespace
+POD_COLUMNS = ['-o', 'custom-columns=' + ','.join([
+    'NAMESPACE:.metadata.namespace',
+    'NAME:.metadata.name',
+    'PHASE:.status.phase',
+    'READY:.status.containerStatuses[*].ready',
+    'RESTARTS:.status.containerStatuses[*].restartCount',
+    'NODE:.spec.nodeName',
+    'WAITING:.status.containerStatuses[*].state.waiting.reason',
+    'INIT_WAITING:.status.initContainerStatuses[*].state.waiting.reason',
+])]
+
+# (tool, verb, resource) -> spec
+OUTPUT_SPECS = {
+    ('rosa', 'list', 'clusters'): OutputSpec('clusters', ROSA_JSON, _cluster_record),
+    ('rosa', 'describe', 'clusters'): OutputSpec('cluster', ROSA_JSON, _cluster_detail_record),
+    ('rosa', 'list', 'machinepools'): OutputSpec('machinepools', ROSA_JSON, _machinepool_record),
+    ('rosa', 'list', 'versions'): OutputSpec('versions', ROSA_JSON, _version_record),
+    ('rosa', 'list', 'regions'): OutputSpec('regions', ROSA_JSON, _region_record),
+    ('oc', 'get', 'nodes'): OutputSpec('nodes', OC_JSON, _node_record),
+    ('oc', 'get', 'pods'): OutputSpec('pods', OC_JSON, _pod_record, POD_COLUMNS, _pod_row_record),
+    ('oc', 'get', 'namespaces'): OutputSpec('namespaces', OC_JSON, _namespace_record),
+    ('oc', 'get', 'projects'): OutputSpec('projects', OC_JSON, _namespace_record),
+}
+
+
+def output_format(parts: List[str]) -> Optional[str]:
+    """The value of an -o/--output flag, if the command has one"""
+    for index, part in enumerate(parts):
+        if part in OUTPUT_FLAGS and index + 1 < len(parts):
+            return parts[index + 1]
+        for flag in OUTPUT_FLAGS:
+            if part.startswith(flag + '='):
+                return part.split('=', 1)[1]
+        if part.startswith('-o') and not part.startswith('--') and len(part) > 2:
+            return part[2:]
+    return None
+
+
+def find_spec(parts: List[str]) -> Optional[OutputSpec]:
+    if len(parts) < 3 or any(part in UNSUPPORTED_FLAGS for part in parts):
+        return None
+    resource = parts[2]
+    # Several resource types ('pods,svc') or 'type/name' produce mixed lists
+    if ',' in resource or '/' in resource:
+        return None
+    return OUTPUT_SPECS.get((parts[0], parts[1], RESOURCE_ALIASES.get(resource, resource)))
+
+
+def structured_command(parts: List[str], compact: bool = True) -> Optional[List[str]]:
+    """
+    Rewrite a supported read command to produce parseable output: the spec's
+    compact format if it has one (and compact is set), JSON otherwise.
+
+    Returns:
+        The command parts to run (unchanged if JSON output was already requested),
+        or None if the command is unsupported or asks for another output format
+    """
+    spec = find_spec(parts)
+    if not spec:
+        return None
+    output = output_format(parts)
+    if output is None:
+        return parts + (spec.compact_flag if compact and spec.compact_flag else spec.json_flag)
+    return parts if output == 'json' else None
+
+
+def parse_output(parts: List[str], output: str) -> Optional[Dict]:
+    """Parse the output of a command rewritten by structured_command()"""
+    spec = find_spec(parts)
+    return spec.parse(output) if spec else None
+
+
+def _cell(value) -> str:
+    if value is None or value == '':
+        return '-'
+    if isinstance(value, bool):
+        return 'yes' if value else 'no'
+    return str(value)
+
+
+def _render_rows(columns: List[str], rows: List[List[str]]) -> List[str]:
+    widths = [max(len(column), *(len(row[index]) for row in rows)) for index, column in enumerate(columns)]
+    lines = ['  '.join(column.upper().ljust(width) for column, width in zip(columns, widths)).rstrip()]
+    lines += ['  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    return lines
+
+
+def render_table(structured: Dict, max_rows: int = 50) -> str:
+    """Condensed plain-text table of structured records for the LLM"""
+    columns, records = structured['columns'], structured['records']
+    if not records:
+        return f"No {structured['kind']} found."
+
+    rows = [[_cell(record.get(column)) for column in columns] for record in records[:max_rows]]
+    lines = _render_rows(columns, rows)
+    summary = f"{len(records)} {structured['kind']}"
+    if len(records) > max_rows:
+        summary += f" (first {max_rows} shown)"
+    return '\n'.join(lines + ['', summary])
+
+
+# Columns large listings are grouped by: where a record lives and its status
+SCOPE_COLUMNS = ('namespace', 'region')
+STATUS_COLUMNS = ('status', 'phase', 'state', 'ready')
+
+
+def render_grouped(structured: Dict, max_rows: int = 50) -> Optional[str]:
+    """
+    Condensed summary of a large listing: counts of records per scope and
+    status (e.g. pods per namespace and phase), followed by the records whose
+    status differs from the most common one, which are usually the ones that
+    matter.
+
+    Returns:
+        The summary, or None if the records have no status column
+    """
+    columns, records, kind = structured['columns'], structured['records'], structured['kind']
+    status = next((column for column in STATUS_COLUMNS if column in columns), None)
+    if status is None or not records:
+        return None
+    group_columns = [column for column in SCOPE_COLUMNS if column in columns] + [status]
+
+    groups = Counter(tuple(_cell(record.get(column)) for column in group_columns) for record in records)
+    rows = [list(key) + [str(count)] for key, count in groups.most_common(max_rows)]
+    lines = [f"{len(records)} {kind} by {', '.join(group_columns)}:"]
+    lines += _render_rows(group_columns + ['count'], rows)
+    if len(groups) > max_rows:
+        lines.append(f"... {len(groups) - max_rows} more groups")
+
+    common = Counter(_cell(record.get(status)) for record in records).most_common(1)[0][0]
+    others = [record for record in records if _cell(record.get(status)) != common]
+    if others:
+        lines += ['', f"{kind} with {status} other than {common}:",
+                  render_table(dict(structured, records=others), max_rows)]
+    return '\n'.join(lines)
+
+
+def render_summary(structured: Dict, max_rows: int = 50) -> str:
+    """Table of the records, or grouped counts when there are more than max_rows"""
+    if len(structured['records']) > max_rows:
+        grouped = render_grouped(structured, max_rows)
+        if grouped:
+            return grouped
+    return render_table(structured, max_rows)
+
@@ -0,0 +1,301 @@
+"""
+Output Shaper
+
+Sits between CLIExecutor and the conversation: large command results are
+cut down before they reach the LLM context or a chat response. Large
+column-aligned tables (e.g. `oc get pods -A -o wide`) are summarized by
+namespace and status like structured listings, repeated lines are
+collapsed, and text still over the byte cap keeps its head and tail
+around an elision marker. The full output of a shaped result is stored out
+of band under a shared directory (so any gunicorn worker can serve it) and
+is retrievable at /api/execute/<output_id>/output.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shlex
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.output_parsers import render_grouped
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_ID_PATTERN = re.compile(r'^[a-f0-9]{12}$')
+
+OUTPUT_STREAMS = ('stdout', 'stderr')
+
+# Result fields cut down by shape()
+SHAPED_FIELDS = ('output', 'error', 'summary')
+
+# Column names in a CLI table header: upper-case words, single spaces within a name ('NOMINATED NODE')
+HEADER_FIELD = re.compile(r'\S+(?: \S+)*')
+
+
+def collapse_repeats(lines: List[str], min_run: int = 3) -> List[str]:
+    """Replace runs of identical lines with the line and a repeat marker"""
+    collapsed = []
+    index = 0
+    while index < len(lines):
+        end = index + 1
+        while end < len(lines) and lines[end] == lines[index]:
+            end += 1
+        run = end - index
+        if run >= min_run:
+            collapsed += [lines[index], f"[... previous line repeated {run - 1} more times ...]"]
+        else:
+            collapsed += lines[index:end]
+        index = end
+    return collapsed
+
+
+def table_records(text: str) -> Optional[Dict]:
+    """
+    Parse a column-aligned CLI table (upper-case header, one row per line)
+    into records keyed by the lower-cased column names. Cells are sliced at
+    the header's column offsets, so values with single spaces survive.
+
+    Returns:
+        Dict with keys: columns, records - or None if the text is not a table
+    """
+    lines = text.splitlines()
+    if len(lines) < 2 or lines[0] != lines[0].upper():
+        return None
+    fields = list(HEADER_FIELD.finditer(lines[0]))
+    if len(fields) < 2:
+        return None
+    columns = [field.group().lower() for field in fields]
+    bounds = [field.start() for field in fields[1:]] + [None]
+    records = [
+        {column: line[field.start():end].strip() for column, field, end in zip(columns, fields, bounds)}
+        for line in lines[1:] if line.strip()
+    ]
+    return {'columns': columns, 'records': records}
+
+
+def group_table(text: str, kind: str, max_rows: int) -> Optional[str]:
+    """
+    Summarize a CLI table of more than max_rows rows by namespace and status
+    (see output_parsers.render_grouped).
+
+    Returns:
+        The summary, or None if the text is not such a table
+    """
+    table = table_records(text)
+    if not table or len(table['records']) <= max_rows:
+        return None
+    return render_grouped(dict(table, kind=kind), max_rows)
+
+
+def elide(text: str, max_bytes: int, head_lines: int, tail_lines: int) -> str:
+    """Keep the head and tail of text within max_bytes, with a marker for what was dropped"""
+    lines = text.splitlines()
+    head = lines[:head_lines]
+    tail = lines[max(len(lines) - tail_lines, len(head)):]
+    budget = max_bytes // 2
+    head_text = '\n'.join(head).encode()[:budget].decode(errors='ignore')
+    tail_text = '\n'.join(tail).encode()[-budget:].decode(errors='ignore')
+    omitted = len(text.encode()) - len(head_text.encode()) - len(tail_text.encode())
+    if omitted <= 0:
+        return text
+    omitted_lines = len(lines) - len(head) - len(tail)
+    detail = f"{omitted} bytes, {omitted_lines} lines" if omitted_lines > 0 else f"{omitted} bytes"
+    return f"{head_text}\n[... {detail} omitted; full output available separately ...]\n{tail_text}"
+
+
+class OutputShaper:
+    """Caps CLI results fed to the LLM and chat responses, keeping the full output on disk"""
+
+    # How often old stored outputs are pruned
+    PRUNE_INTERVAL = 600
+
+    def __init__(self, storage_dir: str = '/app/storage/outputs', max_bytes: int = 16 * 1024,
+                 head_lines: int = 60, tail_lines: int = 30, max_records: int = 200,
+                 retention: int = 24 * 3600, max_rows: int = 50):
+        self.storage_dir = storage_dir
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.head_lines = head_lines
+        self.tail_lines = tail_lines
+        self.max_records = max_records
+        self.retention = retention
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+
+        try:
+            os.makedirs(storage_dir, exist_ok=True)
+        except OSError as e:
+            self.storage_dir = os.path.join(tempfile.gettempdir(), 'rosa-agent-outputs')
+            logger.warning(f"Cannot use output storage {storage_dir} ({e}), using {self.storage_dir}")
+            os.makedirs(self.storage_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> 'OutputShaper':
+        """Create a shaper configured from CLI_OUTPUT_* environment variables"""
+        return cls(
+            storage_dir=os.getenv('CLI_OUTPUT_STORAGE_DIR', '/app/storage/outputs'),
+            max_bytes=int(os.getenv('CLI_OUTPUT_MAX_BYTES', 16 * 1024)),
+            head_lines=int(os.getenv('CLI_OUTPUT_HEAD_LINES', 60)),
+            tail_lines=int(os.getenv('CLI_OUTPUT_TAIL_LINES', 30)),
+            max_records=int(os.getenv('CLI_OUTPUT_MAX_RECORDS', 200)),
+            retention=int(os.getenv('CLI_OUTPUT_RETENTION', 24 * 3600)),
+            max_rows=int(os.getenv('CLI_STRUCTURED_MAX_ROWS', 50))
+        )
+
+    def compact(self, text: str, kind: Optional[str] = None) -> str:
+        """
+        Text cut down to max_bytes: a table is summarized by namespace and
+        status (if kind is given), repeated lines are collapsed, then head and
+        tail kept.
+        """
+        if len(text) <= self.max_bytes and len(text.encode()) <= self.max_bytes:
+            return text
+        grouped = group_table(text, kind, self.max_rows) if kind else None
+        if grouped:
+            text = grouped
+            if len(text.encode()) <= self.max_bytes:
+                return text
+        collapsed = '\n'.join(collapse_repeats(text.splitlines()))
+        if len(collapsed.encode()) <= self.max_bytes:
+            return collapsed
+        return elide(collapsed, self.max_bytes, self.head_lines, self.tail_lines)
+
+    def shape(self, command: str, result: Dict[str, any]) -> Dict[str, any]:
+        """
+        Shape a command result for the LLM and chat responses.
+
+        Returns:
+            The result unchanged if it is within the caps, otherwise a copy with
+            output, error and summary compacted, structured records capped at
+            max_records, and output_shaped (True), output_id and output_bytes
+            (size of the full stdout and stderr)
+        """
+        shaped = dict(result)
+        for field in SHAPED_FIELDS:
+            if result.get(field):
+                # Tables are only grouped in plain-text stdout (structured results carry a summary)
+                kind = self.table_kind(command) if field == 'output' and 'structured' not in result else None
+                shaped[field] = self.compact(result[field], kind)
+        structured = result.get('structured')
+        if structured and len(structured['records']) > self.max_records:
+            shaped['structured'] = dict(structured, records=structured['records'][:self.max_records],
+                                        records_total=len(structured['records']))
+
+        if all(shaped.get(field) is result.get(field) for field in SHAPED_FIELDS) and \
+                shaped.get('structured') is structured:
+            return result
+
+        output_id = self.store(command, result)
+        shaped.update(
+            output_shaped=True,
+            output_id=output_id,
+            output_bytes=len((result.get('output') or '').encode()) + len((result.get('error') or '').encode())
+        )
+        return shaped
+
+    @staticmethod
+    def table_kind(command: str) -> str:
+        """What a command's table lists, for summaries ('pods' for `oc get pods -A`)"""
+        try:
+            parts = shlex.split(command)
+        except ValueError:
+            parts = []
+        if len(parts) > 2 and not parts[2].startswith('-'):
+            return parts[2]
+        return 'rows'
+
+    def _path(self, output_id: str, suffix: str) -> str:
+        return os.path.join(self.storage_dir, f"{output_id}{suffix}")
+
+    def store(self, command: str, result: Dict[str, any]) -> Optional[str]:
+        """
+        Store a result's full stdout and stderr.
+
+        Returns:
+            The output id (derived from the content, so a result that is served
+            again, e.g. from the cache or state mirror, is stored once), or None
+            if it could not be written
+        """
+        digest = hashlib.sha256()
+        for part in (command, str(result.get('exit_code')), result.get('output') or '', result.get('error') or ''):
+            digest.update(part.encode(errors='replace'))
+            digest.update(b'\0')
+        output_id = digest.hexdigest()[:12]
+
+        meta_path = self._path(output_id, '.json')
+        try:
+            if os.path.exists(meta_path):
+                os.utime(meta_path)
+            else:
+                for stream, field in (('stdout', 'output'), ('stderr', 'error')):
+                    self._write(self._path(output_id, f'.{stream}'), (result.get(field) or '').encode())
+                # Written last, so an id is only served once its output is complete
+                self._write(meta_path, json.dumps({
+                    'id': output_id,
+                    'command': command,
+                    'success': result.get('success'),
+                    'exit_code': result.get('exit_code'),
+                    'created_at': time.time()
+                }).encode())
+        except OSError as e:
+            logger.error(f"Could not store output of {command}: {e}")
+            return None
+
+        self._prune()
+        return output_id
+
+    def _write(self, path: str, data: bytes):
+        # Write atomically so readers in other workers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, output_id: str) -> Optional[Dict]:
+        """A stored output's metadata, or None if it does not exist"""
+        if not OUTPUT_ID_PATTERN.match(output_id):
+            return None
+        try:
+            with open(self._path(output_id, '.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def output_path(self, output_id: str, stream: str = 'stdout') -> Optional[str]:
+        """Path of a stored output stream ('stdout' or 'stderr'), or None if it does not exist"""
+        if stream not in OUTPUT_STREAMS or not self.get(output_id):
+            return None
+        path = self._path(output_id, f'.{stream}')
+        return path if os.path.exists(path) else None
+
+    def _prune(self):
+        """Delete stored outputs older than the retention period (at most every PRUNE_INTERVAL)"""
+        now = time.time()
+        with self._lock:
+            if now - self._pruned_at < self.PRUNE_INTERVAL:
+                return
+            self._pruned_at = now
+        cutoff = now - self.retention
+        try:
+            entries = list(os.scandir(self.storage_dir))
+        except OSError:
+            return
+        for entry in entries:
+            # The metadata file's mtime is refreshed whenever the output is stored again
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+            except OSError:
+                continue
+            for suffix in ('.json', '.stdout', '.stderr'):
+                try:
+                    os.remove(self._path(entry.name[:-len('.json')], suffix))
+                except OSError:
+                    pass
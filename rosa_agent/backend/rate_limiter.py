@@ -0,0 +1,209 @@
+"""
+Client-side Rate Limiting
+
+Token buckets that pace requests to rate-limited LLM APIs before the server
+starts returning 429s. Bucket sizes are learned from the x-ratelimit-*
+response headers, so each worker tracks the server's view of the remaining
+quota. Waits are bounded by a per-request deadline: a request that cannot
+be admitted in time fails fast instead of blocking a worker. In ASGI mode
+aacquire() waits with asyncio.sleep, so throttled requests do not hold a
+thread.
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse rate-limit durations such as '7.66s', '2m59.56s' or '120ms' (plain numbers are seconds)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimitExceeded(Exception):
+    """A request could not be admitted before its deadline"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilling continuously at capacity/period"""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount tokens are available (refill must be called first)"""
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], now: float):
+        """Align the bucket with the limit and remaining quota reported by the server"""
+        self.refill(now)
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(remaining, self.capacity)
+
+
+class RateLimiter:
+    """
+    Request and token buckets for one API key and model.
+
+    Waiting requests reserve their share up front (buckets may go negative),
+    so concurrent callers are admitted in arrival order.
+    """
+
+    # Header prefix -> (bucket name, period of the reported limit in seconds)
+    HEADER_BUCKETS = {
+        'requests': ('requests_per_day', 86400),
+        'tokens': ('tokens_per_minute', 60),
+    }
+
+    def __init__(self, requests_per_minute: Optional[int] = None, jitter: float = 0.2):
+        self.jitter = jitter
+        self.buckets: Dict[str, TokenBucket] = {}
+        if requests_per_minute:
+            self.buckets['requests_per_minute'] = TokenBucket(requests_per_minute, 60)
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _amounts(self, tokens: int) -> Dict[str, float]:
+        return {name: tokens if name.startswith('tokens') else 1 for name in self.buckets}
+
+    def acquire(self, tokens: int, deadline: float):
+        """
+        Admit one request using an estimated number of tokens, sleeping (with
+        jitter) if the buckets are empty.
+
+        Raises:
+            RateLimitExceeded: if the request cannot be admitted before the
+                deadline (a time.monotonic() value)
+        """
+        wait = self._reserve(tokens, deadline)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int, deadline: float):
+        """acquire() for the event loop: waits with asyncio.sleep instead of blocking the thread"""
+        wait = self._reserve(tokens, deadline)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def _reserve(self, tokens: int, deadline: float) -> float:
+        """Take a request's share of the buckets and return how long it must wait before sending"""
+        with self._lock:
+            now = time.monotonic()
+            amounts = self._amounts(tokens)
+            wait = max(0.0, self.blocked_until - now)
+            for name, bucket in self.buckets.items():
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(amounts[name]))
+            if wait:
+                wait *= 1 + random.uniform(0, self.jitter)
+            if now + wait > deadline:
+                self.rejected += 1
+                raise RateLimitExceeded(wait)
+            for name, bucket in self.buckets.items():
+                bucket.tokens -= min(amounts[name], bucket.capacity)
+            if wait:
+                self.throttled += 1
+            return wait
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Resize the buckets from x-ratelimit-limit-*/x-ratelimit-remaining-* headers"""
+        with self._lock:
+            now = time.monotonic()
+            for suffix, (name, period) in self.HEADER_BUCKETS.items():
+                limit = headers.get(f'x-ratelimit-limit-{suffix}')
+                remaining = headers.get(f'x-ratelimit-remaining-{suffix}')
+                if limit is None and remaining is None:
+                    continue
+                try:
+                    limit = float(limit) if limit is not None else None
+                    remaining = float(remaining) if remaining is not None else None
+                except ValueError:
+                    continue
+                bucket = self.buckets.get(name)
+                if bucket is None:
+                    if not limit:
+                        continue
+                    bucket = self.buckets[name] = TokenBucket(limit, period)
+                bucket.sync(limit, remaining, now)
+
+    def retry_after(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Delay requested by a 429 response (Retry-After, else the earliest x-ratelimit-reset-*)"""
+        retry_after = parse_duration(headers.get('retry-after'))
+        if retry_after is not None:
+            return retry_after
+        resets = [parse_duration(headers.get(f'x-ratelimit-reset-{suffix}')) for suffix in self.HEADER_BUCKETS]
+        resets = [reset for reset in resets if reset is not None]
+        return min(resets) if resets else None
+
+    def block(self, seconds: float):
+        """Hold back every request for the given time (after a 429)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def state(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            buckets = {}
+            for name, bucket in self.buckets.items():
+                bucket.refill(now)
+                buckets[name] = {
+                    'capacity': bucket.capacity,
+                    'available': round(bucket.tokens, 1),
+                    'refill_per_second': round(bucket.rate, 3)
+                }
+            return {
+                'buckets': buckets,
+                'blocked_for_seconds': round(max(0.0, self.blocked_until - now), 1),
+                'throttled': self.throttled,
+                'rejected': self.rejected
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_rate_limiter(api_key: str, model: str, requests_per_minute: Optional[int] = None) -> RateLimiter:
+    """Rate limiter shared by every provider instance in this process using the same key and model"""
+    key = hashlib.sha256(f"{api_key}\0{model}".encode()).hexdigest()
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(requests_per_minute)
+        return limiter
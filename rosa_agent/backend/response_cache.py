@@ -0,0 +1,108 @@
+"""
+Response Cache
+
+Exact-match cache of LLM answers to standalone questions (first turn of a
+conversation, no command executed), such as documentation FAQs. Entries are
+keyed on provider, model, the normalized question and a hash of the system
+messages (system prompt and documentation snippets), so prompt, docs or
+provider changes never serve stale answers.
+
+The cache lives in each gunicorn worker's memory: a purge only clears the
+worker that handled it, while a settings change clears every worker's cache
+as each one picks up the new settings.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+TRAILING_PUNCTUATION_PATTERN = re.compile(r'[\s?.!]+$')
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation"""
+    question = WHITESPACE_PATTERN.sub(' ', question.strip().lower())
+    return TRAILING_PUNCTUATION_PATTERN.sub('', question)
+
+
+class ResponseCache:
+    """TTL + LRU cache of LLM responses, bounded by entry count"""
+
+    def __init__(self, max_entries: int = 256, ttl: int = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional['ResponseCache']:
+        """Create a cache from RESPONSE_CACHE_* environment variables (None unless enabled)"""
+        if os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() != 'true':
+            return None
+        return cls(
+            max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 256)),
+            ttl=int(os.getenv('RESPONSE_CACHE_TTL', 3600))
+        )
+
+    @staticmethod
+    def key(provider_name: str, model: Optional[str], question: str, context: str) -> str:
+        """Key for a question answered with the given system context (system prompt and doc snippets)"""
+        prompt_hash = hashlib.sha256(context.encode()).hexdigest()
+        return '\0'.join([provider_name, model or '', prompt_hash, normalize_question(question)])
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached response.
+
+        Returns:
+            Dict with keys: response (str), cache_age (seconds), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires_at'] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {
+                'response': entry['response'],
+                'cache_age': round(time.time() - entry['stored_at'], 1)
+            }
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                'response': response,
+                'stored_at': now,
+                'expires_at': now + self.ttl
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def purge(self) -> int:
+        """Drop every cached response and return how many were dropped"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -6,14 +6,32 @@ for the ROSA AI agent, incorporating information from the project's
 ROSA documentation.
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from backend.context_window import ContextWindowManager
+from backend.conversation_store import ConversationStore, InMemoryConversationStore, DEFAULT_SESSION_ID
+from backend.doc_index import DocIndex
 
 
 class ROSAExpert:
     """ROSA expertise system with comprehensive knowledge base"""
     
-    def __init__(self):
-        self.conversation_history = []
+    # Longest documentation excerpt injected per retrieved chunk
+    MAX_SNIPPET_CHARS = 1500
+    
+    # Smallest (partial) documentation excerpt worth sending; below this the docs are skipped
+    MIN_SNIPPET_TOKENS = 80
+    
+    KNOWLEDGE_HEADER = "[SYSTEM - Relevant documentation]\n\n"
+    KNOWLEDGE_SEPARATOR = "\n\n---\n\n"
+    
+    def __init__(self, store: Optional[ConversationStore] = None,
+                 context_manager: Optional[ContextWindowManager] = None,
+                 doc_index: Optional[DocIndex] = None, knowledge_top_k: int = 3):
+        self.store = store or InMemoryConversationStore()
+        self.context_manager = context_manager or ContextWindowManager()
+        self.doc_index = doc_index
+        self.knowledge_top_k = knowledge_top_k
     
     def get_simplified_system_prompt(self) -> str:
         """Get a simplified system prompt for token-limited endpoints"""
@@ -615,44 +633,115 @@ Assistant: "Based on the cluster status, your cluster 'myapp' is ready. The stat
 You are helpful, professional, and focused on enabling successful ROSA deployments.
 """
     
-    def add_to_conversation(self, role: str, content: str):
-        """Add a message to conversation history"""
-        self.conversation_history.append({
-            "role": role,
-            "content": content
-        })
+    def add_to_conversation(self, role: str, content: str, session_id: str = DEFAULT_SESSION_ID):
+        """Add a message to a session's conversation history"""
+        self.store.append(session_id, role, content)
+    
+    def get_conversation_history(self, session_id: str = DEFAULT_SESSION_ID) -> List[Dict[str, str]]:
+        """Get a session's conversation history (without system prompt)"""
+        return self.store.get_history(session_id)
     
-    def get_conversation_messages(self) -> List[Dict[str, str]]:
+    def get_conversation_messages(self, session_id: str = DEFAULT_SESSION_ID) -> List[Dict[str, str]]:
         """Get formatted conversation messages including system prompt"""
         messages = [
             {"role": "system", "content": self.get_system_prompt()}
         ]
-        messages.extend(self.conversation_history)
+        messages.extend(self.get_conversation_history(session_id))
         return messages
     
-    def get_conversation_messages_for_provider(self, provider_name: str = None) -> List[Dict[str, str]]:
-        """Get formatted conversation messages with provider-appropriate system prompt"""
-        # Use simplified prompt for local/custom endpoints to avoid token limits
+    def get_system_prompt_for_provider(self, provider_name: str = None) -> str:
+        """System prompt for a provider (simplified for local/custom endpoints to avoid token limits)"""
         if provider_name and provider_name.lower() == "localprovider":
-            system_prompt = self.get_simplified_system_prompt()
-        else:
-            system_prompt = self.get_system_prompt()
+            return self.get_simplified_system_prompt()
+        return self.get_system_prompt()
+    
+    def get_conversation_messages_for_provider(self, provider_name: str = None,
+                                               session_id: str = DEFAULT_SESSION_ID,
+                                               query: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Get formatted conversation messages with provider-appropriate system prompt,
+        trimmed to the provider's context token budget.
+        
+        If a query is given, documentation relevant to it is appended as a
+        system message after the history, sized to the budget left once the
+        system prompt and the recent turns are in (and skipped if none is left).
+        """
+        system_prompt = self.get_system_prompt_for_provider(provider_name)
+        history = self.get_conversation_history(session_id)
+        
+        knowledge_message = None
+        reserved_tokens = 0
+        if query:
+            available = self.context_manager.available_tokens(system_prompt, history, provider_name)
+            knowledge_message = self.get_knowledge_message(query, available)
+            if knowledge_message:
+                reserved_tokens = self.context_manager.message_tokens(knowledge_message)
         
         messages = [
             {"role": "system", "content": system_prompt}
         ]
-        messages.extend(self.conversation_history)
+        messages.extend(self.context_manager.fit(system_prompt, history, provider_name, reserved_tokens))
+        if knowledge_message:
+            messages.append(knowledge_message)
         return messages
     
-    def clear_conversation(self):
-        """Clear conversation history"""
-        self.conversation_history = []
+    def clear_conversation(self, session_id: str = DEFAULT_SESSION_ID):
+        """Clear a session's conversation history"""
+        self.store.clear(session_id)
+    
+    def get_knowledge_message(self, query: str, max_tokens: int) -> Optional[Dict[str, str]]:
+        """
+        Documentation relevant to a query as a system message of at most max_tokens.
+        
+        Snippets are added in relevance order; the first one that does not fit
+        is truncated to the remaining budget if that is at least
+        MIN_SNIPPET_TOKENS, and the rest are left out.
+        
+        Returns:
+            The message, or None if no snippet fits
+        """
+        counter = self.context_manager
+        budget = max_tokens - counter.message_tokens({'content': self.KNOWLEDGE_HEADER})
+        if budget < self.MIN_SNIPPET_TOKENS:
+            return None
+        
+        separator_tokens = counter.count_tokens(self.KNOWLEDGE_SEPARATOR)
+        parts = []
+        for snippet in self.get_knowledge_snippets(query):
+            if parts:
+                budget -= separator_tokens
+            tokens = counter.count_tokens(snippet)
+            if tokens <= budget:
+                parts.append(snippet)
+                budget -= tokens
+                continue
+            if budget >= self.MIN_SNIPPET_TOKENS:
+                parts.append(counter.truncate(snippet, budget))
+            break
+        
+        if not parts:
+            return None
+        return {
+            "role": "system",
+            "content": self.KNOWLEDGE_HEADER + self.KNOWLEDGE_SEPARATOR.join(parts)
+        }
     
     def get_knowledge_snippets(self, query: str) -> List[str]:
         """
         Get relevant knowledge snippets based on query
-        This is a simple keyword-based retrieval system
+        
+        Uses BM25 retrieval over the project documentation when the index is
+        available, falling back to the built-in keyword-matched snippets.
         """
+        if self.doc_index and self.doc_index.chunks:
+            snippets = []
+            for chunk in self.doc_index.search(query, top_k=self.knowledge_top_k):
+                text = chunk['text']
+                if len(text) > self.MAX_SNIPPET_CHARS:
+                    text = text[:self.MAX_SNIPPET_CHARS] + "\n..."
+                snippets.append(f"From {chunk['source']} ({chunk['heading']}):\n{text}")
+            return snippets
+        
         knowledge_base = {
             "prerequisites": """
 ROSA Prerequisites Checklist:
@@ -0,0 +1,168 @@
+"""
+Settings Service
+
+Holds the LLM provider settings in memory. The settings file is re-read
+only when it changes: requests do at most one stat() per check interval,
+and a file replaced by another gunicorn worker's POST /api/settings is
+picked up within that interval. The config hash lets callers rebuild the
+provider only when its configuration actually changed.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def settings_hash(settings: Dict) -> str:
+    """Stable hash of a provider's settings (provider name and config)"""
+    payload = json.dumps(
+        {'provider': settings.get('provider'), 'config': settings.get('config', {})},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def env_settings() -> Dict:
+    """Settings used when no settings file has been saved, from environment variables"""
+    # Check for Local LLM env var
+    local_llm_endpoint = os.getenv('LOCAL_LLM_ENDPOINT')
+    if local_llm_endpoint:
+        return {
+            'provider': 'local',
+            'config': {
+                'endpoint_url': local_llm_endpoint,
+                'model': os.getenv('LOCAL_LLM_MODEL', 'mistral-7b-awq')
+            }
+        }
+
+    # Check for Groq env var
+    groq_api_key = os.getenv('GROQ_API_KEY')
+    if groq_api_key:
+        return {
+            'provider': 'groq',
+            'config': {
+                'api_key': groq_api_key,
+                'model': 'llama-3.1-8b-instant'
+            }
+        }
+
+    # Default settings
+    return {
+        'provider': 'openai',
+        'config': {
+            'api_key': os.getenv('OPENAI_API_KEY', ''),
+            'model': 'gpt-4'
+        }
+    }
+
+
+class SettingsService:
+    """In-memory settings backed by a JSON file shared by all workers"""
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.version = 0
+        self._settings: Optional[Dict] = None
+        self._hash: Optional[str] = None
+        self._file_state: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'SettingsService':
+        """Create a service from SETTINGS_FILE and SETTINGS_CHECK_INTERVAL"""
+        return cls(
+            path=os.getenv('SETTINGS_FILE', '/tmp/settings.json'),
+            check_interval=float(os.getenv('SETTINGS_CHECK_INTERVAL', 2))
+        )
+
+    def _stat(self) -> Optional[Tuple]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # A replaced file gets a new inode even if mtime resolution hides the change
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error loading settings: {e}")
+        return env_settings()
+
+    def _set(self, settings: Dict, file_state: Optional[Tuple]):
+        """Replace the in-memory settings (caller holds the lock)"""
+        config_hash = settings_hash(settings)
+        if config_hash != self._hash:
+            self.version += 1
+            if self._settings is not None:
+                logger.info(f"Settings changed (version {self.version}, provider {settings.get('provider')})")
+        self._settings = settings
+        self._hash = config_hash
+        self._file_state = file_state
+        self._loaded_at = time.time()
+
+    def _refresh(self):
+        """Reload the file if it changed since the last check (caller holds the lock)"""
+        now = time.monotonic()
+        if self._settings is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        file_state = self._stat()
+        if self._settings is None or file_state != self._file_state:
+            self._set(self._load(), file_state)
+
+    def get(self) -> Dict:
+        """Current settings (a copy)"""
+        return self.get_with_hash()[0]
+
+    def get_with_hash(self) -> Tuple[Dict, str]:
+        """Current settings (a copy) and their config hash"""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._settings), self._hash
+
+    def save(self, settings: Dict):
+        """
+        Write settings to the file (atomically, so other workers never read a
+        partial file) and make them current in this worker.
+
+        Raises:
+            OSError: if the file cannot be written
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.settings-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(settings, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._set(copy.deepcopy(settings), self._stat())
+            self._checked_at = time.monotonic()
+
+    def stats(self) -> Dict[str, any]:
+        with self._lock:
+            return {
+                'version': self.version,
+                'config_hash': self._hash[:12] if self._hash else None,
+                'from_file': self._file_state is not None,
+                'loaded_at': self._loaded_at
+            }
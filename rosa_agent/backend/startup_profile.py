@@ -0,0 +1,150 @@
+"""
+Startup Profile
+
+Records how long a worker takes to start: time from process start until
+the app module begins importing, each startup phase marked by the app
+(imports, components, provider, warm-up), and - with
+STARTUP_PROFILE_IMPORTS=true - a `python -X importtime` style breakdown of
+the modules imported while the app module loaded. Served at
+/api/debug/startup.
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux only, 10ms resolution)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 is the start time in clock ticks since boot; the command name may contain spaces
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return max(uptime - start_ticks / os.sysconf('SC_CLK_TCK'), 0.0)
+
+
+class ImportTimer:
+    """
+    Times imports made on the installing thread by wrapping builtins.__import__.
+
+    Only imports that load new modules are recorded; 'self' excludes the time
+    spent in nested imports, 'cumulative' includes it.
+    """
+
+    def __init__(self):
+        self.records: List[Dict] = []
+        self._original = None
+        self._thread_id = None
+        self._children: List[float] = []
+
+    def install(self):
+        self._original = builtins.__import__
+        self._thread_id = threading.get_ident()
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        # Bound methods are created on each access, so compare with == rather than is
+        if self._original and builtins.__import__ == self._import:
+            builtins.__import__ = self._original
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self._thread_id:
+            return self._original(name, globals, locals, fromlist, level)
+
+        loaded_before = len(sys.modules)
+        self._children.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - started
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            if len(sys.modules) > loaded_before:
+                self.records.append({
+                    'module': self._module_name(name, globals, fromlist, level),
+                    'self_ms': round((cumulative - children) * 1000, 2),
+                    'cumulative_ms': round(cumulative * 1000, 2),
+                    'depth': len(self._children)
+                })
+
+    @staticmethod
+    def _module_name(name, globals, fromlist, level) -> str:
+        """Absolute name of an imported module (relative imports are resolved against the importer)"""
+        if not level:
+            return name
+        package = (globals or {}).get('__package__') or ''
+        try:
+            resolved = importlib.util.resolve_name('.' * level + name, package)
+        except (ImportError, ValueError):
+            return '.' * level + name
+        if not name and fromlist:
+            # 'from . import x' imports submodules named in the fromlist
+            return ', '.join(f"{resolved}.{item}" for item in fromlist)
+        return resolved
+
+    def slowest(self, limit: int = 25) -> List[Dict]:
+        return sorted(self.records, key=lambda record: record['cumulative_ms'], reverse=True)[:limit]
+
+
+class StartupProfile:
+    """Startup phases of this worker, marked in order by the app"""
+
+    def __init__(self, time_imports: bool = False):
+        self.pid = os.getpid()
+        self.started: Optional[float] = None
+        self.before_app_seconds: Optional[float] = None
+        self.phases: List[Dict] = []
+        self.time_imports = time_imports
+        self.imports = ImportTimer()
+        self._last_mark: Optional[float] = None
+
+    def start(self):
+        """Begin profiling; call before the app's own imports so they are timed"""
+        self.started = self._last_mark = time.perf_counter()
+        self.before_app_seconds = process_age()
+        # Wrapping __import__ slows every import, so it is opt-in and removed once the app has loaded
+        if self.time_imports:
+            self.imports.install()
+
+    def mark(self, phase: str):
+        """End a phase that ran since the previous mark"""
+        if self.started is None:
+            return
+        now = time.perf_counter()
+        self.phases.append({'name': phase, 'seconds': round(now - self._last_mark, 4)})
+        self._last_mark = now
+
+    def stop_import_timing(self):
+        self.imports.uninstall()
+
+    def report(self, limit: int = 25) -> Dict[str, any]:
+        app_seconds = sum(phase['seconds'] for phase in self.phases)
+        return {
+            'pid': self.pid,
+            'process_start_to_app_import_seconds': (
+                round(self.before_app_seconds, 3) if self.before_app_seconds is not None else None
+            ),
+            'app_startup_seconds': round(app_seconds, 4),
+            'phases': list(self.phases),
+            'imports': {
+                'enabled': self.time_imports,
+                'imports_timed': len(self.imports.records),
+                'total_ms': round(sum(record['cumulative_ms'] for record in self.imports.records
+                                      if record['depth'] == 0), 2),
+                'slowest': self.imports.slowest(limit)
+            }
+        }
+
+
+# Shared by backend.app, which starts it before its other imports
+startup_profile = StartupProfile(time_imports=os.getenv('STARTUP_PROFILE_IMPORTS', 'false').lower() == 'true')
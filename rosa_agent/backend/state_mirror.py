@@ -0,0 +1,384 @@
+"""
+Cluster State Mirror
+
+Optional background mirror of the cluster state users ask about. Once a
+state command has answered a chat question, the mirror keeps it up to date:
+ROSA commands (rosa list clusters, rosa describe cluster, ...) are polled
+with an adaptive interval - short while anything is changing or in a
+transitional state such as 'installing', backing off while nothing changes -
+and in-cluster resources (oc get nodes, pods, ...) are followed with an
+`oc get --watch` stream. Chat answers repeated state questions from the
+in-memory snapshot while it is fresh, so polling a deployment costs no
+subprocess per question.
+"""
+
+import codecs
+import json
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from backend.output_parsers import structured_command
+
+logger = logging.getLogger(__name__)
+
+# Cluster and machine pool states that are expected to change soon
+TRANSITIONAL_STATES = {
+    'pending', 'waiting', 'validating', 'installing', 'uninstalling', 'updating', 'upgrading',
+    'hibernating', 'resuming', 'powering_down', 'scaling'
+}
+
+WATCH_FLAGS = ['--watch-only', '--output-watch-events']
+WATCH_READ_BYTES = 64 * 1024
+
+
+def isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if not timestamp:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+def item_key(item: Dict) -> str:
+    metadata = item.get('metadata') or {}
+    return f"{metadata.get('namespace', '')}/{metadata.get('name', '')}"
+
+
+class MirrorEntry:
+    """Mirrored state of one command"""
+
+    def __init__(self, command: str, json_command: str, watch: bool, interval: float):
+        self.command = command
+        self.json_command = json_command
+        self.watch = watch
+        self.interval = interval
+        self.result: Optional[Dict] = None
+        self.updated_at = 0.0
+        self.changed_at = 0.0
+        self.last_requested = time.time()
+        self.next_refresh = 0.0
+        self.stale = False
+        # Watch state: raw objects by namespace/name, rebuilt into a result on demand
+        self.process: Optional[subprocess.Popen] = None
+        self.items: 'OrderedDict[str, Dict]' = OrderedDict()
+        self.dirty = False
+        self.last_event_at = 0.0
+
+    def watching(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+class StateMirror:
+    """In-memory, background-refreshed snapshot of state command results"""
+
+    def __init__(self, cli_executor, poll_min: float = 15, poll_max: float = 300, max_age: float = 600,
+                 idle_ttl: float = 1800, max_entries: int = 8):
+        self.cli_executor = cli_executor
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.max_age = max_age
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, MirrorEntry] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, cli_executor) -> Optional['StateMirror']:
+        """Create a mirror from STATE_MIRROR_* environment variables (None unless enabled)"""
+        if os.getenv('STATE_MIRROR_ENABLED', 'false').lower() != 'true':
+            return None
+        return cls(
+            cli_executor,
+            poll_min=float(os.getenv('STATE_MIRROR_POLL_MIN', 15)),
+            poll_max=float(os.getenv('STATE_MIRROR_POLL_MAX', 300)),
+            max_age=float(os.getenv('STATE_MIRROR_MAX_AGE', 600)),
+            idle_ttl=float(os.getenv('STATE_MIRROR_IDLE_TTL', 1800)),
+            max_entries=int(os.getenv('STATE_MIRROR_MAX_ENTRIES', 8))
+        )
+
+    @staticmethod
+    def normalize(command: str) -> Optional[List[str]]:
+        try:
+            return shlex.split(command)
+        except ValueError:
+            return None
+
+    def supports(self, command: str) -> bool:
+        """Whether a command can be mirrored (a structured rosa or oc get read command)"""
+        parts = self.normalize(command)
+        return bool(parts) and parts[0] in ('rosa', 'oc') and structured_command(parts) is not None
+
+    def lookup(self, command: str) -> Optional[Dict[str, any]]:
+        """
+        Return the mirrored result of a command if it is fresh.
+
+        Returns:
+            The result in CLIExecutor.execute() shape with cached=True, mirrored=True,
+            as_of (when the state was last confirmed), last_changed and age_seconds -
+            or None if the command is not mirrored or its snapshot is stale
+        """
+        parts = self.normalize(command)
+        if not parts:
+            return None
+        key = ' '.join(parts)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.last_requested = now
+            if entry.watch and entry.watching():
+                # A live watch is current up to now
+                if entry.dirty:
+                    self._rebuild(entry)
+                as_of = now
+            elif self._is_fresh(entry, now):
+                as_of = entry.updated_at
+            else:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(
+                entry.result,
+                cached=True,
+                mirrored=True,
+                as_of=isoformat(as_of),
+                last_changed=isoformat(entry.changed_at),
+                age_seconds=round(now - as_of, 1)
+            )
+
+    def _is_fresh(self, entry: MirrorEntry, now: float) -> bool:
+        if entry.stale or not entry.result or not entry.result['success']:
+            return False
+        # Serve a snapshot until its next refresh is overdue (and never beyond max_age)
+        return now - entry.updated_at <= min(entry.interval + self.poll_min, self.max_age)
+
+    def track(self, command: str, result: Dict[str, any]):
+        """Start mirroring a command that was just executed, seeding the snapshot with its result"""
+        if not self.supports(command):
+            return
+        parts = self.normalize(command)
+        key = ' '.join(parts)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    self._evict(min(self._entries.values(), key=lambda e: e.last_requested))
+                # Watches need the full objects, so always JSON
+                entry = MirrorEntry(command, shlex.join(structured_command(parts, compact=False)),
+                                    watch=parts[0] == 'oc', interval=self.poll_min)
+                self._entries[key] = entry
+                logger.info(f"State mirror tracking: {command}")
+            entry.last_requested = time.time()
+            if not entry.watching():
+                self._update(entry, result)
+                if entry.watch:
+                    self._watch_from(entry, result)
+        self._ensure_started()
+        self._wake.set()
+
+    def invalidate(self):
+        """Mark polled snapshots stale (e.g. after a mutating command) and refresh them now"""
+        with self._lock:
+            for entry in self._entries.values():
+                if not entry.watching():
+                    entry.stale = True
+                    entry.next_refresh = 0.0
+        self._wake.set()
+
+    def _update(self, entry: MirrorEntry, result: Dict[str, any]):
+        """Store a polled result and adapt the entry's refresh interval (caller holds the lock)"""
+        now = time.time()
+        changed = entry.result is None or self._fingerprint(entry.result) != self._fingerprint(result)
+        if changed:
+            entry.changed_at = now
+        entry.result = {key: value for key, value in result.items()
+                        if key not in ('cached', 'cache_age', 'mirrored', 'as_of', 'last_changed', 'age_seconds')}
+        entry.updated_at = now
+        entry.stale = False
+
+        if result['success'] and (changed or self._transitional(result)):
+            entry.interval = self.poll_min
+        else:
+            entry.interval = min(entry.interval * 2, self.poll_max)
+        entry.next_refresh = now + entry.interval
+
+    @staticmethod
+    def _fingerprint(result: Dict[str, any]):
+        structured = result.get('structured')
+        if structured:
+            return json.dumps(structured['records'], sort_keys=True, default=str)
+        return result.get('output'), result.get('error'), result.get('exit_code')
+
+    @staticmethod
+    def _transitional(result: Dict[str, any]) -> bool:
+        records = (result.get('structured') or {}).get('records') or []
+        return any(str(record.get('state', '')).lower() in TRANSITIONAL_STATES for record in records)
+
+    def _evict(self, entry: MirrorEntry):
+        """Stop mirroring an entry (caller holds the lock)"""
+        logger.info(f"State mirror dropping: {entry.command}")
+        self._entries.pop(' '.join(self.normalize(entry.command)), None)
+        self._stop_watch(entry)
+
+    @staticmethod
+    def _stop_watch(entry: MirrorEntry):
+        if entry.watching():
+            entry.process.kill()
+        entry.process = None
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='state-mirror', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the refresh thread and every watch process"""
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            for entry in self._entries.values():
+                self._stop_watch(entry)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.time()
+            due = []
+            with self._lock:
+                for entry in list(self._entries.values()):
+                    if now - entry.last_requested > self.idle_ttl:
+                        self._evict(entry)
+                    elif not entry.watching() and entry.next_refresh <= now:
+                        due.append(entry)
+                next_refresh = min((entry.next_refresh for entry in self._entries.values()
+                                    if not entry.watching()), default=now + self.poll_max)
+
+            for entry in due:
+                try:
+                    self._refresh(entry)
+                except Exception as e:
+                    logger.error(f"State mirror refresh failed for {entry.command}: {e}")
+
+            if not due:
+                self._wake.wait(max(0.0, min(next_refresh - now, self.poll_max)))
+                self._wake.clear()
+
+    def _refresh(self, entry: MirrorEntry):
+        """Poll a ROSA entry, or (re)list and start watching an in-cluster one"""
+        result = self.cli_executor.execute(entry.json_command, use_cache=False)
+        if 'structured' not in result:
+            result = self.cli_executor.add_structured_output(entry.command, result)
+
+        with self._lock:
+            if self._entries.get(' '.join(self.normalize(entry.command))) is not entry:
+                return
+            self._update(entry, result)
+            if entry.watch:
+                self._watch_from(entry, result)
+
+    def _watch_from(self, entry: MirrorEntry, result: Dict[str, any]):
+        """Seed a watched entry's objects from a JSON list result and follow changes (caller holds the lock)"""
+        if not result['success'] or 'structured' not in result:
+            return
+        try:
+            items = json.loads(result['output']).get('items', [])
+        except (ValueError, AttributeError):
+            return
+        entry.items = OrderedDict((item_key(item), item) for item in items)
+        entry.dirty = False
+        entry.last_event_at = entry.updated_at
+
+        argv = shlex.split(entry.json_command) + WATCH_FLAGS
+        try:
+            entry.process = self.cli_executor.sandbox.popen(argv, stdout=subprocess.PIPE,
+                                                            stderr=subprocess.DEVNULL)
+        except OSError as e:
+            logger.error(f"State mirror could not start watch for {entry.command}: {e}")
+            return
+        logger.info(f"State mirror watching: {shlex.join(argv)}")
+        threading.Thread(target=self._read_watch, args=(entry, entry.process),
+                         name='state-mirror-watch', daemon=True).start()
+
+    def _read_watch(self, entry: MirrorEntry, process: subprocess.Popen):
+        """Apply watch events ({"type": ..., "object": ...} JSON documents) as they arrive"""
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buffer = ''
+        with process.stdout:
+            for chunk in iter(lambda: process.stdout.read1(WATCH_READ_BYTES), b''):
+                buffer += text.decode(chunk)
+                while True:
+                    buffer = buffer.lstrip()
+                    try:
+                        event, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break
+                    buffer = buffer[end:]
+                    self._apply_event(entry, event)
+        process.wait()
+
+        with self._lock:
+            if entry.process is process:
+                # Relist and watch again on the next refresh pass (watches expire, tokens rotate)
+                logger.info(f"State mirror watch ended for {entry.command} (exit code {process.returncode})")
+                entry.process = None
+                if entry.dirty:
+                    self._rebuild(entry)
+                entry.next_refresh = time.time() + self.poll_min
+        self._wake.set()
+
+    def _apply_event(self, entry: MirrorEntry, event: Dict):
+        item = event.get('object') if isinstance(event, dict) else None
+        if not isinstance(item, dict):
+            return
+        with self._lock:
+            if event.get('type') == 'DELETED':
+                entry.items.pop(item_key(item), None)
+            else:
+                entry.items[item_key(item)] = item
+            entry.dirty = True
+            entry.last_event_at = time.time()
+
+    def _rebuild(self, entry: MirrorEntry):
+        """Turn the watched objects back into a command result (caller holds the lock)"""
+        output = json.dumps({'apiVersion': 'v1', 'kind': 'List', 'items': list(entry.items.values())})
+        result = self.cli_executor.add_structured_output(
+            entry.command, {'success': True, 'output': output, 'error': '', 'exit_code': 0}
+        )
+        changed = self._fingerprint(result) != self._fingerprint(entry.result or {})
+        entry.result = result
+        entry.updated_at = entry.last_event_at
+        if changed:
+            entry.changed_at = entry.last_event_at
+        entry.dirty = False
+
+    def stats(self) -> Dict[str, any]:
+        now = time.time()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': [
+                    {
+                        'command': entry.command,
+                        'mode': 'watch' if entry.watching() else 'poll',
+                        'interval_seconds': None if entry.watching() else entry.interval,
+                        'updated_at': isoformat(entry.updated_at),
+                        'last_changed': isoformat(entry.changed_at),
+                        'fresh': entry.watching() or self._is_fresh(entry, now)
+                    }
+                    for entry in self._entries.values()
+                ]
+            }
@@ -0,0 +1,67 @@
+"""
+CLI Version Inventory
+
+Probes the installed CLI tools once at startup and refreshes the result in a
+background thread, so health checks never have to spawn subprocesses.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class VersionInventory:
+    """Cached, background-refreshed inventory of CLI tool versions"""
+
+    def __init__(self, cli_executor, ttl: int = 300):
+        self.cli_executor = cli_executor
+        self.ttl = ttl
+        self._versions: Dict[str, str] = {tool: 'unknown' for tool in cli_executor.VERSION_COMMANDS}
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> Dict[str, str]:
+        """Probe all CLI tools (CLIExecutor.get_cli_versions) and update the cached versions"""
+        versions = self.cli_executor.get_cli_versions()
+
+        with self._lock:
+            self._versions = versions
+            self._refreshed_at = time.time()
+        return versions
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"CLI version refresh failed: {e}")
+            self._stop.wait(self.ttl)
+
+    def start(self):
+        """Start the background refresh thread (first probe runs immediately)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='cli-version-inventory', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, any]:
+        """Return the cached versions without doing any I/O"""
+        with self._lock:
+            versions = dict(self._versions)
+            refreshed_at = self._refreshed_at
+
+        return {
+            'versions': versions,
+            'refreshed_at': refreshed_at,
+            'age_seconds': round(time.time() - refreshed_at, 1) if refreshed_at else None
+        }
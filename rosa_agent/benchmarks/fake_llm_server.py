@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI-compatible LLM server for benchmarks.
+
+Serves /v1/chat/completions (plain and streamed) and /v1/models without a
+real model: responses are a fixed number of tokens emitted at a fixed token
+rate after a configurable time to first token, so the agent can be
+benchmarked without API keys or GPUs.
+
+Usage:
+    python benchmarks/fake_llm_server.py --port 8081 --tokens 200 --token-rate 100 --ttft 0.2
+"""
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Set from the command line in main()
+    tokens = 200
+    token_rate = 100.0
+    ttft = 0.2
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/v1/models':
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'fake-model', 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt_tokens = sum(len(message.get('content', '')) for message in request.get('messages', [])) // 4
+        completion_tokens = min(self.tokens, request.get('max_tokens') or self.tokens)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens}
+        words = [f"token{index} " for index in range(completion_tokens)]
+
+        time.sleep(self.ttft)
+
+        if not request.get('stream'):
+            time.sleep(completion_tokens / self.token_rate)
+            self._send_json(200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'model': request.get('model', 'fake-model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(words)},
+                             'finish_reason': 'stop'}],
+                'usage': usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        started = time.monotonic()
+        for index, word in enumerate(words):
+            # Pace tokens against the start time so the rate holds regardless of write overhead
+            delay = started + index / self.token_rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            chunk = {'choices': [{'index': 0, 'delta': {'content': word}}]}
+            self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        if (request.get('stream_options') or {}).get('include_usage'):
+            self._send_chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        self._send_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping pooled keep-alive connections is expected under load
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--tokens', type=int, default=200, help='completion tokens per response')
+    parser.add_argument('--token-rate', type=float, default=100.0, help='tokens per second')
+    parser.add_argument('--ttft', type=float, default=0.2, help='seconds before the first token')
+    args = parser.parse_args()
+
+    FakeLLMHandler.tokens = args.tokens
+    FakeLLMHandler.token_rate = args.token_rate
+    FakeLLMHandler.ttft = args.ttft
+
+    server = FakeLLMServer((args.host, args.port), FakeLLMHandler)
+    print(f"Fake LLM server on http://{args.host}:{args.port} "
+          f"({args.tokens} tokens at {args.token_rate}/s, TTFT {args.ttft}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for backend.app.
+
+Imports the app in fresh interpreters under `python -X importtime`, reports
+the slowest modules (cumulative), and exits non-zero when the median import
+time exceeds the budget - run it in CI to catch startup regressions such as
+an SDK imported at module level again.
+
+Usage (from rosa_agent/):
+    python benchmarks/import_time.py --budget-ms 400 --runs 5
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(module: str, env: dict) -> dict:
+    """Import a module in a fresh interpreter; returns {module: (self_us, cumulative_us, depth)}"""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=AGENT_DIR, env=env, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        sys.exit(f"import {module} failed:\n{process.stderr[-2000:]}")
+    timings = {}
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            timings[match.group(4)] = (int(match.group(1)), int(match.group(2)), depth)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='backend.app')
+    parser.add_argument('--budget-ms', type=float, default=400.0, help='maximum median import time')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='slowest modules to list')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='rosa-agent-import-')
+    # Keep the import free of external state: in-memory conversations, scratch storage, no saved settings
+    env = dict(
+        os.environ,
+        PYTHONPATH=AGENT_DIR,
+        CONVERSATION_STORE='memory',
+        JOB_STORAGE_DIR=os.path.join(workdir, 'jobs'),
+        CLI_OUTPUT_STORAGE_DIR=os.path.join(workdir, 'outputs'),
+        DOCS_INDEX_PATH=os.path.join(workdir, 'doc_index.json'),
+        SETTINGS_FILE=os.path.join(workdir, 'settings.json')
+    )
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
+    # The first run builds the docs index cache, so it is not counted
+    measure(args.module, env)
+    runs = [measure(args.module, env) for _ in range(args.runs)]
+    totals = [run[args.module][1] / 1000 for run in runs if args.module in run]
+    median = statistics.median(totals)
+
+    print(f"import {args.module}: median {median:.1f}ms over {len(totals)} runs "
+          f"(min {min(totals):.1f}ms, max {max(totals):.1f}ms), budget {args.budget_ms:.0f}ms")
+    print(f"\nSlowest imports (cumulative, last run):")
+    last = runs[-1]
+    for name, (self_us, cumulative_us, depth) in sorted(last.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {self_us / 1000:7.1f}ms self  {'  ' * depth}{name}")
+
+    if median > args.budget_ms:
+        print(f"\nFAIL: import time {median:.1f}ms exceeds the {args.budget_ms:.0f}ms budget")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
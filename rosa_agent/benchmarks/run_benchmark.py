@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Agent benchmark driver.
+
+Starts the fake LLM server and the agent (gunicorn, as in the container)
+with stub CLI tools on PATH, drives the selected endpoints at a fixed
+concurrency, and reports throughput, latency percentiles and per-worker
+memory. Results are written as JSON so runs can be compared across changes.
+
+Usage (from rosa_agent/):
+    python benchmarks/run_benchmark.py --concurrency 20 --requests 400
+    python benchmarks/run_benchmark.py --server-mode asgi --scenarios chat,chat_stream
+    python benchmarks/run_benchmark.py --url http://localhost:5000 --scenarios health
+
+Needs Linux (/proc) for memory sampling.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+sys.path.insert(0, BENCHMARKS_DIR)
+from stub_cli import write_stubs  # noqa: E402
+
+SCENARIOS = ('health', 'execute', 'chat', 'chat_stream')
+
+# Alternate between a question that triggers a CLI command and one that does not
+CHAT_MESSAGES = ('How many clusters do I have?', 'What are the prerequisites for a ROSA HCP cluster?')
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def wait_for(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def child_pids(parent_pid: int) -> List[int]:
+    """Direct children of a process (gunicorn workers of the master)"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Field 4 is the parent pid; the command name (field 2) may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid:
+            children.append(int(entry))
+    return children
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler:
+    """Samples the RSS of the gunicorn master's workers in the background"""
+
+    def __init__(self, master_pid: Optional[int], interval: float = 0.5):
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peak_kb: Dict[int, int] = {}
+        self.last_kb: Dict[int, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if self.master_pid and os.path.isdir('/proc'):
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            for pid in child_pids(self.master_pid):
+                rss = rss_kb(pid)
+                if rss is not None:
+                    self.last_kb[pid] = rss
+                    self.peak_kb[pid] = max(rss, self.peak_kb.get(pid, 0))
+            self._stop.wait(self.interval)
+
+    def stop(self) -> Dict[str, Dict[str, float]]:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return {
+            str(pid): {'rss_mb': round(self.last_kb[pid] / 1024, 1), 'peak_rss_mb': round(self.peak_kb[pid] / 1024, 1)}
+            for pid in sorted(self.peak_kb)
+        }
+
+
+def make_request(session: requests.Session, base_url: str, scenario: str, index: int) -> bool:
+    """Send one request for a scenario; returns whether it succeeded"""
+    if scenario == 'health':
+        response = session.get(f"{base_url}/api/health", timeout=30)
+        return response.ok
+
+    if scenario == 'execute':
+        response = session.post(f"{base_url}/api/execute", json={'command': 'rosa list clusters'}, timeout=120)
+        return response.ok and response.json().get('success', False)
+
+    payload = {
+        'message': CHAT_MESSAGES[index % len(CHAT_MESSAGES)],
+        # A fresh session per request keeps prompt sizes constant across the run
+        'session_id': f"bench-{uuid.uuid4().hex[:16]}"
+    }
+    if scenario == 'chat':
+        response = session.post(f"{base_url}/api/chat", json=payload, timeout=300)
+        return response.ok and response.json().get('success', False)
+
+    with session.post(f"{base_url}/api/chat/stream", json=payload, timeout=300, stream=True) as response:
+        if not response.ok:
+            return False
+        events = [line for line in response.iter_lines(decode_unicode=True) if line.startswith('event:')]
+        return bool(events) and events[-1] == 'event: done'
+
+
+def run_scenario(base_url: str, scenario: str, concurrency: int, total: int) -> Dict:
+    """Drive one scenario with `concurrency` client threads until `total` requests have completed"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok = make_request(session, base_url, scenario, index)
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'concurrency': concurrency,
+        'duration_seconds': round(wall, 2),
+        'rps': round(len(latencies) / wall, 2) if wall else None,
+        'latency_ms': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 0.50)),
+            'p95': ms(percentile(latencies, 0.95)),
+            'p99': ms(percentile(latencies, 0.99)),
+            'max': ms(max(latencies)) if latencies else None
+        }
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=AGENT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_stack(args, workdir: str) -> Dict:
+    """Start the fake LLM server and the agent; returns the processes and base URL"""
+    bin_dir = os.path.join(workdir, 'bin')
+    write_stubs(bin_dir, latency=args.cli_latency, output_bytes=args.cli_output_bytes)
+
+    llm = subprocess.Popen([
+        sys.executable, os.path.join(BENCHMARKS_DIR, 'fake_llm_server.py'),
+        '--port', str(args.llm_port), '--tokens', str(args.llm_tokens),
+        '--token-rate', str(args.llm_token_rate), '--ttft', str(args.llm_ttft)
+    ], stdout=subprocess.DEVNULL)
+
+    metrics_dir = os.path.join(workdir, 'prometheus')
+    os.makedirs(metrics_dir)
+    env = dict(
+        os.environ,
+        PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        PORT=str(args.port),
+        SERVER_MODE=args.server_mode,
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads),
+        LOCAL_LLM_ENDPOINT=f"http://127.0.0.1:{args.llm_port}",
+        LOCAL_LLM_MODEL='fake-model',
+        SETTINGS_FILE=os.path.join(workdir, 'settings.json'),
+        CONVERSATION_STORE='sqlite',
+        CONVERSATION_DB_PATH=os.path.join(workdir, 'conversations.db'),
+        JOB_STORAGE_DIR=os.path.join(workdir, 'jobs'),
+        CLI_OUTPUT_STORAGE_DIR=os.path.join(workdir, 'outputs'),
+        DOCS_DIR=os.path.dirname(AGENT_DIR),
+        DOCS_INDEX_PATH=os.path.join(workdir, 'doc_index.json'),
+        PROMETHEUS_MULTIPROC_DIR=metrics_dir,
+        CLI_CACHE_ENABLED='true' if args.cli_cache else 'false'
+    )
+    log = open(os.path.join(workdir, 'agent.log'), 'w')
+    agent = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'backend/gunicorn.conf.py'],
+        cwd=AGENT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for(f"http://127.0.0.1:{args.llm_port}/v1/models")
+        wait_for(f"{base_url}/api/health/live")
+    except RuntimeError:
+        for process in (agent, llm):
+            process.terminate()
+        raise
+    return {'processes': [agent, llm], 'base_url': base_url, 'master_pid': agent.pid, 'log': log}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--url', help='benchmark an already running agent instead of starting one')
+    parser.add_argument('--server-mode', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--llm-port', type=int, default=8081)
+    parser.add_argument('--llm-tokens', type=int, default=200)
+    parser.add_argument('--llm-token-rate', type=float, default=100.0)
+    parser.add_argument('--llm-ttft', type=float, default=0.2)
+    parser.add_argument('--cli-latency', type=float, default=0.5)
+    parser.add_argument('--cli-output-bytes', type=int, default=4096)
+    parser.add_argument('--no-cli-cache', dest='cli_cache', action='store_false',
+                        help='disable the CLI result cache so every execute spawns a process')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<timestamp>.json)')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix='rosa-agent-bench-')
+    stack = None
+    try:
+        if args.url:
+            base_url, master_pid = args.url.rstrip('/'), None
+        else:
+            stack = start_stack(args, workdir)
+            base_url, master_pid = stack['base_url'], stack['master_pid']
+
+        results = {}
+        for scenario in scenarios:
+            print(f"Running {scenario}: {args.requests} requests at concurrency {args.concurrency}...", flush=True)
+            sampler = MemorySampler(master_pid).start()
+            results[scenario] = run_scenario(base_url, scenario, args.concurrency, args.requests)
+            results[scenario]['workers'] = sampler.stop()
+            summary = results[scenario]
+            print(f"  {summary['rps']} req/s, p50 {summary['latency_ms']['p50']}ms, "
+                  f"p95 {summary['latency_ms']['p95']}ms, p99 {summary['latency_ms']['p99']}ms, "
+                  f"{summary['errors']} errors", flush=True)
+    finally:
+        if stack:
+            for process in stack['processes']:
+                process.terminate()
+            for process in stack['processes']:
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            stack['log'].close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': git_commit(),
+        'config': vars(args),
+        'scenarios': results
+    }
+    output = args.output or os.path.join(BENCHMARKS_DIR, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Stub rosa/oc/aws/ocm executables for benchmarks.
+
+Writes one executable per tool into a directory. Each stub sleeps for a
+configurable latency, prints a configurable amount of table-like output and
+exits 0, so the agent's command paths can be exercised without real
+clusters or cloud credentials. Put the directory first on PATH.
+
+Usage:
+    python benchmarks/stub_cli.py /tmp/bench-bin --latency 0.5 --output-bytes 4096
+"""
+
+import argparse
+import os
+import stat
+import sys
+
+TOOLS = ('rosa', 'oc', 'aws', 'ocm')
+
+STUB_TEMPLATE = '''#!{python}
+import sys, time
+time.sleep({latency})
+row = "{{:<24}}{{:<16}}{{:<12}}".format("name-{{:04d}}", "ready", sys.argv[1] if len(sys.argv) > 1 else "-")
+lines = ["{tool} " + " ".join(sys.argv[1:])]
+size = 0
+index = 0
+while size < {output_bytes}:
+    line = row.format(index)
+    lines.append(line)
+    size += len(line) + 1
+    index += 1
+sys.stdout.write("\\n".join(lines) + "\\n")
+'''
+
+
+def write_stubs(directory: str, latency: float = 0.1, output_bytes: int = 2048, tools=TOOLS):
+    """Write stub executables for each tool into directory"""
+    os.makedirs(directory, exist_ok=True)
+    for tool in tools:
+        path = os.path.join(directory, tool)
+        with open(path, 'w') as f:
+            f.write(STUB_TEMPLATE.format(python=sys.executable, tool=tool, latency=latency,
+                                         output_bytes=output_bytes))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory')
+    parser.add_argument('--latency', type=float, default=0.1, help='seconds each command takes')
+    parser.add_argument('--output-bytes', type=int, default=2048, help='approximate stdout size')
+    args = parser.parse_args()
+
+    write_stubs(args.directory, args.latency, args.output_bytes)
+    print(f"Wrote {', '.join(TOOLS)} stubs to {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
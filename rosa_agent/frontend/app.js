@@ -1,6 +1,9 @@
 // API base URL
 const API_BASE = window.location.origin;
 
+// Conversation session id (kept per browser so each user has their own history)
+const SESSION_ID = getSessionId();
+
 // DOM elements
 const messagesContainer = document.getElementById('messages');
 const messageInput = document.getElementById('messageInput');
@@ -8,6 +11,8 @@ const sendBtn = document.getElementById('sendBtn');
 const clearBtn = document.getElementById('clearBtn');
 const terminal = document.getElementById('terminal');
 const clearTerminalBtn = document.getElementById('clearTerminal');
+const terminalForm = document.getElementById('terminalForm');
+const terminalInput = document.getElementById('terminalInput');
 
 // Initialize marked.js for markdown rendering
 marked.setOptions({
@@ -21,6 +26,18 @@ marked.setOptions({
     gfm: true
 });
 
+// Get or create the conversation session id
+function getSessionId() {
+    let sessionId = localStorage.getItem('rosaAgentSessionId');
+    if (!sessionId) {
+        sessionId = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        localStorage.setItem('rosaAgentSessionId', sessionId);
+    }
+    return sessionId;
+}
+
 // Auto-resize textarea
 messageInput.addEventListener('input', function () {
     this.style.height = 'auto';
@@ -44,6 +61,12 @@ clearBtn.addEventListener('click', clearChat);
 // Clear terminal button
 clearTerminalBtn.addEventListener('click', clearTerminal);
 
+// Run a command typed into the terminal
+terminalForm.addEventListener('submit', function (e) {
+    e.preventDefault();
+    streamCommand(terminalInput.value.trim());
+});
+
 // Add to terminal
 function addTerminalOutput(command, output, error = null) {
     // Add command
@@ -69,6 +92,61 @@ function addTerminalOutput(command, output, error = null) {
     terminal.scrollTop = terminal.scrollHeight;
 }
 
+// Add a single line to the terminal
+function appendTerminalLine(className, text) {
+    const line = document.createElement('div');
+    line.className = `terminal-line ${className}`;
+    line.textContent = text;
+    terminal.appendChild(line);
+    terminal.scrollTop = terminal.scrollHeight;
+}
+
+// Run a command and stream its output into the terminal line by line
+async function streamCommand(command) {
+    if (!command) return;
+
+    terminalInput.value = '';
+    terminalInput.disabled = true;
+    appendTerminalLine('terminal-command', command);
+
+    try {
+        const response = await fetch(`${API_BASE}/api/execute/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ command })
+        });
+
+        if (!response.ok) {
+            const data = await response.json();
+            appendTerminalLine('terminal-error', data.error || 'Failed to run command');
+            return;
+        }
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'line') {
+                appendTerminalLine(
+                    data.stream === 'stderr' ? 'terminal-error' : 'terminal-output',
+                    data.line.replace(/\n$/, '')
+                );
+            } else if (event === 'exit') {
+                // stderr has already been streamed; only show errors raised before the command ran
+                if (!data.success) {
+                    appendTerminalLine('terminal-error', data.total_bytes
+                        ? `Exit code: ${data.exit_code}`
+                        : `${data.error.trim()} (exit code ${data.exit_code})`);
+                }
+            }
+        });
+    } catch (error) {
+        appendTerminalLine('terminal-error', error.message);
+    } finally {
+        terminalInput.disabled = false;
+        terminalInput.focus();
+    }
+}
+
 // Clear terminal
 function clearTerminal() {
     terminal.innerHTML = '<div class="terminal-line terminal-info">Terminal cleared.</div>';
@@ -100,64 +178,55 @@ async function sendMessage() {
     const loadingId = showLoading();
 
     try {
-        // Send to API
-        const response = await fetch(`${API_BASE}/api/chat`, {
+        // Stream the response from the API
+        const response = await fetch(`${API_BASE}/api/chat/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ message })
+            body: JSON.stringify({ message, session_id: SESSION_ID })
         });
 
-        const data = await response.json();
-
-        // Remove loading indicator
-        removeLoading(loadingId);
-
-        if (response.ok && data.success) {
-            // If a command was executed, show it in terminal
-            if (data.command_executed) {
-                const cmdInfo = data.command_executed;
-
-                // Add to terminal
-                addTerminalOutput(
-                    cmdInfo.command,
-                    cmdInfo.success ? cmdInfo.output : null,
-                    !cmdInfo.success ? cmdInfo.error : null
-                );
-
-                // Also show in chat for context
-                let cmdMessage = `**Command Executed:** \`${cmdInfo.command}\`\n\n`;
+        if (!response.ok) {
+            const data = await response.json();
+            removeLoading(loadingId);
+            addMessage('assistant', `❌ Error: ${data.error || 'Failed to get response'}`);
+            return;
+        }
 
-                if (cmdInfo.success) {
-                    cmdMessage += `**Output:**\n\`\`\`\n${cmdInfo.output}\n\`\`\``;
-                } else {
-                    cmdMessage += `**Error:**\n\`\`\`\n${cmdInfo.error}\n\`\`\``;
+        let assistantContent = null;
+        let responseText = '';
+        let renderPending = false;
+
+        // Re-render markdown at most once per animation frame
+        const scheduleRender = () => {
+            if (renderPending) return;
+            renderPending = true;
+            requestAnimationFrame(() => {
+                renderPending = false;
+                assistantContent.innerHTML = marked.parse(responseText);
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            });
+        };
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'command') {
+                removeLoading(loadingId);
+                addCommandResult(data);
+            } else if (event === 'token') {
+                if (!assistantContent) {
+                    removeLoading(loadingId);
+                    assistantContent = addMessage('assistant', '');
                 }
-
-                // Add command result as a system-style message
-                const cmdDiv = document.createElement('div');
-                cmdDiv.className = 'message assistant command-result';
-
-                const cmdAvatar = document.createElement('div');
-                cmdAvatar.className = 'message-avatar';
-                cmdAvatar.textContent = '⚡';
-
-                const cmdContent = document.createElement('div');
-                cmdContent.className = 'message-content';
-                cmdContent.innerHTML = marked.parse(cmdMessage);
-
-                cmdDiv.appendChild(cmdAvatar);
-                cmdDiv.appendChild(cmdContent);
-                messagesContainer.appendChild(cmdDiv);
+                responseText += data.delta;
+                scheduleRender();
+            } else if (event === 'error') {
+                removeLoading(loadingId);
+                addMessage('assistant', `❌ Error: ${data.error || 'Failed to get response'}`);
             }
+        });
 
-            // Add assistant response
-            addMessage('assistant', data.response);
-        } else {
-            // Show error
-            addMessage('assistant', `❌ Error: ${data.error || 'Failed to get response'}`);
-        }
+        removeLoading(loadingId);
     } catch (error) {
         removeLoading(loadingId);
         addMessage('assistant', `❌ Error: ${error.message}`);
@@ -169,7 +238,83 @@ async function sendMessage() {
     }
 }
 
-// Add message to chat
+// Read a Server-Sent-Events response body, calling onEvent(event, data) per event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            }
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+}
+
+// Show an executed command in the terminal and in the chat
+function addCommandResult(cmdInfo) {
+    // Add to terminal
+    addTerminalOutput(
+        cmdInfo.command,
+        cmdInfo.success ? cmdInfo.output : null,
+        !cmdInfo.success ? cmdInfo.error : null
+    );
+
+    // Also show in chat for context
+    const freshness = cmdInfo.as_of ? ` _(state as of ${cmdInfo.as_of})_` : (cmdInfo.cached ? ' _(cached)_' : '');
+    let cmdMessage = `**Command Executed:** \`${cmdInfo.command}\`${freshness}\n\n`;
+
+    if (cmdInfo.success) {
+        // Structured commands show the condensed table here; the terminal shows the raw output
+        cmdMessage += `**Output:**\n\`\`\`\n${cmdInfo.summary || cmdInfo.output}\n\`\`\``;
+    } else {
+        cmdMessage += `**Error:**\n\`\`\`\n${cmdInfo.error}\n\`\`\``;
+    }
+
+    if (cmdInfo.output_shaped && cmdInfo.output_id) {
+        // Large results are shortened in the response; the full output is fetched on demand
+        cmdMessage += `\n\n_Output shortened (${cmdInfo.output_bytes} bytes)._ ` +
+            `[View full output](/api/execute/${cmdInfo.output_id}/output)`;
+    }
+
+    // Add command result as a system-style message
+    const cmdDiv = document.createElement('div');
+    cmdDiv.className = 'message assistant command-result';
+
+    const cmdAvatar = document.createElement('div');
+    cmdAvatar.className = 'message-avatar';
+    cmdAvatar.textContent = '⚡';
+
+    const cmdContent = document.createElement('div');
+    cmdContent.className = 'message-content';
+    cmdContent.innerHTML = marked.parse(cmdMessage);
+
+    cmdDiv.appendChild(cmdAvatar);
+    cmdDiv.appendChild(cmdContent);
+    messagesContainer.appendChild(cmdDiv);
+}
+
+// Add message to chat (returns the content element for incremental updates)
 function addMessage(role, content) {
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${role}`;
@@ -193,6 +338,8 @@ function addMessage(role, content) {
 
     messagesContainer.appendChild(messageDiv);
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
+
+    return messageContent;
 }
 
 // Show loading indicator
@@ -241,7 +388,11 @@ async function clearChat() {
 
     try {
         await fetch(`${API_BASE}/api/conversation/clear`, {
-            method: 'POST'
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ session_id: SESSION_ID })
         });
 
         // Clear messages